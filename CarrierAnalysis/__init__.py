@@ -1,9 +1,8 @@
-from . import carrier
-from CarrierAnalysis.analysis import analyze_carrier_performance, CarrierAnalysis
+from CarrierAnalysis.analysis import analyze_carrier_performance, analyze_fleet, CarrierAnalysis, FleetAnalysisResult
 
 # CarrierAnalysis/__init__.py
 
 __version__ = '0.1.0'
 
 
-__all__ = ['Carrier', 'analyze_carrier_performance']
\ No newline at end of file
+__all__ = ['analyze_carrier_performance', 'analyze_fleet', 'FleetAnalysisResult']
\ No newline at end of file
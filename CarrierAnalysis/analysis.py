@@ -1,7 +1,8 @@
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Mapping
 from datetime import datetime, timedelta
 import logging
 from dataclasses import dataclass
+import numpy as np
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -15,6 +16,98 @@ class AnalysisResult:
     recommendations: List[str]
     analysis_date: datetime
 
+# Bit flags used by the batch (fleet) path. Each flag maps to the exact text
+# the per-carrier path emits, listed in the order it would be appended.
+RISK_FATAL_CRASHES = 1 << 0
+RISK_DRIVER_OOS = 1 << 1
+RISK_VEHICLE_OOS = 1 << 2
+
+RISK_FACTOR_TEXT = {
+    RISK_FATAL_CRASHES: "Has fatal crashes in record",
+    RISK_DRIVER_OOS: "Driver out-of-service rate above national average",
+    RISK_VEHICLE_OOS: "Vehicle out-of-service rate above national average",
+}
+
+REC_SAFETY_PROGRAM_REVIEW = 1 << 0
+REC_DRIVER_TRAINING = 1 << 1
+REC_DRIVER_MONITORING = 1 << 2
+REC_DRIVER_QUALIFICATION = 1 << 3
+REC_PREVENTIVE_MAINTENANCE = 1 << 4
+REC_VEHICLE_INSPECTION = 1 << 5
+REC_MAINTAIN_PROGRAMS = 1 << 6
+
+RECOMMENDATION_TEXT = {
+    REC_SAFETY_PROGRAM_REVIEW: "Immediate safety program review recommended",
+    REC_DRIVER_TRAINING: "Schedule comprehensive driver training",
+    REC_DRIVER_MONITORING: "Implement enhanced driver monitoring program",
+    REC_DRIVER_QUALIFICATION: "Review driver qualification procedures",
+    REC_PREVENTIVE_MAINTENANCE: "Increase preventive maintenance frequency",
+    REC_VEHICLE_INSPECTION: "Review vehicle inspection procedures",
+    REC_MAINTAIN_PROGRAMS: "Maintain current safety programs",
+}
+
+# Column name -> value used when the column is missing, mirroring the
+# defaults of the per-carrier path.
+FLEET_COLUMNS = {
+    'crash_count': 0,
+    'vehicle_count': 1,
+    'driver_oos_rate': 0,
+    'vehicle_oos_rate': 0,
+    'fatal_crashes': 0,
+}
+
+def _round_half(values: np.ndarray, ndigits: int) -> np.ndarray:
+    """
+    np.round scales by 10**ndigits before rounding, so values sitting on a
+    half step can land on the other side of Python's correctly-rounded
+    round(). Those rows are re-rounded with the builtin to keep the batch
+    path identical to the per-carrier one.
+    """
+    rounded = np.round(values, ndigits)
+    scaled = values * 10.0 ** ndigits
+    ties = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    if ties.size:
+        rounded[ties] = [round(v, ndigits) for v in values[ties].tolist()]
+    return rounded
+
+def _decode_flags(flags: int, table: Dict[int, str]) -> List[str]:
+    return [text for flag, text in table.items() if flags & flag]
+
+@dataclass
+class FleetAnalysisResult:
+    """Columnar analysis results, one array element per carrier"""
+    risk_level: np.ndarray
+    risk_flags: np.ndarray
+    crash_rate: np.ndarray
+    driver_compliance: np.ndarray
+    vehicle_compliance: np.ndarray
+    safety_score: np.ndarray
+    recommendation_codes: np.ndarray
+    analysis_date: datetime
+
+    def __len__(self) -> int:
+        return len(self.risk_level)
+
+    def result(self, index: int) -> AnalysisResult:
+        """Expand a single row into the per-carrier AnalysisResult"""
+        return AnalysisResult(
+            risk_level=str(self.risk_level[index]),
+            risk_factors=_decode_flags(int(self.risk_flags[index]), RISK_FACTOR_TEXT),
+            performance_metrics={
+                'crash_rate': float(self.crash_rate[index]),
+                'driver_compliance': float(self.driver_compliance[index]),
+                'vehicle_compliance': float(self.vehicle_compliance[index]),
+                'safety_score': float(self.safety_score[index]),
+            },
+            recommendations=_decode_flags(
+                int(self.recommendation_codes[index]), RECOMMENDATION_TEXT
+            ),
+            analysis_date=self.analysis_date
+        )
+
+    def results(self) -> List[AnalysisResult]:
+        return [self.result(i) for i in range(len(self))]
+
 class CarrierAnalysis:
     def __init__(self):
         self.national_averages = {
@@ -41,6 +134,122 @@ class CarrierAnalysis:
             logger.error(f"Error analyzing carrier: {str(e)}")
             raise
 
+    def analyze_fleet(self, fleet: Mapping[str, Any]) -> FleetAnalysisResult:
+        """
+        Analyze many carriers at once.
+
+        Args:
+            fleet: Columnar table (DataFrame, or mapping of column name to
+                NumPy array) with the columns in FLEET_COLUMNS. Missing
+                columns take the same defaults as the per-carrier path.
+
+        Returns:
+            FleetAnalysisResult whose rows match analyze_carrier_performance
+        """
+        try:
+            columns = self._fleet_columns(fleet)
+            risk_level, risk_flags = self._assess_fleet_risk(columns)
+            metrics = self._calculate_fleet_metrics(columns)
+            recommendation_codes = self._generate_fleet_recommendations(risk_flags, metrics)
+
+            return FleetAnalysisResult(
+                risk_level=risk_level,
+                risk_flags=risk_flags,
+                recommendation_codes=recommendation_codes,
+                analysis_date=datetime.now(),
+                **metrics
+            )
+        except Exception as e:
+            logger.error(f"Error analyzing fleet: {str(e)}")
+            raise
+
+    def _fleet_columns(self, fleet: Mapping[str, Any]) -> Dict[str, np.ndarray]:
+        """Normalize the input table to float64 arrays of equal length"""
+        present = [np.asarray(fleet[name], dtype=np.float64)
+                   for name in FLEET_COLUMNS if name in fleet]
+        if not present:
+            raise ValueError(
+                f"Fleet table needs at least one of: {', '.join(FLEET_COLUMNS)}"
+            )
+        size = len(present[0])
+
+        columns = {}
+        for name, default in FLEET_COLUMNS.items():
+            if name in fleet:
+                column = np.asarray(fleet[name], dtype=np.float64)
+                if column.shape != (size,):
+                    raise ValueError(f"Column {name} must be 1-D with {size} rows")
+            else:
+                column = np.full(size, default, dtype=np.float64)
+            columns[name] = column
+        return columns
+
+    def _assess_fleet_risk(self, columns: Dict[str, np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+        """Vectorized equivalent of _assess_risk"""
+        fatal = columns['fatal_crashes'] > 0
+        driver_oos = columns['driver_oos_rate'] > self.national_averages['driver_oos_rate']
+        vehicle_oos = columns['vehicle_oos_rate'] > self.national_averages['vehicle_oos_rate']
+
+        risk_flags = (
+            fatal * RISK_FATAL_CRASHES
+            | driver_oos * RISK_DRIVER_OOS
+            | vehicle_oos * RISK_VEHICLE_OOS
+        ).astype(np.uint8)
+
+        risk_level = np.where(
+            fatal, "HIGH", np.where(driver_oos | vehicle_oos, "MEDIUM", "LOW")
+        ).astype(object)
+
+        return risk_level, risk_flags
+
+    def _calculate_fleet_metrics(self, columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Vectorized equivalent of _calculate_performance_metrics"""
+        crashes = columns['crash_count']
+        vehicles = columns['vehicle_count']
+        driver_oos = columns['driver_oos_rate']
+        vehicle_oos = columns['vehicle_oos_rate']
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            crash_rate = np.where(vehicles <= 0, 0.0, _round_half(crashes / vehicles, 3))
+
+        # np.fmax mirrors max(0, x), which also yields 0 for NaN input
+        crash_score = np.fmax(0, 100 * (1 - crash_rate / self.national_averages['crash_rate']))
+        driver_score = np.fmax(0, 100 * (1 - driver_oos / self.national_averages['driver_oos_rate']))
+        vehicle_score = np.fmax(0, 100 * (1 - vehicle_oos / self.national_averages['vehicle_oos_rate']))
+
+        safety_score = _round_half(
+            crash_score * 0.4 +
+            driver_score * 0.3 +
+            vehicle_score * 0.3,
+            1
+        )
+
+        return {
+            'crash_rate': crash_rate,
+            'driver_compliance': 100 - driver_oos,
+            'vehicle_compliance': 100 - vehicle_oos,
+            'safety_score': safety_score
+        }
+
+    def _generate_fleet_recommendations(
+        self,
+        risk_flags: np.ndarray,
+        metrics: Dict[str, np.ndarray]
+    ) -> np.ndarray:
+        """Vectorized equivalent of _generate_recommendations"""
+        fatal = (risk_flags & RISK_FATAL_CRASHES) != 0
+        driver = metrics['driver_compliance'] < 90
+        vehicle = metrics['vehicle_compliance'] < 90
+
+        codes = (
+            fatal * (REC_SAFETY_PROGRAM_REVIEW | REC_DRIVER_TRAINING)
+            | driver * (REC_DRIVER_MONITORING | REC_DRIVER_QUALIFICATION)
+            | vehicle * (REC_PREVENTIVE_MAINTENANCE | REC_VEHICLE_INSPECTION)
+        ).astype(np.uint8)
+        codes[codes == 0] = REC_MAINTAIN_PROGRAMS
+
+        return codes
+
     def _assess_risk(self, data: Dict[str, Any]) -> tuple[str, List[str]]:
         """Evaluate carrier risk level and identify risk factors"""
         risk_factors = []
@@ -145,4 +354,9 @@ def analyze_carrier_performance(carrier_data: Dict[str, Any]) -> Dict[str, Any]:
     """Convenience function for running carrier analysis"""
     analyzer = CarrierAnalysis()
     result = analyzer.analyze_carrier_performance(carrier_data)
-    return result.__dict__
\ No newline at end of file
+    return result.__dict__
+
+def analyze_fleet(fleet: Mapping[str, Any]) -> FleetAnalysisResult:
+    """Convenience function for running batch analysis over a fleet table"""
+    analyzer = CarrierAnalysis()
+    return analyzer.analyze_fleet(fleet)
\ No newline at end of file
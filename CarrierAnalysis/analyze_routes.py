@@ -1,18 +1,17 @@
-import pandas as pd
-import folium
 from datetime import datetime
-import matplotlib.pyplot as plt
-import seaborn as sns
-from scipy.stats import zscore
 import os
-from scipy import stats
-import numpy as np
 
 class CarrierRouteAnalysis:
     def __init__(self):
         pass  # Placeholder method
 
 def main():
+    # Plotting and stats libraries take seconds to import; only the CLI needs them
+    import folium
+    import matplotlib.pyplot as plt
+    from scipy import stats
+    import numpy as np
+
     print("Welcome to the Carrier Route Analysis System!")
     
     # Automatically detect the Excel file
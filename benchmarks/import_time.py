@@ -0,0 +1,90 @@
+"""
+Cold-start import benchmark.
+
+Imports each entry module in a fresh interpreter, reports its cumulative
+import time from `python -X importtime`, and fails when a module is over
+its budget or pulls in a heavy dependency that should only load on first
+use. shapely is not on the list: geoalchemy2 imports it itself.
+
+    python benchmarks/import_time.py [--repeat 5] [--scale 1.0]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Budgets in milliseconds, taken as the median of --repeat cold imports
+BUDGETS_MS = {
+    'src.config': 400,
+    'src.api.main': 1000,
+    'src.api.router': 2000,
+    'src.api.geographic': 2000,
+    'src.geographic.processing': 500,
+    'CarrierAnalysis.analyze_routes': 300,
+}
+
+FORBIDDEN_MODULES = ('sklearn', 'scipy', 'matplotlib', 'pandas', 'folium', 'seaborn')
+
+_PROBE = (
+    "import json, sys; __import__(sys.argv[1]); "
+    "print(json.dumps(sorted(m for m in sys.argv[2:] if m in sys.modules)))"
+)
+
+def measure(module: str) -> Dict:
+    """Cumulative import time (ms) of one module in a fresh interpreter"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _PROBE, module, *FORBIDDEN_MODULES],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{result.stderr[-2000:]}")
+
+    cumulative_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = [field.strip() for field in line[len('import time:'):].split('|')]
+        if fields[2] == module:
+            cumulative_us = int(fields[1])
+    return {
+        'milliseconds': cumulative_us / 1000,
+        'heavy_modules': json.loads(result.stdout.strip().splitlines()[-1])
+    }
+
+def run(modules: List[str], repeat: int, scale: float) -> int:
+    failures = 0
+    for module in modules:
+        samples = [measure(module) for _ in range(repeat)]
+        median = sorted(sample['milliseconds'] for sample in samples)[len(samples) // 2]
+        budget = BUDGETS_MS[module] * scale
+        heavy = samples[0]['heavy_modules']
+
+        status = 'ok'
+        if median > budget:
+            status = 'OVER BUDGET'
+        if heavy:
+            status = f"LOADS {', '.join(heavy)}"
+        if status != 'ok':
+            failures += 1
+        print(f"{module:<36} {median:8.1f} ms  (budget {budget:.0f} ms)  {status}")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('modules', nargs='*', default=list(BUDGETS_MS))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='multiply every budget, e.g. for slow CI machines')
+    args = parser.parse_args()
+
+    unknown = [module for module in args.modules if module not in BUDGETS_MS]
+    if unknown:
+        parser.error(f"no budget for {', '.join(unknown)}")
+    sys.exit(1 if run(args.modules, args.repeat, args.scale) else 0)
+
+if __name__ == '__main__':
+    main()
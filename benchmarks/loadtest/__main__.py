@@ -0,0 +1,124 @@
+"""
+End-to-end load test: FMCSA stub, seeded database, API and driver.
+
+    python -m benchmarks.loadtest --seed-carriers 1000 --workers 4 --latency-ms 150 --error-rate 0.02
+
+Starts the FMCSA stub and the API (uvicorn, benchmarks.loadtest.app) as
+subprocesses, with the API's FMCSA_BASE_URL pointed at the stub, optionally
+seeds the database named by the DB_* settings first, then runs the driver
+and stops both servers. Pass --api-url to drive an API that is already
+running instead. Never point DB_* at a production database: seeding writes
+to it.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from contextlib import ExitStack, contextmanager
+from typing import Dict, Iterator, List
+
+import httpx
+
+from . import driver
+from .stub_fmcsa import StubConfig
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@contextmanager
+def serve(command: List[str], ready_url: str, env: Dict[str, str], timeout: float = 60.0) -> Iterator[None]:
+    """Run a server subprocess until the block exits, once `ready_url` answers"""
+    process = subprocess.Popen(command, cwd=ROOT, env=env)
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"{' '.join(command)} exited with {process.returncode}")
+            try:
+                if httpx.get(ready_url, timeout=1.0).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{ready_url} not ready after {timeout:.0f}s")
+            time.sleep(0.2)
+        yield
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--api-url', help='drive this running API instead of starting one')
+    parser.add_argument('--api-port', type=int, default=8800)
+    parser.add_argument('--workers', type=int, default=1, help='uvicorn worker processes for the API')
+    parser.add_argument('--stub-port', type=int, default=8900)
+    parser.add_argument('--latency-ms', type=float, default=StubConfig.latency_ms)
+    parser.add_argument('--latency-sigma', type=float, default=StubConfig.latency_sigma)
+    parser.add_argument('--error-rate', type=float, default=StubConfig.error_rate)
+    parser.add_argument('--throttle-rate', type=float, default=StubConfig.throttle_rate)
+    parser.add_argument('--not-found-rate', type=float, default=StubConfig.not_found_rate)
+    parser.add_argument('--seed-carriers', type=int, default=0,
+                        help='seed this many carriers first (implies --carriers)')
+    parser.add_argument('--inspections', type=int, default=200, help='inspections per seeded carrier')
+    driver.add_arguments(parser)
+    args = parser.parse_args()
+
+    if args.seed_carriers:
+        from .seed import seed
+        print(seed(args.seed_carriers, args.inspections, args.seed))
+        args.carriers = args.seed_carriers
+
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    with ExitStack() as stack:
+        stack.enter_context(serve(
+            [
+                sys.executable, '-m', 'benchmarks.loadtest.stub_fmcsa',
+                '--port', str(args.stub_port),
+                '--latency-ms', str(args.latency_ms),
+                '--latency-sigma', str(args.latency_sigma),
+                '--error-rate', str(args.error_rate),
+                '--throttle-rate', str(args.throttle_rate),
+                '--not-found-rate', str(args.not_found_rate),
+                # Fresh DOT numbers for cache misses are drawn past the seeded ones
+                '--carriers', str(max(args.carriers * 10, StubConfig.carriers)),
+                '--seed', str(args.seed),
+            ],
+            f"{stub_url}/stats",
+            dict(os.environ)
+        ))
+
+        api_url = args.api_url
+        if api_url is None:
+            api_url = f"http://127.0.0.1:{args.api_port}"
+            env = {
+                **os.environ,
+                'FMCSA_BASE_URL': f"{stub_url}/qc",
+                'WEBKEY': os.environ.get('WEBKEY', 'loadtest'),
+                # Every lookup should reach the stub or the in-memory tier
+                'FMCSA_CACHE_PATH': '',
+            }
+            stack.enter_context(serve(
+                [
+                    sys.executable, '-m', 'uvicorn', 'benchmarks.loadtest.app:app',
+                    '--port', str(args.api_port),
+                    '--workers', str(args.workers),
+                    '--log-level', 'warning',
+                ],
+                f"{api_url}/api/health",
+                env
+            ))
+
+        report = driver.drive(api_url, args)
+        report['stub'] = httpx.get(f"{stub_url}/stats").json()
+        print(f"FMCSA stub: {json.dumps(report['stub'])}")
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(report, f, indent=2, default=float)
+
+if __name__ == '__main__':
+    main()
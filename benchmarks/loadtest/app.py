@@ -0,0 +1,12 @@
+"""
+The API under load: src.api.main's app with the carrier and geographic
+routers mounted.
+
+    uvicorn benchmarks.loadtest.app:app --workers 4
+"""
+from src.api.main import app
+from src.api.router import router as carrier_router
+from src.api.geographic import router as geographic_router
+
+app.include_router(carrier_router)
+app.include_router(geographic_router)
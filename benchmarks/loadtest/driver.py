@@ -0,0 +1,277 @@
+"""
+Closed-loop load driver for the carrier and geographic endpoints.
+
+For each endpoint and each concurrency level, that many workers send
+requests back to back for --duration seconds; every response body is read
+in full, so streamed endpoints are timed to their last byte. Each step
+reports throughput and p50/p95/p99 latency of its 200 responses; other
+responses are counted as errors. An endpoint counts as saturated at the
+first level whose throughput is less than SATURATION_GAIN above the
+previous level's: beyond that point, more concurrency only adds queueing.
+
+Before measuring, every endpoint is requested once for a seeded carrier and
+skipped if that does not return 200. A step whose error ratio exceeds
+--max-error-rate is flagged and ends that endpoint's run, since its figures
+would describe failures.
+
+    python -m benchmarks.loadtest.driver --base-url http://127.0.0.1:8000 --concurrency 1,4,16,64
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+from .. import synthetic
+
+SATURATION_GAIN = 0.1
+MAX_ERROR_RATE = 0.05
+BATCH_SIZE = 50
+TILE_ZOOM = 8
+
+@dataclass
+class Endpoint:
+    name: str
+    group: str
+    method: str
+    path: str
+    params: Dict[str, Any] = field(default_factory=dict)
+    uses_fmcsa: bool = False
+
+ENDPOINTS = [
+    Endpoint('carrier', 'carriers', 'GET', '/carriers/{dot}', uses_fmcsa=True),
+    Endpoint('carrier_analysis', 'carriers', 'GET', '/carriers/{dot}/analysis', uses_fmcsa=True),
+    Endpoint('batch_analysis', 'carriers', 'POST', '/carriers/analysis/batch', uses_fmcsa=True),
+    Endpoint('coverage', 'geographic', 'GET', '/carriers/{dot}/coverage'),
+    Endpoint('routes', 'geographic', 'GET', '/carriers/{dot}/routes'),
+    Endpoint('analytics', 'geographic', 'GET', '/carriers/{dot}/analytics'),
+    Endpoint('geographic_analysis', 'geographic', 'GET', '/carriers/{dot}/geographic-analysis'),
+    Endpoint('route_stats', 'geographic', 'GET', '/carriers/{dot}/route-stats'),
+    Endpoint('map_data', 'geographic', 'GET', '/carriers/{dot}/map-data'),
+    Endpoint('map_data_stream', 'geographic', 'GET', '/carriers/{dot}/map-data', {'stream': 'true'}),
+    Endpoint('map_data_zoom6', 'geographic', 'GET', '/carriers/{dot}/map-data', {'zoom': 6}),
+    Endpoint('tile', 'geographic', 'GET', '/carriers/{dot}/tiles/{z}/{x}/{y}'),
+]
+
+def _tile(longitude: float, latitude: float, zoom: int) -> tuple:
+    n = 2 ** zoom
+    lat = math.radians(latitude)
+    x = int((longitude + 180.0) / 360.0 * n)
+    y = int((1.0 - math.log(math.tan(lat) + 1.0 / math.cos(lat)) / math.pi) / 2.0 * n)
+    return x, y
+
+class Workload:
+    """
+    Picks request parameters.
+
+    Geographic endpoints use the `carriers` seeded DOT numbers. FMCSA-backed
+    endpoints use them too, except for a `cache_miss_rate` share of requests
+    that ask for a DOT number not requested before, so the FMCSA cache is
+    bypassed at a controlled rate.
+    """
+
+    def __init__(self, carriers: int, cache_miss_rate: float = 0.0, seed: int = synthetic.DEFAULT_SEED):
+        self.carriers = carriers
+        self.cache_miss_rate = cache_miss_rate
+        self.rng = random.Random(seed)
+        self._next_fresh = carriers
+        self.tiles = [_tile(hub[2], hub[3], TILE_ZOOM) for hub in synthetic.HUBS]
+
+    def dot_number(self, uses_fmcsa: bool) -> str:
+        if uses_fmcsa and self.rng.random() < self.cache_miss_rate:
+            self._next_fresh += 1
+            return str(synthetic.FIRST_DOT_NUMBER + self._next_fresh)
+        return str(synthetic.FIRST_DOT_NUMBER + self.rng.randrange(self.carriers))
+
+    def request(self, endpoint: Endpoint) -> Dict[str, Any]:
+        if endpoint.name == 'batch_analysis':
+            return {'json': {'dot_numbers': [self.dot_number(True) for _ in range(BATCH_SIZE)]}}
+        x, y = self.rng.choice(self.tiles)
+        path = endpoint.path.format(dot=self.dot_number(endpoint.uses_fmcsa), z=TILE_ZOOM, x=x, y=y)
+        return {'url': path, 'params': endpoint.params}
+
+    def probe(self, endpoint: Endpoint) -> Dict[str, Any]:
+        """Request for the first seeded carrier, which every seeding includes"""
+        dot_number = str(synthetic.FIRST_DOT_NUMBER)
+        if endpoint.name == 'batch_analysis':
+            return {'json': {'dot_numbers': [dot_number]}}
+        x, y = self.tiles[0]
+        return {'url': endpoint.path.format(dot=dot_number, z=TILE_ZOOM, x=x, y=y), 'params': endpoint.params}
+
+async def check_endpoints(client: httpx.AsyncClient, endpoints: List[Endpoint], workload: Workload) -> Dict[str, str]:
+    """Status of one request per endpoint against the seeded data"""
+    statuses = {}
+    for endpoint in endpoints:
+        request = workload.probe(endpoint)
+        try:
+            response = await client.request(endpoint.method, request.pop('url', endpoint.path), **request)
+            statuses[endpoint.name] = str(response.status_code)
+        except httpx.HTTPError as e:
+            statuses[endpoint.name] = type(e).__name__
+    return statuses
+
+async def run_step(
+    client: httpx.AsyncClient,
+    endpoint: Endpoint,
+    workload: Workload,
+    concurrency: int,
+    duration: float
+) -> Dict[str, Any]:
+    """Drive one endpoint at one concurrency level; latencies are of 200s only"""
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            request = workload.request(endpoint)
+            started = time.perf_counter()
+            try:
+                async with client.stream(
+                    endpoint.method, request.pop('url', endpoint.path), **request
+                ) as response:
+                    await response.aread()
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            if status == '200':
+                latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    requests = sum(statuses.values())
+    errors = requests - len(latencies)
+    result = {
+        'endpoint': endpoint.name,
+        'group': endpoint.group,
+        'concurrency': concurrency,
+        'requests': requests,
+        'errors': errors,
+        'error_rate': errors / requests if requests else 0.0,
+        'statuses': statuses,
+        'throughput': len(latencies) / elapsed if elapsed else 0.0,
+    }
+    if latencies:
+        p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+        result.update(p50_ms=p50, p95_ms=p95, p99_ms=p99, max_ms=max(latencies) * 1000)
+    return result
+
+def find_saturation(steps: List[Dict[str, Any]]) -> Optional[int]:
+    """Concurrency level past which throughput stops growing, if reached"""
+    for previous, step in zip(steps, steps[1:]):
+        if step['throughput'] < previous['throughput'] * (1 + SATURATION_GAIN):
+            return previous['concurrency']
+    return None
+
+async def run(
+    base_url: str,
+    endpoints: List[Endpoint],
+    concurrency_levels: List[int],
+    duration: float,
+    workload: Workload,
+    warmup: float = 2.0,
+    timeout: float = 60.0,
+    max_error_rate: float = MAX_ERROR_RATE
+) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=max(concurrency_levels), max_keepalive_connections=max(concurrency_levels))
+    report = {'base_url': base_url, 'duration': duration, 'endpoints': {}}
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        preflight = await check_endpoints(client, endpoints, workload)
+        for endpoint in endpoints:
+            if preflight[endpoint.name] != '200':
+                print(f"{endpoint.name}: skipped, preflight request returned {preflight[endpoint.name]}")
+                report['endpoints'][endpoint.name] = {'group': endpoint.group, 'skipped': preflight[endpoint.name]}
+                continue
+            if warmup:
+                await run_step(client, endpoint, workload, 1, warmup)
+            steps = []
+            failed = None
+            for concurrency in concurrency_levels:
+                step = await run_step(client, endpoint, workload, concurrency, duration)
+                print(format_step(step))
+                if step['error_rate'] > max_error_rate:
+                    failed = step
+                    print(f"{endpoint.name}: stopped, {step['error_rate']:.1%} errors at concurrency {concurrency}")
+                    break
+                steps.append(step)
+            saturation = find_saturation(steps)
+            report['endpoints'][endpoint.name] = {
+                'group': endpoint.group,
+                'steps': steps,
+                'failed_step': failed,
+                'peak_throughput': max((step['throughput'] for step in steps), default=None),
+                'saturation_concurrency': saturation
+            }
+            if saturation is not None:
+                print(f"{endpoint.name}: saturated at concurrency {saturation}")
+    return report
+
+def format_step(step: Dict[str, Any]) -> str:
+    if step['requests'] == step['errors']:
+        return f"{step['endpoint']:<22} c={step['concurrency']:<4} no successful requests ({step['errors']} errors)"
+    return (
+        f"{step['endpoint']:<22} c={step['concurrency']:<4} "
+        f"{step['throughput']:9.1f} req/s  "
+        f"p50 {step['p50_ms']:8.1f}  p95 {step['p95_ms']:8.1f}  p99 {step['p99_ms']:8.1f} ms  "
+        f"errors {step['errors']}/{step['requests']}"
+    )
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    names = [endpoint.name for endpoint in ENDPOINTS]
+    parser.add_argument('--endpoints', default='all',
+                        help=f"comma-separated names, 'carriers', 'geographic' or 'all'; names: {', '.join(names)}")
+    parser.add_argument('--concurrency', default='1,4,16,64', help='comma-separated concurrency levels')
+    parser.add_argument('--duration', type=float, default=15.0, help='seconds per concurrency level')
+    parser.add_argument('--warmup', type=float, default=2.0, help='seconds at concurrency 1 before measuring')
+    parser.add_argument('--carriers', type=int, default=1000, help='seeded carriers to draw DOT numbers from')
+    parser.add_argument('--cache-miss-rate', type=float, default=0.0,
+                        help='share of FMCSA-backed requests for never-seen DOT numbers')
+    parser.add_argument('--max-error-rate', type=float, default=MAX_ERROR_RATE,
+                        help='error ratio above which an endpoint stops escalating concurrency')
+    parser.add_argument('--seed', type=int, default=synthetic.DEFAULT_SEED)
+    parser.add_argument('--output', help='write the report as JSON')
+
+def select_endpoints(spec: str) -> List[Endpoint]:
+    if spec == 'all':
+        return list(ENDPOINTS)
+    selected = []
+    for name in spec.split(','):
+        matches = [endpoint for endpoint in ENDPOINTS if name in (endpoint.name, endpoint.group)]
+        if not matches:
+            raise ValueError(f"Unknown endpoint or group: {name}")
+        selected.extend(endpoint for endpoint in matches if endpoint not in selected)
+    return selected
+
+def drive(base_url: str, args: argparse.Namespace) -> Dict[str, Any]:
+    report = asyncio.run(run(
+        base_url,
+        select_endpoints(args.endpoints),
+        [int(level) for level in args.concurrency.split(',')],
+        args.duration,
+        Workload(args.carriers, args.cache_miss_rate, args.seed),
+        args.warmup,
+        max_error_rate=args.max_error_rate
+    ))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, default=float)
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+    add_arguments(parser)
+    args = parser.parse_args()
+    drive(args.base_url, args)
+
+if __name__ == '__main__':
+    main()
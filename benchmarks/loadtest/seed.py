@@ -0,0 +1,99 @@
+"""
+Seed the database the API reads (DB_* settings) with synthetic carriers.
+
+Each carrier gets its FMCSA record, safety metrics, an inspection track
+ingested through LocationProcessor (which also maintains the monthly
+rollups) and routes built by refresh_carrier_routes, so every geographic
+endpoint has data to serve. DOT numbers start at
+synthetic.FIRST_DOT_NUMBER, matching the FMCSA stub.
+
+    python -m benchmarks.loadtest.seed --carriers 1000 --inspections 200
+"""
+import argparse
+import logging
+import time
+from itertools import islice
+from typing import Dict
+
+from sqlalchemy import select, text
+
+from src.database.database import Base, SessionLocal, get_engine
+from src.database.models import InspectionLocation  # registers every table
+from src.models.carrier import CarrierHistory  # noqa: F401  written by bulk_upsert_carriers
+from src.database.repository import CarrierRepository
+from src.geographic.services import LocationProcessor, refresh_carrier_routes
+
+from .. import synthetic
+
+logger = logging.getLogger(__name__)
+
+def create_schema() -> None:
+    engine = get_engine()
+    with engine.begin() as connection:
+        connection.execute(text("CREATE EXTENSION IF NOT EXISTS postgis"))
+    Base.metadata.create_all(engine)
+
+def seed(carriers: int, inspections: int, seed: int = synthetic.DEFAULT_SEED, batch_size: int = 1000) -> Dict[str, int]:
+    """Write `carriers` synthetic carriers with `inspections` inspections each"""
+    create_schema()
+    db = SessionLocal()
+    repository = CarrierRepository(db)
+    stats = {'carriers': 0, 'inspections': 0, 'routes': 0}
+    started = time.monotonic()
+    try:
+        payloads = synthetic.fmcsa_payloads(carriers, seed)
+        while batch := list(islice(payloads, batch_size)):
+            repository.bulk_upsert_carriers(payload for payload, _ in batch)
+            ids = {
+                dot_number: carrier.id
+                for dot_number, carrier in repository.get_carriers_by_dots(
+                    payload['content']['carrier']['dotNumber'] for payload, _ in batch
+                ).items()
+            }
+            repository.bulk_upsert_safety_metrics(
+                (ids[payload['content']['carrier']['dotNumber']], metrics)
+                for payload, metrics in batch
+            )
+            # Carriers seeded by an earlier run keep their inspections
+            seeded = set(db.execute(
+                select(InspectionLocation.carrier_id).distinct().where(
+                    InspectionLocation.carrier_id.in_(ids.values())
+                )
+            ).scalars())
+
+            for payload, _ in batch:
+                dot_number = payload['content']['carrier']['dotNumber']
+                if ids[dot_number] in seeded:
+                    continue
+                index = int(dot_number) - synthetic.FIRST_DOT_NUMBER
+                locations = LocationProcessor(db).process_inspection_data({
+                    'carrier': {'dotNumber': dot_number},
+                    'inspections': synthetic.fmcsa_inspections(index, seed, inspections)
+                })
+                db.flush()
+                routes = refresh_carrier_routes(db, ids[dot_number], full=True)
+
+                stats['carriers'] += 1
+                stats['inspections'] += len(locations)
+                stats['routes'] += len(routes)
+            logger.info(f"Seeded {stats['carriers']}/{carriers} carriers in {time.monotonic() - started:.0f}s")
+        return stats
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--carriers', type=int, default=1000)
+    parser.add_argument('--inspections', type=int, default=synthetic.MEAN_TRACK_LENGTH,
+                        help='inspections per carrier')
+    parser.add_argument('--seed', type=int, default=synthetic.DEFAULT_SEED)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    print(seed(args.carriers, args.inspections, args.seed))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Local stand-in for the FMCSA QCMobile API.
+
+Serves /qc/services/carriers/{dot_number} and
+/qc/services/carriers/name/{name} with synthetic payloads
+(benchmarks.synthetic), after a log-normal delay around --latency-ms, and
+fails a configurable share of requests so the clients' retry and error
+paths are exercised too.
+
+    python -m benchmarks.loadtest.stub_fmcsa --port 8900 --latency-ms 120 --error-rate 0.02
+
+Point the API at it with FMCSA_BASE_URL=http://127.0.0.1:8900/qc.
+"""
+import argparse
+import asyncio
+import random
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import FastAPI, Query
+from fastapi.responses import JSONResponse
+
+from .. import synthetic
+
+@dataclass
+class StubConfig:
+    latency_ms: float = 100.0
+    latency_sigma: float = 0.5  # log-normal shape; 0 gives a fixed delay
+    error_rate: float = 0.0  # answered 503
+    throttle_rate: float = 0.0  # answered 429 with Retry-After
+    not_found_rate: float = 0.0  # answered with empty content
+    carriers: int = 100_000  # DOT numbers FIRST_DOT_NUMBER.. that exist
+    seed: int = synthetic.DEFAULT_SEED
+
+def create_app(config: StubConfig) -> FastAPI:
+    app = FastAPI(title="FMCSA stub")
+    app.state.config = config
+    app.state.stats = {'requests': 0, 'errors': 0, 'throttled': 0, 'not_found': 0}
+    rng = random.Random(config.seed)
+
+    async def respond(body_factory) -> JSONResponse:
+        stats = app.state.stats
+        stats['requests'] += 1
+        if config.latency_ms > 0:
+            delay = config.latency_ms * rng.lognormvariate(0.0, config.latency_sigma)
+            await asyncio.sleep(delay / 1000)
+
+        roll = rng.random()
+        if roll < config.error_rate:
+            stats['errors'] += 1
+            return JSONResponse({'error': 'Service Unavailable'}, status_code=503)
+        roll -= config.error_rate
+        if roll < config.throttle_rate:
+            stats['throttled'] += 1
+            return JSONResponse({'error': 'Too Many Requests'}, status_code=429, headers={'Retry-After': '1'})
+        roll -= config.throttle_rate
+
+        body = None if roll < config.not_found_rate else body_factory()
+        if body is None:
+            stats['not_found'] += 1
+            return JSONResponse({'content': None})
+        return JSONResponse(body)
+
+    def carrier_body(dot_number: str) -> Optional[dict]:
+        if not dot_number.isdigit():
+            return None
+        index = int(dot_number) - synthetic.FIRST_DOT_NUMBER
+        if not 0 <= index < config.carriers:
+            return None
+        return synthetic.fmcsa_carrier_response(dot_number, config.seed)
+
+    def name_body(name: str) -> Optional[dict]:
+        # Names look like "BENCHMARK CARRIER 12"; any other name matches nothing
+        suffix = name.rsplit(' ', 1)[-1]
+        if not suffix.isdigit():
+            return None
+        body = carrier_body(str(synthetic.FIRST_DOT_NUMBER + int(suffix)))
+        if body is None:
+            return None
+        return {'content': [{'carrier': body['content']['carrier']}], 'retrievalDate': body['retrievalDate']}
+
+    # The clients retry empty responses without "/services", so serve both
+    @app.get("/qc/services/carriers/name/{name}")
+    @app.get("/qc/carriers/name/{name}")
+    async def search_carriers_by_name(name: str, webKey: str = Query(...)):
+        return await respond(lambda: name_body(name))
+
+    @app.get("/qc/services/carriers/{dot_number}")
+    @app.get("/qc/carriers/{dot_number}")
+    async def get_carrier_by_dot(dot_number: str, webKey: str = Query(...)):
+        return await respond(lambda: carrier_body(dot_number))
+
+    @app.get("/stats")
+    async def stats():
+        return app.state.stats
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--latency-ms', type=float, default=StubConfig.latency_ms)
+    parser.add_argument('--latency-sigma', type=float, default=StubConfig.latency_sigma)
+    parser.add_argument('--error-rate', type=float, default=StubConfig.error_rate)
+    parser.add_argument('--throttle-rate', type=float, default=StubConfig.throttle_rate)
+    parser.add_argument('--not-found-rate', type=float, default=StubConfig.not_found_rate)
+    parser.add_argument('--carriers', type=int, default=StubConfig.carriers)
+    parser.add_argument('--seed', type=int, default=StubConfig.seed)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    config = StubConfig(
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        not_found_rate=args.not_found_rate,
+        carriers=args.carriers,
+        seed=args.seed
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level='warning')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,308 @@
+"""
+Micro-benchmarks for the analysis and geographic hot paths.
+
+    python -m benchmarks.suite --scale 1k
+    python -m benchmarks.suite --scale 100k --save-baseline
+    python -m benchmarks.suite --scale 10m --repeat 1 --database-url postgresql://localhost/bench
+
+Each case runs over deterministic synthetic data (benchmarks.synthetic)
+and only the call under test is timed; generating the data is not. The
+best of --repeat runs is compared against benchmarks/baselines/<scale>.json
+and the exit status is 1 when any case is slower than the baseline by more
+than --threshold. Repository upserts only run when a database URL is given
+and write carriers with DOT numbers from 90000000 up, which are deleted
+again afterwards.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from CarrierAnalysis.analysis import CarrierAnalysis
+from src.geographic.processing import FrequencyAnalyzer, RoutePatternDetector
+from src.geographic.visualization import GeoVisualizer
+
+from . import synthetic
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+DEFAULT_THRESHOLD = 0.2
+CHUNK_SIZE = 10_000
+# Rows run untimed before each case, so lazy imports and first-call setup
+# are not charged to it
+WARMUP_ROWS = 200
+
+class Timer:
+    """Accumulates time spent inside `with timer:` blocks"""
+
+    def __init__(self):
+        self.seconds = 0.0
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds += time.perf_counter() - self._started
+
+def _batched(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+# Cases take (rows, seed, options) and return the seconds spent in the code
+# under test; register new ones in CASES below
+def bench_analyze_carrier_performance(rows: int, seed: int, options: Dict[str, Any]) -> float:
+    analysis = CarrierAnalysis()
+    timer = Timer()
+    for chunk in _batched(synthetic.carriers(rows, seed), CHUNK_SIZE):
+        with timer:
+            for carrier in chunk:
+                analysis.analyze_carrier_performance(carrier)
+    return timer.seconds
+
+def bench_analyze_fleet(rows: int, seed: int, options: Dict[str, Any]) -> float:
+    analysis = CarrierAnalysis()
+    timer = Timer()
+    for offset in range(0, rows, 1_000_000):
+        columns = synthetic.carrier_columns(min(1_000_000, rows - offset), seed, offset)
+        with timer:
+            analysis.analyze_fleet(columns)
+    return timer.seconds
+
+def bench_detect_patterns(rows: int, seed: int, options: Dict[str, Any]) -> float:
+    detector = RoutePatternDetector()
+    timer = Timer()
+    for inspections in synthetic.tracks(rows, seed):
+        with timer:
+            detector.detect_patterns(inspections)
+    return timer.seconds
+
+def bench_analyze_state_pairs(rows: int, seed: int, options: Dict[str, Any]) -> float:
+    analyzer = FrequencyAnalyzer()
+    timer = Timer()
+    for inspections in synthetic.tracks(rows, seed):
+        with timer:
+            analyzer.analyze_state_pairs(inspections)
+    return timer.seconds
+
+def _bench_route_geojson(rows: int, seed: int, zoom: Optional[float]) -> float:
+    timer = Timer()
+    for inspections in synthetic.tracks(rows, seed):
+        routes = synthetic.route_dicts(inspections)
+        with timer:
+            GeoVisualizer.create_route_geojson(routes, zoom=zoom)
+    return timer.seconds
+
+def bench_route_geojson(rows: int, seed: int, options: Dict[str, Any]) -> float:
+    return _bench_route_geojson(rows, seed, None)
+
+def bench_route_geojson_simplified(rows: int, seed: int, options: Dict[str, Any]) -> float:
+    return _bench_route_geojson(rows, seed, 6)
+
+def bench_inspection_geojson(rows: int, seed: int, options: Dict[str, Any]) -> float:
+    timer = Timer()
+    for inspections in synthetic.tracks(rows, seed):
+        with timer:
+            GeoVisualizer.create_inspection_geojson(inspections)
+    return timer.seconds
+
+def bench_stream_feature_collection(rows: int, seed: int, options: Dict[str, Any]) -> float:
+    timer = Timer()
+    next_id = 0
+    for inspections in synthetic.tracks(rows, seed):
+        # Shaped like inspection_map_query rows
+        for inspection in inspections:
+            inspection['id'] = next_id
+            inspection['inspection_date'] = datetime.fromisoformat(inspection['inspection_date'])
+            next_id += 1
+        with timer:
+            for _ in GeoVisualizer.stream_feature_collection(
+                GeoVisualizer.inspection_feature(inspection) for inspection in inspections
+            ):
+                pass
+    return timer.seconds
+
+def _repository(options: Dict[str, Any]):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from src.database import models
+    from src.database.repository import CarrierRepository
+    from src.models.carrier import CarrierHistory
+
+    engine = options.get('engine')
+    if engine is None:
+        engine = options['engine'] = create_engine(options['database_url'])
+        # bulk_upsert_carriers records CarrierHistory snapshots as it writes
+        models.Base.metadata.create_all(
+            engine,
+            tables=[models.CarrierRecord.__table__, models.SafetyMetrics.__table__, CarrierHistory.__table__]
+        )
+    return CarrierRepository(sessionmaker(bind=engine)())
+
+def bench_upsert_carriers(rows: int, seed: int, options: Dict[str, Any]) -> float:
+    repository = _repository(options)
+    timer = Timer()
+    try:
+        for chunk in _batched(synthetic.fmcsa_payloads(rows, seed), CHUNK_SIZE):
+            with timer:
+                repository.bulk_upsert_carriers(payload for payload, _ in chunk)
+    finally:
+        repository.db.close()
+    return timer.seconds
+
+def bench_upsert_safety_metrics(rows: int, seed: int, options: Dict[str, Any]) -> float:
+    repository = _repository(options)
+    timer = Timer()
+    try:
+        for chunk in _batched(synthetic.fmcsa_payloads(rows, seed), CHUNK_SIZE):
+            payloads = {
+                payload['content']['carrier']['dotNumber']: payload
+                for payload, _ in chunk
+            }
+            # Metrics need their carrier rows; create any the carrier case did not
+            missing = set(payloads) - set(repository.get_carriers_by_dots(payloads))
+            if missing:
+                repository.bulk_upsert_carriers(payloads[dot] for dot in missing)
+            carriers = repository.get_carriers_by_dots(payloads)
+            metrics = [
+                (carriers[payload['content']['carrier']['dotNumber']].id, metrics)
+                for payload, metrics in chunk
+            ]
+            with timer:
+                repository.bulk_upsert_safety_metrics(metrics)
+    finally:
+        repository.db.close()
+    return timer.seconds
+
+def _cleanup(options: Dict[str, Any]) -> None:
+    from sqlalchemy import text
+    with options['engine'].begin() as connection:
+        # Leftover history would make the next run's carriers look unchanged
+        connection.execute(text(
+            "DELETE FROM carrier_history WHERE carrier_dot_number IN "
+            "(SELECT dot_number FROM carrier_records WHERE legal_name LIKE 'BENCHMARK CARRIER %')"
+        ))
+        connection.execute(text(
+            "DELETE FROM safety_metrics WHERE carrier_id IN "
+            "(SELECT id FROM carrier_records WHERE legal_name LIKE 'BENCHMARK CARRIER %')"
+        ))
+        connection.execute(text("DELETE FROM carrier_records WHERE legal_name LIKE 'BENCHMARK CARRIER %'"))
+    options['engine'].dispose()
+
+CASES: Dict[str, Callable[[int, int, Dict[str, Any]], float]] = {
+    'analyze_carrier_performance': bench_analyze_carrier_performance,
+    'analyze_fleet': bench_analyze_fleet,
+    'detect_patterns': bench_detect_patterns,
+    'analyze_state_pairs': bench_analyze_state_pairs,
+    'route_geojson': bench_route_geojson,
+    'route_geojson_simplified': bench_route_geojson_simplified,
+    'inspection_geojson': bench_inspection_geojson,
+    'stream_feature_collection': bench_stream_feature_collection,
+    'upsert_carriers': bench_upsert_carriers,
+    'upsert_safety_metrics': bench_upsert_safety_metrics,
+}
+DATABASE_CASES = ('upsert_carriers', 'upsert_safety_metrics')
+
+def run(cases: List[str], scale: str, seed: int, repeat: int, options: Dict[str, Any]) -> Dict[str, Any]:
+    rows = synthetic.parse_scale(scale)
+    results = {}
+    try:
+        for name in cases:
+            CASES[name](min(rows, WARMUP_ROWS), seed, options)
+            seconds = min(CASES[name](rows, seed, options) for _ in range(repeat))
+            results[name] = {
+                'seconds': round(seconds, 6),
+                'rows': rows,
+                'rows_per_second': round(rows / seconds, 1) if seconds else None
+            }
+            print(f"{name:<30} {seconds:10.4f} s  {rows / seconds if seconds else 0:14,.0f} rows/s")
+    finally:
+        if 'engine' in options:
+            _cleanup(options)
+
+    return {
+        'scale': scale,
+        'rows': rows,
+        'seed': seed,
+        'repeat': repeat,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': f"{platform.system()} {platform.machine()} ({os.cpu_count()} cpus)",
+        'cases': results
+    }
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Cases slower than their baseline by more than `threshold` (a fraction)"""
+    if baseline.get('seed') != report['seed']:
+        print(f"warning: baseline was recorded with seed {baseline.get('seed')}")
+    regressions = []
+    for name, result in report['cases'].items():
+        previous = baseline.get('cases', {}).get(name)
+        if previous is None or not previous['seconds']:
+            continue
+        change = result['seconds'] / previous['seconds'] - 1
+        marker = ''
+        if change > threshold:
+            regressions.append(name)
+            marker = '  REGRESSION'
+        print(f"{name:<30} {previous['seconds']:10.4f} s -> {result['seconds']:10.4f} s  ({change:+.1%}){marker}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('cases', nargs='*', help=f"cases to run (default: all); one of {', '.join(CASES)}")
+    parser.add_argument('--scale', default='1k', help="1k, 100k, 10m or a row count")
+    parser.add_argument('--seed', type=int, default=synthetic.DEFAULT_SEED)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='allowed slowdown against the baseline, as a fraction')
+    parser.add_argument('--database-url', default=os.getenv('BENCHMARK_DATABASE_URL'),
+                        help='PostgreSQL database for the upsert cases')
+    parser.add_argument('--baseline', help='baseline file (default: baselines/<scale>.json)')
+    parser.add_argument('--save-baseline', action='store_true', help='write the results as the new baseline')
+    parser.add_argument('--output', help='also write the results to this file')
+    args = parser.parse_args()
+
+    unknown = [name for name in args.cases if name not in CASES]
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(unknown)}")
+    cases = args.cases or list(CASES)
+    if not args.database_url:
+        skipped = [name for name in cases if name in DATABASE_CASES]
+        if skipped:
+            print(f"skipping {', '.join(skipped)}: no --database-url")
+        cases = [name for name in cases if name not in DATABASE_CASES]
+
+    report = run(cases, args.scale, args.seed, args.repeat, {'database_url': args.database_url})
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    baseline_path = args.baseline or os.path.join(BASELINE_DIR, f"{args.scale.lower()}.json")
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(baseline_path), exist_ok=True)
+        with open(baseline_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"baseline written to {baseline_path}")
+        return
+
+    if not os.path.exists(baseline_path):
+        print(f"no baseline at {baseline_path}; run with --save-baseline to record one")
+        return
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    regressions = compare(report, baseline, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} case(s) regressed by more than {args.threshold:.0%}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
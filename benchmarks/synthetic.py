@@ -0,0 +1,207 @@
+"""
+Deterministic synthetic carriers and inspection tracks.
+
+Everything is derived from a seed and a carrier index, so any slice of a
+scale can be regenerated on its own and the same seed always yields the
+same data. Tracks are generated carrier by carrier, which keeps the 10M
+scale within memory.
+"""
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+SCALES = {'1k': 1_000, '100k': 100_000, '10m': 10_000_000}
+DEFAULT_SEED = 20240101
+MEAN_TRACK_LENGTH = 200
+START_DATE = date(2022, 1, 1)
+TRACK_DAYS = 730
+# Carrier safety inputs are drawn this many carriers at a time (see carrier_columns)
+CARRIER_BLOCK = 4096
+
+# Terminal cities carriers shuttle between: (state, city, longitude, latitude)
+HUBS = [
+    ('TX', 'Dallas', -96.80, 32.78),
+    ('TX', 'Houston', -95.37, 29.76),
+    ('OK', 'Oklahoma City', -97.52, 35.47),
+    ('KS', 'Wichita', -97.34, 37.69),
+    ('MO', 'Kansas City', -94.58, 39.10),
+    ('IL', 'Chicago', -87.63, 41.88),
+    ('IN', 'Indianapolis', -86.16, 39.77),
+    ('OH', 'Columbus', -82.99, 39.96),
+    ('TN', 'Memphis', -90.05, 35.15),
+    ('GA', 'Atlanta', -84.39, 33.75),
+    ('CO', 'Denver', -104.99, 39.74),
+    ('AZ', 'Phoenix', -112.07, 33.45),
+    ('CA', 'Los Angeles', -118.24, 34.05),
+    ('PA', 'Harrisburg', -76.88, 40.27),
+]
+
+def parse_scale(scale: str) -> int:
+    """Row count for a named scale ('1k', '100k', '10m') or a plain integer"""
+    if scale.lower() in SCALES:
+        return SCALES[scale.lower()]
+    return int(scale)
+
+def _rng(seed: int, *stream: int) -> np.random.Generator:
+    return np.random.default_rng([seed, *stream])
+
+def _carrier_block(seed: int, block: int) -> Dict[str, np.ndarray]:
+    rng = _rng(seed, 0, block)
+    vehicles = rng.integers(1, 500, CARRIER_BLOCK)
+    return {
+        'fatal_crashes': (rng.random(CARRIER_BLOCK) < 0.03).astype(np.int64),
+        'crash_count': rng.poisson(vehicles * 0.25),
+        'vehicle_count': vehicles,
+        'driver_oos_rate': np.round(rng.gamma(2.0, 3.0, CARRIER_BLOCK), 2),
+        'vehicle_oos_rate': np.round(rng.gamma(4.0, 5.5, CARRIER_BLOCK), 2),
+    }
+
+def carrier_columns(count: int, seed: int = DEFAULT_SEED, offset: int = 0) -> Dict[str, np.ndarray]:
+    """
+    Safety inputs of carriers offset..offset+count as CarrierAnalysis FLEET_COLUMNS.
+
+    Values are drawn per CARRIER_BLOCK-aligned block of carrier indexes, so
+    a carrier's values do not depend on the offset and count it was asked
+    for with.
+    """
+    first = offset // CARRIER_BLOCK
+    last = max(first, (offset + count - 1) // CARRIER_BLOCK)
+    blocks = [_carrier_block(seed, block) for block in range(first, last + 1)]
+    start = offset - first * CARRIER_BLOCK
+    return {
+        name: np.concatenate([block[name] for block in blocks])[start:start + count]
+        for name in blocks[0]
+    }
+
+def carriers(count: int, seed: int = DEFAULT_SEED, chunk: int = 100_000) -> Iterator[Dict[str, Any]]:
+    """Per-carrier dicts as passed to CarrierAnalysis.analyze_carrier_performance"""
+    for offset in range(0, count, chunk):
+        columns = carrier_columns(min(chunk, count - offset), seed, offset)
+        names = list(columns)
+        for values in zip(*(columns[name].tolist() for name in names)):
+            yield dict(zip(names, values))
+
+FIRST_DOT_NUMBER = 90_000_000
+
+def _fmcsa_carrier(dot_number: str, carrier: Dict[str, Any]) -> Dict[str, Any]:
+    index = int(dot_number) - FIRST_DOT_NUMBER
+    return {
+        'dotNumber': dot_number,
+        'legalName': f"BENCHMARK CARRIER {index}",
+        'statusCode': 'A',
+        'allowedToOperate': 'Y',
+        'totalPowerUnits': carrier['vehicle_count'],
+        'totalDrivers': carrier['vehicle_count'] + index % 7,
+    }
+
+def _fmcsa_metrics(carrier: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'crashTotal': carrier['crash_count'],
+        'fatalCrash': carrier['fatal_crashes'],
+        'driverOosRate': carrier['driver_oos_rate'],
+        'vehicleOosRate': carrier['vehicle_oos_rate'],
+        'driverInsp': MEAN_TRACK_LENGTH,
+        'vehicleInsp': MEAN_TRACK_LENGTH,
+    }
+
+def fmcsa_payloads(count: int, seed: int = DEFAULT_SEED) -> Iterator[Tuple[dict, dict]]:
+    """(carrier payload, safety metrics) pairs shaped like FMCSA responses"""
+    for index, carrier in enumerate(carriers(count, seed)):
+        dot_number = str(FIRST_DOT_NUMBER + index)
+        yield {'content': {'carrier': _fmcsa_carrier(dot_number, carrier)}}, _fmcsa_metrics(carrier)
+
+def fmcsa_carrier_response(dot_number: str, seed: int = DEFAULT_SEED) -> Dict[str, Any]:
+    """
+    Body of /qc/services/carriers/{dot_number} for one synthetic carrier.
+
+    Generated from the DOT number alone, so a server can answer any
+    carrier without holding the whole scale in memory.
+    """
+    index = int(dot_number) - FIRST_DOT_NUMBER
+    columns = carrier_columns(1, seed, index)
+    carrier = {name: values.tolist()[0] for name, values in columns.items()}
+    return {
+        'content': {
+            'carrier': {**_fmcsa_carrier(dot_number, carrier), **_fmcsa_metrics(carrier)},
+            '_links': {'basics': {'href': f"/qc/services/carriers/{dot_number}/basics"}}
+        },
+        'retrievalDate': datetime.now().isoformat(timespec='seconds')
+    }
+
+def fmcsa_inspections(carrier_index: int, seed: int = DEFAULT_SEED, length: int = MEAN_TRACK_LENGTH) -> List[Dict[str, Any]]:
+    """A carrier's track as FMCSA inspection records (LocationProcessor input)"""
+    return [
+        {
+            'date': inspection['inspection_date'],
+            'state': inspection['state'],
+            'city': inspection['city'],
+            'latitude': inspection['latitude'],
+            'longitude': inspection['longitude'],
+            'level': 1 + number % 3,
+            'violations': [{'oos': number % 5 == 0}] * inspection['violation_count']
+        }
+        for number, inspection in enumerate(track(carrier_index, seed, length))
+    ]
+
+def track(carrier_index: int, seed: int = DEFAULT_SEED, length: int = MEAN_TRACK_LENGTH) -> List[Dict[str, Any]]:
+    """
+    Inspection dicts for one carrier, as passed to RoutePatternDetector.
+
+    A carrier runs lanes between two or three hubs, so inspections cluster
+    around those hubs and along the legs between them. Dates are uniform
+    over TRACK_DAYS and returned unsorted.
+    """
+    rng = _rng(seed, 1, carrier_index)
+    hubs = [HUBS[i] for i in rng.choice(len(HUBS), size=rng.integers(2, 4), replace=False)]
+    hub_coords = np.array([[hub[2], hub[3]] for hub in hubs])
+
+    origin = rng.integers(0, len(hubs), length)
+    destination = (origin + rng.integers(1, len(hubs), length)) % len(hubs)
+    # Most inspections happen near a terminal; the rest along the leg
+    progress = np.where(rng.random(length) < 0.7, rng.random(length) * 0.05, rng.random(length))
+    coords = hub_coords[origin] + (hub_coords[destination] - hub_coords[origin]) * progress[:, None]
+    coords += rng.normal(0.0, 0.05, coords.shape)
+    nearest = np.where(progress < 0.5, origin, destination)
+
+    days = rng.integers(0, TRACK_DAYS, length)
+    violations = rng.poisson(0.8, length)
+    return [
+        {
+            'inspection_date': (START_DATE + timedelta(days=day)).isoformat(),
+            'state': hubs[hub][0],
+            'city': hubs[hub][1],
+            'longitude': lon,
+            'latitude': lat,
+            'violation_count': count
+        }
+        for day, hub, (lon, lat), count in zip(
+            days.tolist(), nearest.tolist(), np.round(coords, 6).tolist(), violations.tolist()
+        )
+    ]
+
+def tracks(rows: int, seed: int = DEFAULT_SEED) -> Iterator[List[Dict[str, Any]]]:
+    """Carrier tracks totalling `rows` inspections"""
+    carrier_index = 0
+    while rows > 0:
+        length = min(rows, MEAN_TRACK_LENGTH)
+        yield track(carrier_index, seed, length)
+        rows -= length
+        carrier_index += 1
+
+def route_dicts(inspections: List[Dict[str, Any]], segment_length: int = 25) -> List[Dict[str, Any]]:
+    """RouteDicts for GeoVisualizer built from consecutive stretches of a track"""
+    ordered = sorted(inspections, key=lambda inspection: inspection['inspection_date'])
+    routes = []
+    for start in range(0, len(ordered) - 1, segment_length):
+        segment = ordered[start:start + segment_length]
+        if len(segment) < 2:
+            continue
+        routes.append({
+            'geometry': [[inspection['longitude'], inspection['latitude']] for inspection in segment],
+            'confidence_score': 0.5,
+            'inspection_count': len(segment),
+            'first_seen': date.fromisoformat(segment[0]['inspection_date']),
+            'last_seen': date.fromisoformat(segment[-1]['inspection_date'])
+        })
+    return routes
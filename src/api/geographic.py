@@ -1,12 +1,22 @@
 # geographic.py
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Path, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Any, Callable, Iterator, Optional
 import logging
+import orjson
 
-from ..services.location_service import LocationProcessor, RouteAnalyzer, CarrierGeographicAnalysis, GeoVisualizer
+from ..services.location_service import LocationProcessor, CarrierGeographicAnalysis
+from ..geographic.analysis import CarrierGeographicAnalysis as InspectionPatternAnalysis
+from ..geographic.services import RouteAnalyzer, inspection_map_query, route_features
+from ..geographic.visualization import GeoVisualizer
+from ..geographic.tiles import INDEX_ZOOM, get_tile
+from ..geographic.rollups import state_totals, state_pair_totals, most_frequent_pairs
 from ..database.models import CarrierRecord, CarrierRoute, InspectionLocation
-from ..database.database import get_db
+from ..database.database import SessionLocal, get_async_db
+from ..database.async_repository import AsyncCarrierRepository
 from ..repositories.carrier_repository import CarrierRepository
 
 # Ensure these functions are defined or imported
@@ -30,65 +40,83 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-@router.get("/carriers/{dot_number}/coverage")
-async def get_carrier_coverage(dot_number: str, db: Session = Depends(get_db)) -> Dict[str, Any]:
-    """Get carrier's geographic coverage analysis"""
-    carrier = db.query(CarrierRecord).filter(
-        CarrierRecord.dot_number == dot_number
-    ).first()
+# Endpoints take an AsyncSession. The geographic services are written
+# against a sync Session. AsyncSession.run_sync runs them on the event-loop
+# thread inside a greenlet: their queries are awaited, but any Python work
+# blocks every request on the worker, so it is only used for SQL-only
+# services. CPU-heavy ones (clustering, tile index builds, route
+# simplification) go through _in_threadpool on a sync session instead.
+
+def _with_session(fn: Callable[..., Any], *args: Any) -> Any:
+    db = SessionLocal()
+    try:
+        return fn(db, *args)
+    finally:
+        db.close()
+
+async def _in_threadpool(fn: Callable[..., Any], *args: Any) -> Any:
+    """Call fn(session, *args) on its own sync Session in the threadpool"""
+    return await run_in_threadpool(_with_session, fn, *args)
+
+async def _get_carrier(db: AsyncSession, dot_number: str) -> CarrierRecord:
+    carrier = await AsyncCarrierRepository(db).get_carrier_by_dot(dot_number)
     
     if not carrier:
         raise HTTPException(status_code=404, detail="Carrier not found")
+    return carrier
+
+@router.get("/carriers/{dot_number}/coverage")
+async def get_carrier_coverage(dot_number: str, db: AsyncSession = Depends(get_async_db)) -> Dict[str, Any]:
+    """Get carrier's geographic coverage analysis"""
+    carrier = await _get_carrier(db, dot_number)
     
-    analyzer = RouteAnalyzer(db)
-    coverage = analyzer.get_carrier_coverage(carrier.id)
+    coverage = await db.run_sync(
+        lambda session: RouteAnalyzer(session).get_carrier_coverage(carrier.id)
+    )
     
     return coverage
 
 @router.get("/carriers/{dot_number}/routes")
-async def get_carrier_routes(dot_number: str, db: Session = Depends(get_db)):
+async def get_carrier_routes(dot_number: str, db: AsyncSession = Depends(get_async_db)):
     """Get carrier's detected routes"""
-    carrier = db.query(CarrierRecord).filter(
-        CarrierRecord.dot_number == dot_number
-    ).first()
+    carrier = await _get_carrier(db, dot_number)
     
-    if not carrier:
-        raise HTTPException(status_code=404, detail="Carrier not found")
-    
-    routes = db.query(CarrierRoute).filter(
-        CarrierRoute.carrier_id == carrier.id
-    ).all()
+    routes = await db.run_sync(
+        lambda session: RouteAnalyzer(session).get_route_summaries(carrier.id)
+    )
     
     return {
         "route_count": len(routes),
         "routes": [
             {
-                "confidence": route.confidence_score,
-                "first_seen": route.first_seen,
-                "last_seen": route.last_seen,
-                "distance_miles": route.distance_miles
+                "confidence": route['confidence'],
+                "first_seen": route['first_seen'],
+                "last_seen": route['last_seen'],
+                "distance_miles": route['distance_miles']
             } for route in routes
         ]
     }
 
 @router.get("/carriers/{dot_number}/analytics")
-async def get_carrier_analytics(dot_number: str, db: Session = Depends(get_db)) -> Dict[str, Any]:
+async def get_carrier_analytics(dot_number: str, db: AsyncSession = Depends(get_async_db)) -> Dict[str, Any]:
     """Get carrier's geographic analytics"""
     try:
         logger.debug(f"Fetching carrier data for DOT: {dot_number}")
-        carrier = db.query(CarrierRecord).filter(
-            CarrierRecord.dot_number == dot_number
-        ).first()
+        carrier = await AsyncCarrierRepository(db).get_carrier_by_dot(dot_number)
         
         if not carrier:
             logger.error(f"Carrier {dot_number} not found")
             raise HTTPException(status_code=404, detail="Carrier not found")
         
-        analysis = CarrierGeographicAnalysis()
-        analytics = analysis.analyze(carrier)
+        # City counts and rollup lookups: SQL only
+        analytics = await db.run_sync(
+            lambda session: CarrierGeographicAnalysis().analyze(carrier)
+        )
         
         logger.debug(f"Analytics for carrier {dot_number}: {analytics}")
         return analytics
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error analyzing carrier {dot_number}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
@@ -96,7 +124,7 @@ async def get_carrier_analytics(dot_number: str, db: Session = Depends(get_db))
 @router.get("/carriers/{dot_number}/geographic-analysis")
 async def get_geographic_analysis(
     dot_number: str, 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Dict[str, Any]:
     """
     Get comprehensive geographic analysis for carrier
@@ -112,8 +140,9 @@ async def get_geographic_analysis(
         HTTPException: If carrier not found or analysis fails
     """
     try:
-        analyzer = CarrierGeographicAnalysis(db)
-        analysis = analyzer.analyze_carrier(dot_number)
+        analysis = await _in_threadpool(
+            lambda session: InspectionPatternAnalysis(session).analyze_carrier(dot_number)
+        )
         
         if "error" in analysis:
             raise HTTPException(
@@ -129,6 +158,8 @@ async def get_geographic_analysis(
             }
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -136,49 +167,150 @@ async def get_geographic_analysis(
         )
 
 @router.get("/carriers/{dot_number}/route-stats")
-async def get_route_statistics(dot_number: str, db: Session = Depends(get_db)):
+async def get_route_statistics(dot_number: str, db: AsyncSession = Depends(get_async_db)):
     """Get detailed statistics about carrier routes"""
-    analyzer = CarrierGeographicAnalysis(db)
-    analysis = analyzer.analyze_carrier(dot_number)
+    carrier = await _get_carrier(db, dot_number)
     
-    if "error" in analysis:
-        raise HTTPException(status_code=404, detail=analysis["error"])
+    # Detected routes and the state-pair rollup; neither reads raw inspections
+    routes = await db.run_sync(
+        lambda session: RouteAnalyzer(session).get_route_summaries(carrier.id)
+    )
+    state_pairs = await db.run_sync(state_pair_totals, carrier.id)
         
     return {
-        "route_patterns": analysis['geographic_analysis']['patterns'],
-        "state_coverage": len(analysis['geographic_analysis']['frequency_analysis']['state_pairs']),
-        "most_frequent_routes": analysis['geographic_analysis']['frequency_analysis']['most_frequent'],
-        "total_distance": sum(p['distance_miles'] for p in analysis['geographic_analysis']['patterns'])
+        "route_patterns": routes,
+        "state_coverage": len(state_pairs),
+        "most_frequent_routes": most_frequent_pairs(state_pairs),
+        "total_distance": sum(r['distance_miles'] or 0 for r in routes)
     }
 
+def _stream_map_data(
+    carrier_id: int,
+    data_version: int,
+    header: Dict[str, Any],
+    limit: Optional[int],
+    cursor: Optional[int],
+    zoom: Optional[float],
+    tolerance: Optional[float]
+) -> Iterator[bytes]:
+    # The request's session is closed before a streamed body is sent, so the
+    # generator holds its own for the server-side cursor
+    db = SessionLocal()
+    try:
+        page = {'count': 0, 'last_id': None}
+
+        def inspection_features():
+            rows = db.execute(
+                inspection_map_query(carrier_id, after=cursor, limit=limit).execution_options(yield_per=2000)
+            )
+            for row in rows:
+                page['count'] += 1
+                page['last_id'] = row.id
+                yield GeoVisualizer.inspection_feature(row._mapping)
+
+        yield (
+            b'{"carrier_info":' + orjson.dumps(header['carrier_info'])
+            + b',"stats":' + orjson.dumps(header['stats'])
+            + b',"routes":'
+        )
+        yield from GeoVisualizer.stream_feature_collection(
+            route_features(db, carrier_id, data_version, zoom, tolerance)
+        )
+        yield b',"inspections":'
+        yield from GeoVisualizer.stream_feature_collection(inspection_features())
+
+        next_cursor = page['last_id'] if limit and page['count'] == limit else None
+        yield b',"next_cursor":' + orjson.dumps(next_cursor) + b'}'
+    finally:
+        db.close()
+
 @router.get("/carriers/{dot_number}/map-data")
-async def get_carrier_map_data(dot_number: str, db: Session = Depends(get_db)):
-    """Get carrier data formatted for map visualization"""
-    analyzer = CarrierGeographicAnalysis(db)
-    visualizer = GeoVisualizer()
+async def get_carrier_map_data(
+    dot_number: str,
+    stream: bool = False,
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[int] = None,
+    zoom: Optional[float] = Query(None, ge=0, le=24),
+    tolerance: Optional[float] = Query(None, gt=0),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get carrier data formatted for map visualization
+
+    Inspections are paged with `limit` and `cursor` (the `next_cursor` of
+    the previous page). With `stream=true` the body is written feature by
+    feature from a server-side cursor instead of being built in memory.
+    Route geometry is simplified for `zoom`, or to an explicit `tolerance`
+    in degrees.
+    """
+    carrier = await _get_carrier(db, dot_number)
+    version = carrier.data_version or 0
     
-    # Get base analysis
-    analysis = analyzer.analyze_carrier(dot_number)
+    total_routes = (await db.execute(
+        select(func.count(CarrierRoute.id)).where(CarrierRoute.carrier_id == carrier.id)
+    )).scalar()
+    states = await db.run_sync(state_totals, carrier.id)
     
-    if ("error" in analysis):
-        raise HTTPException(status_code=404, detail=analysis["error"])
+    header = {
+        "carrier_info": {
+            "id": carrier.id,
+            "dot_number": carrier.dot_number,
+            "legal_name": carrier.legal_name,
+            "fleet_size": carrier.fleet_size
+        },
+        "stats": {
+            "total_routes": total_routes,
+            "total_inspections": sum(s['inspection_count'] for s in states.values()),
+            "state_frequency": await db.run_sync(state_pair_totals, carrier.id)
+        }
+    }
     
-    # Get routes and inspections
-    routes = db.query(CarrierRoute).filter(
-        CarrierRoute.carrier_id == analysis['carrier_info']['id']
-    ).all()
+    if stream:
+        return StreamingResponse(
+            _stream_map_data(carrier.id, version, header, limit, cursor, zoom, tolerance),
+            media_type="application/json"
+        )
     
-    inspections = db.query(InspectionLocation).filter(
-        InspectionLocation.carrier_id == analysis['carrier_info']['id']
-    ).all()
+    inspections = (await db.execute(inspection_map_query(carrier.id, after=cursor, limit=limit))).all()
+    routes = await _in_threadpool(
+        lambda session: list(route_features(session, carrier.id, version, zoom, tolerance))
+    )
     
     return {
-        "carrier_info": analysis['carrier_info'],
-        "routes": visualizer.create_route_geojson(routes),
-        "inspections": visualizer.create_inspection_geojson(inspections),
-        "stats": {
-            "total_routes": len(routes),
-            "total_inspections": len(inspections),
-            "state_frequency": analysis['geographic_analysis']['frequency_analysis']['state_pairs']
-        }
-    }
\ No newline at end of file
+        **header,
+        "routes": {
+            "type": "FeatureCollection",
+            "features": routes
+        },
+        "inspections": {
+            "type": "FeatureCollection",
+            "features": [GeoVisualizer.inspection_feature(row._mapping) for row in inspections]
+        },
+        "next_cursor": inspections[-1].id if limit and len(inspections) == limit else None
+    }
+
+@router.get("/carriers/{dot_number}/tiles/{z}/{x}/{y}")
+async def get_carrier_tile(
+    dot_number: str,
+    z: int = Path(..., ge=0, le=INDEX_ZOOM),
+    x: int = Path(..., ge=0),
+    y: int = Path(..., ge=0),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get one map tile of a carrier's inspection points
+
+    Low-zoom and dense tiles come back as cluster counts; tiles are cached
+    until the carrier's data version changes.
+    """
+    if x >= 2 ** z or y >= 2 ** z:
+        raise HTTPException(status_code=404, detail="Tile out of range")
+    
+    carrier = await _get_carrier(db, dot_number)
+    version = carrier.data_version or 0
+    
+    return Response(
+        content=await _in_threadpool(get_tile, carrier.id, version, z, x, y),
+        media_type="application/geo+json",
+        headers={"ETag": f'"{carrier.id}-{version}-{z}-{x}-{y}"'}
+    )
\ No newline at end of file
@@ -1,8 +1,22 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from ..utils import metrics
+from .metrics import MetricsMiddleware
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Imported here so startup does not pull in the clients and engines
+    from ..data.fmcsa_cache import close_async_fmcsa_client
+    from ..database.database import dispose_async_engine
+    await close_async_fmcsa_client()
+    await dispose_async_engine()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # CORS Configuration
 origins = [
@@ -18,6 +32,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost, so latency covers CORS handling too
+app.add_middleware(MetricsMiddleware)
+metrics.instrument_sqlalchemy()
+
 @app.get("/carriers/{dot_number}/analytics")
 async def get_carrier_analytics(dot_number: str):
     try:
@@ -64,4 +82,11 @@ async def health_check():
         headers={
             "Content-Type": "application/json"
         }
+    )
+
+@app.get("/api/metrics")
+async def get_metrics():
+    return PlainTextResponse(
+        metrics.REGISTRY.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
     )
\ No newline at end of file
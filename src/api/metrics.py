@@ -0,0 +1,87 @@
+import sys
+import time
+from typing import Iterable
+
+from ..utils import metrics
+
+# Package the app lives in ("src"), for looking up already-imported modules
+_ROOT = __name__.rsplit('.', 2)[0]
+
+class MetricsMiddleware:
+    """
+    Per-route latency plus the DB, FMCSA and section time of each request.
+
+    A plain ASGI middleware rather than BaseHTTPMiddleware: the request is
+    timed until its last body chunk is sent, which for streamed responses
+    is long after the endpoint returned.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        request = metrics.start_request()
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The route template, not the raw path, keeps label cardinality bounded
+            route = getattr(scope.get('route'), 'path', None) or 'unmatched'
+            metrics.finish_request(request, scope['method'], route, status, time.perf_counter() - started)
+
+def _loaded(module: str):
+    # Only report on modules the process has imported; a scrape should not
+    # pull in the geographic stack
+    return sys.modules.get(f"{_ROOT}.{module}")
+
+def collect_runtime() -> Iterable[metrics.Family]:
+    """Cache hit rates and connection pool state, read at scrape time"""
+    caches = []
+    geographic_cache = _loaded('geographic.cache')
+    if geographic_cache is not None:
+        caches.extend(geographic_cache.cache_stats().items())
+    fmcsa_cache = _loaded('data.fmcsa_cache')
+    if fmcsa_cache is not None and fmcsa_cache.cache_stats() is not None:
+        caches.append(('fmcsa', fmcsa_cache.cache_stats()))
+
+    if caches:
+        for stat in ('hits', 'stale_hits', 'misses'):
+            samples = [({'cache': name}, stats[stat]) for name, stats in caches if stat in stats]
+            if samples:
+                yield f"cache_{stat}_total", 'counter', f"Cache lookups answered as {stat.replace('_', ' ')}", samples
+        ratios = []
+        for name, stats in caches:
+            lookups = stats.get('hits', 0) + stats.get('stale_hits', 0) + stats.get('misses', 0)
+            if lookups:
+                ratios.append(({'cache': name}, (lookups - stats['misses']) / lookups))
+        if ratios:
+            yield 'cache_hit_ratio', 'gauge', 'Share of lookups served from cache since start', ratios
+
+    database = _loaded('database.database')
+    if database is not None:
+        pools = database.pool_stats()
+        for field, kind, help in (
+            ('checked_out', 'gauge', 'Connections in use'),
+            ('checked_in', 'gauge', 'Idle connections in the pool'),
+            ('overflow', 'gauge', 'Connections open beyond pool_size'),
+            ('checkouts', 'counter', 'Connection checkouts'),
+            ('waits', 'counter', 'Checkouts that waited for a free connection'),
+            ('wait_seconds', 'counter', 'Time spent waiting for a free connection'),
+            ('timeouts', 'counter', 'Checkouts that gave up after pool_timeout'),
+        ):
+            name = f"db_pool_{field}_total" if kind == 'counter' else f"db_pool_{field}"
+            yield name, kind, help, [({'pool': pool}, stats[field]) for pool, stats in pools.items()]
+
+metrics.REGISTRY.register_collector(collect_runtime)
@@ -1,23 +1,175 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from ..database.database import get_db
-from ..data.fmcsa_client import FMCSAClient
+import asyncio
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database.database import SessionLocal, get_async_db
+from ..database.async_repository import AsyncCarrierRepository
+from ..data.async_fmcsa_client import AsyncFMCSAClient
+from ..data.fmcsa_cache import get_async_fmcsa_client
+from ..repositories.carrier_repository import CarrierRepository, CARRIER_LIST_COLUMNS
+from ..repositories import carrier_export
+
+MAX_BATCH_SIZE = 10000
+MAX_PAGE_SIZE = 1000
+MAX_EXPORT_BATCH_SIZE = 50000
+# Lookups one batch may have in flight; the shared client allows 20 in
+# total, so single-carrier requests are never starved by a large batch
+BATCH_FMCSA_CONCURRENCY = 10
 
 router = APIRouter(
     prefix="/carriers",
     tags=["carriers"]
 )
 
+class BatchAnalysisRequest(BaseModel):
+    dot_numbers: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+def _ndjson(record: Dict[str, Any]) -> bytes:
+    return orjson.dumps(record, default=str) + b"\n"
+
+async def _stream_batch_analysis(
+    client: AsyncFMCSAClient,
+    stored: Dict[str, Dict[str, Any]],
+    misses: List[str]
+) -> AsyncIterator[bytes]:
+    # Stored carriers are ready immediately; FMCSA lookups are written in
+    # completion order so one slow carrier never holds back the rest
+    for dot_number, carrier_data in stored.items():
+        yield _ndjson({
+            "dot_number": dot_number,
+            "source": "database",
+            **client.analyze_carrier_data(carrier_data)
+        })
+    if not misses:
+        return
+
+    semaphore = asyncio.Semaphore(BATCH_FMCSA_CONCURRENCY)
+
+    async def fetch(dot_number: str):
+        async with semaphore:
+            return dot_number, await client.get_carrier_by_dot(dot_number)
+
+    tasks = [asyncio.create_task(fetch(dot_number)) for dot_number in misses]
+    try:
+        for task in asyncio.as_completed(tasks):
+            dot_number, carrier_data = await task
+            yield _ndjson({
+                "dot_number": dot_number,
+                "source": "fmcsa",
+                **client.analyze_carrier_data(carrier_data)
+            })
+    finally:
+        # The client disconnected or the stream failed; stop outstanding lookups
+        for task in tasks:
+            task.cancel()
+
+@router.get("")
+async def list_carriers(
+    after: Optional[int] = Query(None, description="id of the last carrier on the previous page"),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = Query(None, description="Comma-separated carrier columns"),
+    include: Optional[str] = Query(None, description="'safety_metrics' to add each carrier's metrics"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Page through stored carriers in id order
+
+    Pass the returned next_cursor as `after` to get the following page;
+    it is null on the last page.
+    """
+    columns = [name.strip() for name in fields.split(",") if name.strip()] if fields else CARRIER_LIST_COLUMNS
+    includes = {name.strip() for name in include.split(",") if name.strip()} if include else set()
+    if includes - {"safety_metrics"}:
+        raise HTTPException(status_code=400, detail=f"Cannot include: {', '.join(sorted(includes - {'safety_metrics'}))}")
+
+    try:
+        carriers = await db.run_sync(
+            lambda session: CarrierRepository(session).list_carriers(
+                after, limit, columns, include_safety_metrics="safety_metrics" in includes
+            )
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "carriers": carriers,
+        "next_cursor": carriers[-1]["id"] if len(carriers) == limit else None
+    }
+
+def _stream_export(columns: List[str], format: str, batch_size: int) -> Iterator[bytes]:
+    # The request's session is closed before a streamed body is sent, so the
+    # generator holds its own for the server-side cursor
+    db = SessionLocal()
+    try:
+        yield from carrier_export.export_carriers(db, columns, format, batch_size)
+    finally:
+        db.close()
+
+@router.get("/export")
+def export_carriers(
+    format: str = Query("csv", pattern="^(csv|parquet)$"),
+    fields: Optional[str] = Query(None, description="Comma-separated carrier columns"),
+    batch_size: int = Query(carrier_export.DEFAULT_BATCH_SIZE, ge=100, le=MAX_EXPORT_BATCH_SIZE)
+):
+    """
+    Download every stored carrier as CSV or Parquet
+
+    Rows are streamed from a server-side cursor batch_size at a time, so
+    the export never holds the whole table in memory.
+    """
+    columns = [name.strip() for name in fields.split(",") if name.strip()] if fields else None
+    try:
+        columns = carrier_export.export_columns(columns)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return StreamingResponse(
+        _stream_export(columns, format, batch_size),
+        media_type=carrier_export.EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="carriers.{format}"'}
+    )
+
+@router.post("/analysis/batch")
+async def analyze_carriers_batch(
+    request: BatchAnalysisRequest,
+    db: AsyncSession = Depends(get_async_db),
+    client: AsyncFMCSAClient = Depends(get_async_fmcsa_client)
+):
+    """
+    Analyze up to MAX_BATCH_SIZE carriers, streamed as NDJSON
+
+    Each line is one carrier's analysis (or error) tagged with its
+    dot_number and whether it came from the database or FMCSA.
+    """
+    dot_numbers = list(dict.fromkeys(dot.strip() for dot in request.dot_numbers if dot.strip()))
+
+    # Carriers stored with a fresh FMCSA response are analyzed without a lookup
+    carriers = await AsyncCarrierRepository(db).get_carriers_by_dots(dot_numbers)
+    stored = {
+        dot_number: carrier.raw_data
+        for dot_number, carrier in carriers.items()
+        if carrier.raw_data and carrier.is_data_fresh()
+    }
+    misses = [dot_number for dot_number in dot_numbers if dot_number not in stored]
+
+    return StreamingResponse(
+        _stream_batch_analysis(client, stored, misses),
+        media_type="application/x-ndjson"
+    )
+
 @router.get("/{dot_number}/analysis")
 async def analyze_carrier(
     dot_number: str, 
-    db: Session = Depends(get_db)
+    client: AsyncFMCSAClient = Depends(get_async_fmcsa_client)
 ):
     try:
-        client = FMCSAClient()
         # Add debug print
         print(f"Analyzing carrier {dot_number}")
-        carrier = client.get_carrier_by_dot(dot_number, db)
+        carrier = await client.get_carrier_by_dot(dot_number)
         
         if not carrier:
             raise HTTPException(
@@ -25,17 +177,19 @@ async def analyze_carrier(
                 detail=f"Carrier {dot_number} not found"
             )
         
-        return client.get_carrier_analysis(carrier)
+        return client.analyze_carrier_data(carrier)
     except Exception as e:
         print(f"Error: {str(e)}")  # Debug print
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/{dot_number}")
-async def get_carrier(dot_number: str, db: Session = Depends(get_db)):
+async def get_carrier(
+    dot_number: str,
+    client: AsyncFMCSAClient = Depends(get_async_fmcsa_client)
+):
     try:
-        client = FMCSAClient()
         print(f"Getting carrier data for DOT: {dot_number}")  # Debug print
-        carrier = client.get_carrier_by_dot(dot_number)  # Removed db parameter
+        carrier = await client.get_carrier_by_dot(dot_number)
         if not carrier:
             raise HTTPException(status_code=404, detail=f"Carrier {dot_number} not found")
         return carrier
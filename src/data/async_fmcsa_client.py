@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Dict, Any, Iterable, Optional
+
+import httpx
+
+from ..config import get_settings
+from ..utils import metrics
+from .fmcsa_client import FMCSA_BASE_URL, CarrierAnalysisMixin
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+class TokenBucket:
+    """Client-side rate limiter: `rate` requests per second, bursting to `capacity`"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+class AsyncFMCSAClient(CarrierAnalysisMixin):
+    """
+    Pooled asyncio FMCSA client.
+
+    One keep-alive connection pool is shared by every request; concurrency
+    is bounded by a semaphore and throughput by a token bucket. Transient
+    failures (connection errors, timeouts, 429 and 5xx) are retried with
+    exponential backoff and jitter. Responses use the same shape as
+    FMCSAClient, including {"error": ...} dicts on failure.
+
+    Use as an async context manager so the pool is closed:
+
+        async with AsyncFMCSAClient(max_concurrency=20) as client:
+            carriers = await client.get_carriers_by_dot_many(dot_numbers)
+    """
+
+    def __init__(
+        self,
+        base_url: str = FMCSA_BASE_URL,
+        webkey: Optional[str] = None,
+        max_concurrency: int = 20,
+        rate_limit: float = 20.0,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        timeout: float = 10.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.base_url = base_url
+        self.webkey = webkey or get_settings().webkey
+        if not self.webkey:
+            raise ValueError("webkey not found in settings")
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._bucket = TokenBucket(rate_limit)
+        self._client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=max_concurrency
+            ),
+            transport=transport
+        )
+
+    async def __aenter__(self) -> 'AsyncFMCSAClient':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+    async def get_carrier_by_dot(self, dot_number: str) -> Dict[str, Any]:
+        """Get carrier data by DOT number"""
+        url = f"{self.base_url}/services/carriers/{dot_number}"
+        return await self._make_request(url)
+
+    async def search_carriers_by_name(self, name: str) -> Dict[str, Any]:
+        url = f"{self.base_url}/services/carriers/name/{name}"
+        return await self._make_request(url)
+
+    async def get_carrier_analysis(self, dot_number: str) -> Dict[str, Any]:
+        return self.analyze_carrier_data(await self.get_carrier_by_dot(dot_number))
+
+    async def get_carriers_by_dot_many(self, dot_numbers: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Look up many DOT numbers concurrently.
+
+        Returns:
+            Dict mapping each distinct DOT number to its response (or error dict)
+        """
+        unique = list(dict.fromkeys(str(dot) for dot in dot_numbers))
+        started = time.monotonic()
+        responses = await asyncio.gather(*(self.get_carrier_by_dot(dot) for dot in unique))
+        elapsed = time.monotonic() - started
+        logger.info(f"Fetched {len(unique)} carriers in {elapsed:.1f}s")
+        return dict(zip(unique, responses))
+
+    async def _make_request(self, url: str) -> Dict[str, Any]:
+        async with self._semaphore:
+            try:
+                response = await self._get(url)
+                if response.status_code != 200:
+                    return {
+                        "error": f"Request failed with status {response.status_code}",
+                        "raw_text": response.text
+                    }
+
+                data = response.json()
+                if data.get("content"):
+                    return data
+
+                # Try another request format if content is null
+                response = await self._get(url.replace("/services", ""))
+                return response.json()
+            except Exception as e:
+                logger.warning(f"Request error for {url}: {str(e)}")
+                return {"error": str(e)}
+
+    async def _get(self, url: str) -> httpx.Response:
+        """GET with rate limiting and retry on transient failures"""
+        params = {"webKey": self.webkey}
+        attempt = 0
+        while True:
+            await self._bucket.acquire()
+            started = time.perf_counter()
+            try:
+                response = await self._client.get(url, params=params)
+                metrics.record_fmcsa_call(time.perf_counter() - started, str(response.status_code))
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+                delay = self._retry_delay(attempt, response.headers.get("Retry-After"))
+            except httpx.TransportError:
+                metrics.record_fmcsa_call(time.perf_counter() - started, "error")
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._retry_delay(attempt)
+
+            attempt += 1
+            logger.debug(f"Retrying {url} in {delay:.2f}s (attempt {attempt})")
+            await asyncio.sleep(delay)
+
+    def _retry_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        return self.backoff_base * (2 ** attempt) * (0.5 + random.random())
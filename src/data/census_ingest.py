@@ -0,0 +1,244 @@
+"""
+Stream the FMCSA company census CSV into carrier_records / safety_metrics.
+
+    python -m src.data.census_ingest FMCSA_CENSUS1_2024Oct.txt --chunk-size 20000
+
+Rows flow through a generator pipeline (read -> skip -> map -> chunk) and
+each chunk is COPY-loaded and committed together with a checkpoint, so
+memory stays constant and an interrupted run resumes where it stopped.
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..database.database import SessionLocal
+from ..database.repository import CarrierRepository
+
+logger = logging.getLogger(__name__)
+
+# CarrierRecord column -> census column
+CARRIER_COLUMNS = {
+    'dot_number': 'DOT_NUMBER',
+    'legal_name': 'LEGAL_NAME',
+    'dba_name': 'DBA_NAME',
+    'operating_status': 'STATUS_CODE',
+    'fleet_size': 'NBR_POWER_UNIT',
+    'driver_count': 'DRIVER_TOTAL',
+    'safety_rating': 'SAFETY_RATING',
+    'safety_rating_date': 'SAFETY_RATING_DATE',
+    'address': 'PHY_STREET',
+    'city': 'PHY_CITY',
+    'state': 'PHY_STATE',
+    'zip_code': 'PHY_ZIP',
+}
+# Census column, when present, matching the API's allowedToOperate
+ALLOWED_TO_OPERATE = 'ALLOWED_TO_OPERATE'
+
+# SafetyMetrics column -> census column. Only columns present in the file
+# header are loaded; files without any of them skip safety_metrics.
+SAFETY_METRIC_COLUMNS = {
+    'crash_total': 'CRASH_TOTAL',
+    'fatal_crashes': 'FATAL_CRASH',
+    'injury_crashes': 'INJ_CRASH',
+    'tow_crashes': 'TOW_CRASH',
+    'driver_inspections': 'DRIVER_INSP_TOTAL',
+    'vehicle_inspections': 'VEHICLE_INSP_TOTAL',
+    'hazmat_inspections': 'HAZMAT_INSP_TOTAL',
+    'driver_oos_rate': 'DRIVER_OOS_RATE',
+    'vehicle_oos_rate': 'VEHICLE_OOS_RATE',
+    'hazmat_oos_rate': 'HAZMAT_OOS_RATE',
+}
+
+INTEGER_COLUMNS = {
+    'fleet_size', 'driver_count', 'crash_total', 'fatal_crashes', 'injury_crashes',
+    'tow_crashes', 'driver_inspections', 'vehicle_inspections', 'hazmat_inspections'
+}
+FLOAT_COLUMNS = {'driver_oos_rate', 'vehicle_oos_rate', 'hazmat_oos_rate'}
+DATE_COLUMNS = {'safety_rating_date'}
+DATE_FORMATS = ('%Y%m%d', '%d-%b-%y', '%Y-%m-%d', '%m/%d/%Y')
+
+def _parse_value(column: str, raw: Optional[str]) -> Any:
+    value = (raw or '').strip()
+    if not value:
+        return None
+    try:
+        if column in INTEGER_COLUMNS:
+            return int(float(value))
+        if column in FLOAT_COLUMNS:
+            return float(value)
+    except ValueError:
+        return None
+    if column in DATE_COLUMNS:
+        for fmt in DATE_FORMATS:
+            try:
+                return datetime.strptime(value, fmt)
+            except ValueError:
+                continue
+        return None
+    return value
+
+def read_census_rows(path: str, encoding: str = 'latin-1') -> Iterator[Dict[str, str]]:
+    """Yield census rows one at a time as dicts keyed by header"""
+    with open(path, newline='', encoding=encoding) as f:
+        yield from csv.DictReader(f)
+
+def skip_rows(rows: Iterable[Dict[str, str]], count: int) -> Iterator[Dict[str, str]]:
+    return islice(rows, count, None)
+
+def map_rows(
+    rows: Iterable[Dict[str, str]],
+    loaded_at: datetime
+) -> Iterator[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]:
+    """Yield (carrier columns, safety metric columns or None) per census row"""
+    for row in rows:
+        carrier = {
+            column: _parse_value(column, row.get(source))
+            for column, source in CARRIER_COLUMNS.items()
+        }
+        if not carrier['dot_number']:
+            continue
+        # Same rules as the FMCSA API path (CarrierRepository._carrier_values),
+        # so a carrier's flags do not depend on which ingest wrote it last
+        carrier['is_active'] = carrier['operating_status'] == 'A'
+        if ALLOWED_TO_OPERATE in row:
+            carrier['allowed_to_operate'] = (row[ALLOWED_TO_OPERATE] or '').strip().upper() == 'Y'
+        else:
+            # Census extracts without the flag: only active carriers may operate
+            carrier['allowed_to_operate'] = carrier['is_active']
+        carrier['census_loaded_at'] = loaded_at
+        carrier['created_at'] = loaded_at
+        carrier['updated_at'] = loaded_at
+
+        metrics = None
+        present = {column: source for column, source in SAFETY_METRIC_COLUMNS.items() if source in row}
+        if present:
+            metrics = {
+                column: _parse_value(column, row[source])
+                for column, source in present.items()
+            }
+            metrics['dot_number'] = carrier['dot_number']
+            metrics['record_date'] = loaded_at
+        yield carrier, metrics
+
+def chunked(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+class Checkpoint:
+    """Rows committed so far for one input file, kept next to it on disk"""
+
+    def __init__(self, path: str, source: str):
+        self.path = path
+        self.source = os.path.abspath(source)
+        self.rows_done = 0
+        if os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            if state.get('source') == self.source and state.get('size') == os.path.getsize(source):
+                self.rows_done = state['rows_done']
+            else:
+                logger.warning(f"Ignoring checkpoint {path}: written for a different file")
+
+    def save(self, rows_done: int) -> None:
+        self.rows_done = rows_done
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'source': self.source,
+                'size': os.path.getsize(self.source),
+                'rows_done': rows_done,
+                'updated_at': datetime.utcnow().isoformat()
+            }, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+def ingest_census(
+    db: Session,
+    path: str,
+    chunk_size: int = 20000,
+    checkpoint_path: Optional[str] = None,
+    encoding: str = 'latin-1'
+) -> Dict[str, Any]:
+    """
+    Load a census file into carrier_records and safety_metrics.
+
+    Each chunk is written and committed in one transaction; the checkpoint
+    is advanced after every commit, so re-running after an interruption
+    resumes from the last committed chunk.
+
+    Returns:
+        Dict with rows processed, elapsed seconds and rows/sec
+    """
+    repository = CarrierRepository(db)
+    checkpoint = Checkpoint(checkpoint_path or f"{path}.checkpoint", path)
+    if checkpoint.rows_done:
+        logger.info(f"Resuming {path} after {checkpoint.rows_done} rows")
+
+    rows_done = checkpoint.rows_done
+    processed = 0
+    started = time.monotonic()
+
+    rows = skip_rows(read_census_rows(path, encoding), checkpoint.rows_done)
+    for chunk in chunked(rows, chunk_size):
+        mapped = list(map_rows(chunk, datetime.utcnow()))
+        carriers = [carrier for carrier, _ in mapped]
+        metrics = [m for _, m in mapped if m is not None]
+
+        # updated_at is only set on new rows: it dates the carrier's FMCSA
+        # refreshes, and census loads are tracked in census_loaded_at
+        repository.copy_upsert_carrier_rows(
+            carriers,
+            list(CARRIER_COLUMNS) + ['is_active', 'allowed_to_operate', 'census_loaded_at', 'created_at', 'updated_at'],
+            insert_only=['updated_at']
+        )
+        if metrics:
+            metric_columns = [column for column in metrics[0] if column != 'dot_number']
+            repository.copy_upsert_safety_metric_rows(metrics, metric_columns)
+        db.commit()
+
+        rows_done += len(chunk)
+        processed += len(chunk)
+        checkpoint.save(rows_done)
+
+        elapsed = time.monotonic() - started
+        logger.info(f"{rows_done} rows loaded ({processed / elapsed:,.0f} rows/sec)")
+
+    elapsed = time.monotonic() - started
+    checkpoint.clear()
+    return {
+        'rows_processed': processed,
+        'rows_total': rows_done,
+        'elapsed_seconds': round(elapsed, 1),
+        'rows_per_second': round(processed / elapsed, 1) if elapsed else 0.0
+    }
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Load the FMCSA census CSV into carrier_records")
+    parser.add_argument('path', help="Census CSV file")
+    parser.add_argument('--chunk-size', type=int, default=20000)
+    parser.add_argument('--checkpoint', help="Checkpoint file (default: <path>.checkpoint)")
+    parser.add_argument('--encoding', default='latin-1')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    db = SessionLocal()
+    try:
+        stats = ingest_census(db, args.path, args.chunk_size, args.checkpoint, args.encoding)
+    finally:
+        db.close()
+    print(json.dumps(stats))
+
+if __name__ == "__main__":
+    main()
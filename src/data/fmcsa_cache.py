@@ -0,0 +1,375 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Any, Awaitable, Callable, Optional
+
+from ..config import get_settings
+from .fmcsa_client import FMCSA_BASE_URL, FMCSAClient
+from .async_fmcsa_client import AsyncFMCSAClient
+
+logger = logging.getLogger(__name__)
+
+# Same window CarrierRecord.is_data_fresh() uses for stored carriers
+FRESH_TTL = 24 * 60 * 60
+STALE_TTL = 6 * 24 * 60 * 60
+NEGATIVE_TTL = 60 * 60
+
+@dataclass
+class CacheEntry:
+    value: Any
+    fresh_until: float
+    stale_until: float
+
+class DiskCache:
+    """Optional second tier: a single SQLite file shared across restarts"""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS fmcsa_cache ("
+            "key TEXT PRIMARY KEY, value TEXT, fresh_until REAL, stale_until REAL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, fresh_until, stale_until FROM fmcsa_cache WHERE key = ?",
+                (key,)
+            ).fetchone()
+        if row is None or row[2] <= time.time():
+            return None
+        return CacheEntry(json.loads(row[0]), row[1], row[2])
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO fmcsa_cache VALUES (?, ?, ?, ?)",
+                (key, json.dumps(entry.value), entry.fresh_until, entry.stale_until)
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM fmcsa_cache WHERE stale_until <= ?", (time.time(),)
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+class TieredCache:
+    """
+    In-memory LRU with TTL, backed by an optional DiskCache.
+
+    Each entry is fresh for `fresh_ttl` seconds and may then be served stale
+    for another `stale_ttl` seconds while a background refresh runs.
+    Concurrent loads of the same key are coalesced into a single call.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        fresh_ttl: float = FRESH_TTL,
+        stale_ttl: float = STALE_TTL,
+        negative_ttl: float = NEGATIVE_TTL,
+        disk_path: Optional[str] = None,
+        refresh_workers: int = 4
+    ):
+        self.max_entries = max_entries
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+        self.disk = DiskCache(disk_path) if disk_path else None
+        self.stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'loads': 0}
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._async_inflight: Dict[str, asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=refresh_workers, thread_name_prefix="fmcsa-cache-refresh"
+        )
+
+    def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Any],
+        classify: Callable[[Any], Optional[bool]]
+    ) -> Any:
+        """
+        Return the cached value for `key`, calling `loader` on a miss.
+
+        `classify(value)` decides how a loaded value is stored: True for a
+        normal entry, False for a negative entry (short TTL, never served
+        stale) and None to not cache it at all (e.g. transient errors).
+        """
+        entry = self._lookup(key)
+        now = time.time()
+
+        if entry and now < entry.fresh_until:
+            self._count('hits')
+            return entry.value
+
+        if entry and now < entry.stale_until:
+            self._count('stale_hits')
+            self._refresh_in_background(key, loader, classify)
+            return entry.value
+
+        self._count('misses')
+        return self._load(key, loader, classify)
+
+    async def aget_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        classify: Callable[[Any], Optional[bool]]
+    ) -> Any:
+        """
+        get_or_load for coroutine loaders; refreshes and coalescing run on
+        the event loop, disk-tier reads and writes in a worker thread
+        """
+        entry = self._memory_lookup(key)
+        if entry is None and self.disk:
+            entry = await asyncio.to_thread(self._disk_lookup, key)
+        now = time.time()
+
+        if entry and now < entry.fresh_until:
+            self._count('hits')
+            return entry.value
+
+        if entry and now < entry.stale_until:
+            self._count('stale_hits')
+            if key not in self._async_inflight:
+                task = asyncio.ensure_future(self._aload(key, loader, classify))
+                task.add_done_callback(self._log_refresh_error)
+            return entry.value
+
+        self._count('misses')
+        return await self._aload(key, loader, classify)
+
+    def set(self, key: str, value: Any, negative: bool = False) -> None:
+        now = time.time()
+        if negative:
+            entry = CacheEntry(value, now + self.negative_ttl, now + self.negative_ttl)
+        else:
+            entry = CacheEntry(value, now + self.fresh_ttl, now + self.fresh_ttl + self.stale_ttl)
+        self._store(key, entry)
+        if self.disk:
+            self.disk.set(key, entry)
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.disk:
+            self.disk.set(key, CacheEntry(None, 0, 0))
+
+    def close(self) -> None:
+        """Stop background refreshes and close the disk tier (application shutdown)"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        if self.disk:
+            self.disk.close()
+
+    def _lookup(self, key: str) -> Optional[CacheEntry]:
+        entry = self._memory_lookup(key)
+        if entry is None and self.disk:
+            entry = self._disk_lookup(key)
+        return entry
+
+    def _memory_lookup(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.stale_until > time.time():
+                    self._entries.move_to_end(key)
+                    return entry
+                del self._entries[key]
+        return None
+
+    def _disk_lookup(self, key: str) -> Optional[CacheEntry]:
+        entry = self.disk.get(key)
+        if entry is not None:
+            self._store(key, entry)
+        return entry
+
+    def _store(self, key: str, entry: CacheEntry) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _load(self, key: str, loader: Callable[[], Any], classify: Callable[[Any], Optional[bool]]) -> Any:
+        """Run `loader` once per key no matter how many callers are waiting"""
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+
+        if not owner:
+            return future.result()
+
+        try:
+            self._count('loads')
+            value = loader()
+            kind = classify(value)
+            if kind is not None:
+                self.set(key, value, negative=not kind)
+            future.set_result(value)
+            return value
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    async def _aload(self, key: str, loader: Callable[[], Awaitable[Any]], classify: Callable[[Any], Optional[bool]]) -> Any:
+        task = self._async_inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._run_aload(key, loader, classify))
+            self._async_inflight[key] = task
+        # A cancelled caller must not cancel the load other callers are awaiting
+        return await asyncio.shield(task)
+
+    async def _run_aload(self, key: str, loader: Callable[[], Awaitable[Any]], classify: Callable[[Any], Optional[bool]]) -> Any:
+        try:
+            self._count('loads')
+            value = await loader()
+            kind = classify(value)
+            if kind is not None:
+                if self.disk:
+                    await asyncio.to_thread(self.set, key, value, not kind)
+                else:
+                    self.set(key, value, negative=not kind)
+            return value
+        finally:
+            self._async_inflight.pop(key, None)
+
+    def _refresh_in_background(self, key: str, loader: Callable[[], Any], classify: Callable[[Any], Optional[bool]]) -> None:
+        with self._lock:
+            if key in self._inflight:
+                return
+        future = self._executor.submit(self._load, key, loader, classify)
+        future.add_done_callback(self._log_refresh_error)
+
+    @staticmethod
+    def _log_refresh_error(future: Future) -> None:
+        if future.exception():
+            logger.warning(f"Background refresh failed: {future.exception()}")
+
+    def _count(self, stat: str) -> None:
+        with self._lock:
+            self.stats[stat] += 1
+
+def classify_fmcsa_response(response: Dict[str, Any]) -> Optional[bool]:
+    """Cache hits normally, unknown carriers negatively and errors not at all"""
+    if not isinstance(response, dict) or response.get("error"):
+        return None
+    return bool(response.get("content"))
+
+class CachedFMCSAClient(FMCSAClient):
+    """FMCSAClient whose lookups are served from a TieredCache"""
+
+    def __init__(self, cache: Optional[TieredCache] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = cache or TieredCache()
+
+    def get_carrier_by_dot(self, dot_number: str) -> Dict[str, Any]:
+        """Get carrier data by DOT number"""
+        return self.cache.get_or_load(
+            f"dot:{dot_number}",
+            lambda: super(CachedFMCSAClient, self).get_carrier_by_dot(dot_number),
+            classify_fmcsa_response
+        )
+
+    def search_carriers_by_name(self, name: str) -> Dict[str, Any]:
+        return self.cache.get_or_load(
+            f"name:{name.strip().lower()}",
+            lambda: super(CachedFMCSAClient, self).search_carriers_by_name(name),
+            classify_fmcsa_response
+        )
+
+class CachedAsyncFMCSAClient(AsyncFMCSAClient):
+    """AsyncFMCSAClient whose lookups are served from a TieredCache"""
+
+    def __init__(self, cache: Optional[TieredCache] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = cache or TieredCache()
+
+    async def get_carrier_by_dot(self, dot_number: str) -> Dict[str, Any]:
+        """Get carrier data by DOT number"""
+        return await self.cache.aget_or_load(
+            f"dot:{dot_number}",
+            lambda: super(CachedAsyncFMCSAClient, self).get_carrier_by_dot(dot_number),
+            classify_fmcsa_response
+        )
+
+    async def search_carriers_by_name(self, name: str) -> Dict[str, Any]:
+        return await self.cache.aget_or_load(
+            f"name:{name.strip().lower()}",
+            lambda: super(CachedAsyncFMCSAClient, self).search_carriers_by_name(name),
+            classify_fmcsa_response
+        )
+
+_client: Optional[CachedFMCSAClient] = None
+_client_lock = threading.Lock()
+
+def get_fmcsa_client() -> CachedFMCSAClient:
+    """Process-wide cached client, usable as a FastAPI dependency"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                settings = get_settings()
+                _client = CachedFMCSAClient(
+                    cache=TieredCache(disk_path=settings.fmcsa_cache_path),
+                    base_url=settings.fmcsa_base_url or FMCSA_BASE_URL
+                )
+    return _client
+
+def cache_stats() -> Optional[Dict[str, int]]:
+    """Counters of the shared clients' cache, if it has been created"""
+    if _client is None:
+        return None
+    return dict(_client.cache.stats)
+
+_async_client: Optional[CachedAsyncFMCSAClient] = None
+
+def get_async_fmcsa_client() -> CachedAsyncFMCSAClient:
+    """
+    Process-wide pooled async client, usable as a FastAPI dependency.
+
+    Shares its TieredCache with get_fmcsa_client(), so sync and async
+    callers see the same cached responses.
+    """
+    global _async_client
+    if _async_client is None:
+        client = get_fmcsa_client()
+        _async_client = CachedAsyncFMCSAClient(cache=client.cache, base_url=client.base_url)
+    return _async_client
+
+async def close_async_fmcsa_client() -> None:
+    """
+    Close the shared clients' connection pools and their cache's refresh
+    executor and disk tier (application shutdown)
+    """
+    global _async_client, _client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
+    if _client is not None:
+        _client.session.close()
+        _client.cache.close()
+        _client = None
\ No newline at end of file
@@ -1,64 +1,40 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import asyncio
 import logging
-from typing import Dict, Any
+import time
+from typing import Dict, Any, Iterable
 import os
 from sqlalchemy.orm import Session
-from ..config import settings
+from ..config import get_settings
 from ..database.repository import CarrierRepository
 from ..models.carrier_analysis import CarrierProfile
+from ..utils import metrics
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-class FMCSAClient:
-    def __init__(self):
-        self.base_url = "https://mobile.fmcsa.dot.gov/qc"
-        if not settings.webkey:
-            raise ValueError("webkey not found in settings")
-        self.webkey = settings.webkey
+FMCSA_BASE_URL = "https://mobile.fmcsa.dot.gov/qc"
 
-    def get_carrier_by_dot(self, dot_number: str) -> Dict[str, Any]:
-        """Get carrier data by DOT number"""
-        url = f"{self.base_url}/services/carriers/{dot_number}"
-        print(f"Requesting URL: {url}")  # Debug print
-        return self._make_request(url)
-
-    def search_carriers_by_name(self, name: str) -> Dict[str, Any]:
-        url = f"{self.base_url}/services/carriers/name/{name}"
-        return self._make_request(url)
-    
-    def _make_request(self, url: str) -> Dict[str, Any]:
-        params = {
-            "webKey": self.webkey
-        }
-
-        print(f"Making request to: {url}")
-        print(f"With params: {params}")
+class CarrierAnalysisMixin:
+    """Risk assessment and recommendations for FMCSA carrier responses"""
 
+    def analyze_carrier_data(self, carrier_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Analyze an FMCSA carrier response that has already been fetched"""
         try:
-            response = requests.get(url, params=params)
-            print(f"Response status: {response.status_code}")
-            print(f"Full URL: {response.url}")
-
-            if response.status_code == 200:
-                data = response.json()
-                if data.get("content"):
-                    return data
-                else:
-                    # Try another request format if content is null
-                    alternate_url = url.replace("/services", "")
-                    print(f"Trying alternate URL: {alternate_url}")
-                    response = requests.get(alternate_url, params=params)
-                    return response.json()
-            else:
-                return {
-                    "error": f"Request failed with status {response.status_code}",
-                    "raw_text": response.text
-                }
-
+            if carrier_data.get('error'):
+                return carrier_data
+            
+            profile = CarrierProfile.from_fmcsa_data(carrier_data)
+            return {
+                "profile": profile.dict(),
+                "risk_assessment": self._assess_risk(profile),
+                "recommendations": self._generate_recommendations(profile)
+            }
         except Exception as e:
-            print(f"Request error: {str(e)}")
-            return {"error": str(e)}
+            print(f"Analysis error: {str(e)}")  # Debug print
+            return {"error": f"Error analyzing carrier: {str(e)}"}
 
     def _assess_risk(self, profile: CarrierProfile) -> Dict[str, Any]:
         risk_factors = []
@@ -166,24 +142,6 @@ class FMCSAClient:
             "monitoring_items": monitoring_items
         }
 
-    def get_carrier_analysis(self, dot_number: str) -> Dict[str, Any]:
-        try:
-            carrier_data = self.get_carrier_by_dot(dot_number)
-            print(f"Raw carrier data: {carrier_data}")  # Debug print
-            
-            if carrier_data.get('error'):
-                return carrier_data
-            
-            profile = CarrierProfile.from_fmcsa_data(carrier_data)
-            return {
-                "profile": profile.dict(),
-                "risk_assessment": self._assess_risk(profile),
-                "recommendations": self._generate_recommendations(profile)
-            }
-        except Exception as e:
-            print(f"Analysis error: {str(e)}")  # Debug print
-            return {"error": f"Error analyzing carrier: {str(e)}"}
-
     def _get_metric_status(value: float, national_average: float, lower_is_better: bool = True) -> str:
         if lower_is_better:
             if value < national_average:
@@ -198,4 +156,124 @@ class FMCSAClient:
             elif value > national_average * 0.5:
                 return "WARNING"
             else:
-                return "CRITICAL"
\ No newline at end of file
+                return "CRITICAL"
+
+class FMCSAClient(CarrierAnalysisMixin):
+    def __init__(
+        self,
+        base_url: str = FMCSA_BASE_URL,
+        timeout: float = 10.0,
+        max_retries: int = 3,
+        pool_size: int = 10
+    ):
+        self.base_url = base_url
+        settings = get_settings()
+        if not settings.webkey:
+            raise ValueError("webkey not found in settings")
+        self.webkey = settings.webkey
+        self.timeout = timeout
+        self.session = self._create_session(max_retries, pool_size)
+
+    @staticmethod
+    def _create_session(max_retries: int, pool_size: int) -> requests.Session:
+        """Keep-alive session that retries idempotent GETs with backoff"""
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=("GET",),
+            respect_retry_after_header=True,
+            # Return the last response once retries run out, so a final
+            # 429/5xx reaches the status handling below rather than
+            # surfacing as a RetryError
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=retry
+        )
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def get_carrier_by_dot(self, dot_number: str) -> Dict[str, Any]:
+        """Get carrier data by DOT number"""
+        url = f"{self.base_url}/services/carriers/{dot_number}"
+        print(f"Requesting URL: {url}")  # Debug print
+        return self._make_request(url)
+
+    def search_carriers_by_name(self, name: str) -> Dict[str, Any]:
+        url = f"{self.base_url}/services/carriers/name/{name}"
+        return self._make_request(url)
+
+    def get_carriers_by_dot_many(self, dot_numbers: Iterable[str], **kwargs) -> Dict[str, Dict[str, Any]]:
+        """
+        Look up many DOT numbers concurrently.
+
+        Runs AsyncFMCSAClient.get_carriers_by_dot_many on a private event
+        loop; call that directly when already inside one. Keyword arguments
+        are passed to AsyncFMCSAClient.
+        """
+        from .async_fmcsa_client import AsyncFMCSAClient
+
+        async def run() -> Dict[str, Dict[str, Any]]:
+            async with AsyncFMCSAClient(
+                base_url=self.base_url,
+                webkey=self.webkey,
+                timeout=self.timeout,
+                **kwargs
+            ) as client:
+                return await client.get_carriers_by_dot_many(dot_numbers)
+
+        return asyncio.run(run())
+    
+    def _make_request(self, url: str) -> Dict[str, Any]:
+        params = {
+            "webKey": self.webkey
+        }
+
+        print(f"Making request to: {url}")
+        print(f"With params: {params}")
+
+        try:
+            response = self._get(url, params)
+            print(f"Response status: {response.status_code}")
+            print(f"Full URL: {response.url}")
+
+            if response.status_code == 200:
+                data = response.json()
+                if data.get("content"):
+                    return data
+                else:
+                    # Try another request format if content is null
+                    alternate_url = url.replace("/services", "")
+                    print(f"Trying alternate URL: {alternate_url}")
+                    response = self._get(alternate_url, params)
+                    return response.json()
+            else:
+                return {
+                    "error": f"Request failed with status {response.status_code}",
+                    "raw_text": response.text
+                }
+
+        except Exception as e:
+            print(f"Request error: {str(e)}")
+            return {"error": str(e)}
+
+    def _get(self, url: str, params: Dict[str, Any]) -> requests.Response:
+        # Timed as one call: the adapter's retries happen inside session.get
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            response = self.session.get(url, params=params, timeout=self.timeout)
+            outcome = str(response.status_code)
+            return response
+        finally:
+            metrics.record_fmcsa_call(time.perf_counter() - started, outcome)
+
+    def get_carrier_analysis(self, dot_number: str) -> Dict[str, Any]:
+        carrier_data = self.get_carrier_by_dot(dot_number)
+        print(f"Raw carrier data: {carrier_data}")  # Debug print
+        return self.analyze_carrier_data(carrier_data)
\ No newline at end of file
@@ -0,0 +1,305 @@
+"""
+Columnar snapshots of carriers, safety metrics and inspections for offline analytics.
+
+    python -m src.data.snapshots /data/snapshots --batch-size 50000
+
+Each table is read through a server-side cursor and written batch by batch
+as Parquet under <root>/<snapshot id>/<table>/, hive-partitioned:
+carrier_records by state, inspection_locations by inspection year,
+safety_metrics as a single file. A snapshot is written to a temporary
+directory and renamed into place once complete, and <root>/LATEST then
+names it, so readers never see half a snapshot. Snapshot ids sort by
+creation time, and LATEST only ever moves to a newer one.
+
+Snapshot opens one for reading. Files are memory-mapped and only the
+requested columns and partitions are decoded, so fleet-wide jobs can work
+on NumPy arrays without touching the OLTP database:
+
+    snapshot = Snapshot.latest('/data/snapshots')
+    arrays = snapshot.arrays('inspection_locations', ['carrier_id', 'longitude', 'latitude'],
+                             filter=snapshot.field('year') >= 2023)
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from urllib.parse import quote
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from geoalchemy2 import Geometry
+from sqlalchemy import Float, Integer, cast, extract, func, select, type_coerce
+from sqlalchemy.orm import Session
+
+from ..database.models import CarrierRecord, SafetyMetrics
+from ..models.geographic import InspectionLocation
+from ..repositories.carrier_export import arrow_batch, arrow_schema, iter_batches
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 50_000
+LATEST = 'LATEST'
+MANIFEST = 'manifest.json'
+
+def _carrier_records():
+    # raw_data is the full FMCSA response; analytics read the typed columns
+    table = CarrierRecord.__table__
+    return select(*(column for column in table.c if column.name != 'raw_data')).order_by(table.c.state, table.c.id)
+
+def _safety_metrics():
+    table = SafetyMetrics.__table__
+    return select(table).order_by(table.c.id)
+
+def _inspection_locations():
+    point = cast(InspectionLocation.location, Geometry(srid=4326))
+    year = type_coerce(extract('year', InspectionLocation.inspection_date), Integer).label('year')
+    return select(
+        InspectionLocation.id,
+        InspectionLocation.carrier_id,
+        InspectionLocation.inspection_date,
+        year,
+        InspectionLocation.state,
+        InspectionLocation.city,
+        type_coerce(func.ST_X(point), Float).label('longitude'),
+        type_coerce(func.ST_Y(point), Float).label('latitude'),
+        InspectionLocation.level,
+        InspectionLocation.violation_count,
+        InspectionLocation.oos_violation_count
+    ).order_by(year, InspectionLocation.carrier_id, InspectionLocation.inspection_date, InspectionLocation.id)
+
+# table -> (query, partition columns). Queries sort by their partition
+# columns first, so each partition arrives as one contiguous run of rows.
+SNAPSHOT_TABLES = {
+    'carrier_records': (_carrier_records, ['state']),
+    'safety_metrics': (_safety_metrics, []),
+    'inspection_locations': (_inspection_locations, ['year']),
+}
+
+def _partition_path(directory: str, partition_columns: Sequence[str], key: tuple) -> str:
+    # Hive layout (column=value), with pyarrow's spelling of null
+    return os.path.join(directory, *(
+        f"{column}={'__HIVE_DEFAULT_PARTITION__' if value is None else quote(str(value), safe='')}"
+        for column, value in zip(partition_columns, key)
+    ))
+
+def _write_table(db: Session, name: str, directory: str, batch_size: int) -> int:
+    """
+    Write one table, one Parquet file per partition and one row group per
+    batch. Rows arrive sorted by partition, so only one file is open at a
+    time and memory is bounded by batch_size.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    query, partition_columns = SNAPSHOT_TABLES[name]
+    statement = query()
+    schema = arrow_schema(statement.selected_columns)
+    # Partition values live in the directory names, not in the files
+    file_schema = pa.schema([field for field in schema if field.name not in partition_columns])
+    key_indexes = [schema.get_field_index(column) for column in partition_columns]
+    os.makedirs(directory)
+
+    writer = None
+    current_key = None
+    rows = 0
+    try:
+        for batch in iter_batches(db, statement, batch_size):
+            record_batch = arrow_batch(batch, schema).select(file_schema.names)
+            keys = [tuple(row[index] for index in key_indexes) for row in batch]
+            start = 0
+            for stop in range(1, len(batch) + 1):
+                if stop < len(batch) and keys[stop] == keys[start]:
+                    continue
+                if writer is None or keys[start] != current_key:
+                    if writer is not None:
+                        writer.close()
+                    current_key = keys[start]
+                    path = _partition_path(directory, partition_columns, current_key)
+                    os.makedirs(path, exist_ok=True)
+                    writer = pq.ParquetWriter(os.path.join(path, 'part-0.parquet'), file_schema, compression='zstd')
+                writer.write_batch(record_batch.slice(start, stop - start))
+                start = stop
+            rows += len(batch)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+def write_snapshot(db: Session, root: str, batch_size: int = DEFAULT_BATCH_SIZE) -> str:
+    """Write a new snapshot under `root` and point LATEST at it; returns its path"""
+    created_at = datetime.now(timezone.utc)
+    # Sortable by creation time; the suffix keeps runs within the same
+    # microsecond apart
+    snapshot_id = f"{created_at.strftime('%Y%m%dT%H%M%S.%fZ')}-{uuid.uuid4().hex[:8]}"
+    path = os.path.join(root, snapshot_id)
+    staging = os.path.join(root, f".{snapshot_id}.tmp")
+    os.makedirs(staging)
+
+    manifest = {'id': snapshot_id, 'created_at': created_at.isoformat(), 'tables': {}}
+    try:
+        with db.begin():
+            if db.get_bind().dialect.name == 'postgresql':
+                # The three tables are read at a single point in time
+                db.connection(execution_options={'isolation_level': 'REPEATABLE READ'})
+            for name, (_, partition_columns) in SNAPSHOT_TABLES.items():
+                started = time.monotonic()
+                rows = _write_table(db, name, os.path.join(staging, name), batch_size)
+                manifest['tables'][name] = {'rows': rows, 'partitioning': partition_columns}
+                logger.info(f"Wrote {rows} {name} rows in {time.monotonic() - started:.1f}s")
+        with open(os.path.join(staging, MANIFEST), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.rename(staging, path)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    _point_latest(root, snapshot_id)
+    return path
+
+def _point_latest(root: str, snapshot_id: str) -> None:
+    """
+    Point LATEST at `snapshot_id` unless it already names a newer snapshot,
+    so a run that started earlier but finished later does not win.
+    """
+    import fcntl
+
+    with open(os.path.join(root, f".{LATEST}.lock"), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            with open(os.path.join(root, LATEST)) as f:
+                current = f.read().strip()
+        except FileNotFoundError:
+            current = ''
+        if current >= snapshot_id:
+            logger.info(f"LATEST left at newer snapshot {current}")
+            return
+        latest = os.path.join(root, f".{LATEST}.{snapshot_id}.tmp")
+        with open(latest, 'w') as f:
+            f.write(snapshot_id)
+        os.replace(latest, os.path.join(root, LATEST))
+
+class Snapshot:
+    """Read-only view of one snapshot directory"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, MANIFEST)) as f:
+            self.manifest = json.load(f)
+        self._datasets: Dict[str, Any] = {}
+
+    @classmethod
+    def latest(cls, root: str) -> 'Snapshot':
+        with open(os.path.join(root, LATEST)) as f:
+            return cls(os.path.join(root, f.read().strip()))
+
+    @property
+    def created_at(self) -> datetime:
+        return datetime.fromisoformat(self.manifest['created_at'])
+
+    @staticmethod
+    def field(name: str):
+        """Column reference for `filter` expressions, e.g. field('state') == 'TX'"""
+        import pyarrow.dataset as ds
+        return ds.field(name)
+
+    def dataset(self, name: str):
+        if name not in self.manifest['tables']:
+            raise ValueError(f"Snapshot has no table {name}")
+        if name not in self._datasets:
+            import pyarrow as pa
+            import pyarrow.dataset as ds
+            from pyarrow import fs
+
+            query, partition_columns = SNAPSHOT_TABLES[name]
+            schema = arrow_schema(query().selected_columns)
+            self._datasets[name] = ds.dataset(
+                os.path.join(self.path, name),
+                schema=schema,
+                format='parquet',
+                filesystem=fs.LocalFileSystem(use_mmap=True),
+                partitioning=ds.partitioning(
+                    pa.schema([schema.field(column) for column in partition_columns]), flavor='hive'
+                )
+            )
+        return self._datasets[name]
+
+    def table(self, name: str, columns: Optional[Sequence[str]] = None, filter=None):
+        """Arrow table of the requested columns; `filter` prunes partitions and row groups"""
+        return self.dataset(name).to_table(columns=list(columns) if columns else None, filter=filter)
+
+    def arrays(self, name: str, columns: Sequence[str], filter=None) -> Dict[str, np.ndarray]:
+        """Columns as NumPy arrays; nulls become NaN (numbers) or None (objects)"""
+        table = self.table(name, columns, filter)
+        return {
+            column: table.column(column).to_numpy(zero_copy_only=False)
+            for column in columns
+        }
+
+    def inspections_by_carrier(
+        self,
+        carrier_ids: Optional[Sequence[int]] = None,
+        filter=None
+    ) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+        """
+        (carrier_id, inspections) for each carrier, with inspections shaped
+        like CarrierGeographicAnalysis._get_inspection_data, so
+        RoutePatternDetector and FrequencyAnalyzer run on them unchanged
+        """
+        import pyarrow.compute as pc
+
+        columns = ['carrier_id', 'inspection_date', 'state', 'city', 'longitude', 'latitude', 'violation_count']
+        if carrier_ids is not None:
+            carrier_filter = self.field('carrier_id').isin(list(carrier_ids))
+            filter = carrier_filter if filter is None else filter & carrier_filter
+        table = self.table('inspection_locations', columns, filter)
+        table = table.filter(
+            pc.and_(pc.is_valid(table['inspection_date']), pc.is_valid(table['longitude']))
+        ).sort_by([('carrier_id', 'ascending'), ('inspection_date', 'ascending')])
+        if not table.num_rows:
+            return
+
+        carrier_column = table.column('carrier_id').to_numpy()
+        dates = pc.strftime(table['inspection_date'], format='%Y-%m-%d').to_pylist()
+        states = table.column('state').to_pylist()
+        cities = table.column('city').to_pylist()
+        longitudes = table.column('longitude').to_numpy()
+        latitudes = table.column('latitude').to_numpy()
+        violations = table.column('violation_count').fill_null(0).to_numpy()
+
+        boundaries = np.flatnonzero(np.diff(carrier_column)) + 1
+        for start, stop in zip(np.r_[0, boundaries], np.r_[boundaries, len(carrier_column)]):
+            yield int(carrier_column[start]), [
+                {
+                    'inspection_date': dates[i],
+                    'state': states[i],
+                    'city': cities[i],
+                    'longitude': float(longitudes[i]),
+                    'latitude': float(latitudes[i]),
+                    'violation_count': int(violations[i])
+                }
+                for i in range(start, stop)
+            ]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('root', help='directory holding the snapshots')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    from ..database.database import SessionLocal
+
+    os.makedirs(args.root, exist_ok=True)
+    db = SessionLocal()
+    try:
+        path = write_snapshot(db, args.root, args.batch_size)
+    finally:
+        db.close()
+    logger.info(f"Snapshot written to {path}")
+
+if __name__ == '__main__':
+    main()
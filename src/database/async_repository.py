@@ -0,0 +1,100 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects.postgresql import insert
+from . import models
+from .repository import CarrierRepository
+from .history import CarrierHistoryWriter
+from datetime import datetime
+from typing import Optional, List, Dict, Iterable
+
+class AsyncCarrierRepository:
+    """CarrierRepository for an AsyncSession; every method awaits its I/O"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_carrier_by_dot(self, dot_number: str) -> Optional[models.CarrierRecord]:
+        result = await self.db.execute(
+            select(models.CarrierRecord).where(models.CarrierRecord.dot_number == dot_number).limit(1)
+        )
+        return result.scalars().first()
+
+    async def get_carriers_by_dots(self, dot_numbers: Iterable[str]) -> Dict[str, models.CarrierRecord]:
+        """Carriers for many DOT numbers in a single IN query, keyed by DOT number"""
+        dot_numbers = list(dot_numbers)
+        if not dot_numbers:
+            return {}
+        result = await self.db.execute(
+            select(models.CarrierRecord).where(models.CarrierRecord.dot_number.in_(dot_numbers))
+        )
+        return {carrier.dot_number: carrier for carrier in result.scalars()}
+
+    async def create_or_update_carrier(self, carrier_data: dict) -> models.CarrierRecord:
+        carrier_info = CarrierRepository._extract_carrier_info(carrier_data)
+        values = CarrierRepository._carrier_values(carrier_info, carrier_data)
+        # Snapshot is pending on the session and committed with the upsert
+        await self.db.run_sync(
+            lambda session: CarrierHistoryWriter(session).record({values['dot_number']: carrier_info})
+        )
+        await self.upsert_carrier_rows([values])
+        return await self.get_carrier_by_dot(values['dot_number'])
+
+    async def upsert_carrier_rows(self, rows: List[dict]) -> Dict[str, int]:
+        """
+        Upsert CarrierRecord column dicts in a single statement and commit.
+
+        Returns:
+            Mapping of dot_number to carrier id for the rows written
+        """
+        # ON CONFLICT cannot touch the same row twice in one statement
+        rows = list({row['dot_number']: row for row in rows}.values())
+        if not rows:
+            return {}
+
+        now = datetime.utcnow()
+        for row in rows:
+            row.setdefault('created_at', now)
+            row['updated_at'] = now
+
+        stmt = insert(models.CarrierRecord)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[models.CarrierRecord.dot_number],
+            set_={
+                key: stmt.excluded[key]
+                for key in rows[0]
+                if key not in ('dot_number', 'created_at')
+            }
+        ).returning(models.CarrierRecord.dot_number, models.CarrierRecord.id)
+
+        ids = dict((await self.db.execute(stmt, rows)).all())
+        await self.db.commit()
+        return ids
+
+    async def get_carrier_history(self, dot_number: str) -> List[models.RiskAssessment]:
+        """
+        Get historical risk assessments for a carrier ordered by date
+        """
+        result = await self.db.execute(
+            select(models.RiskAssessment)
+            .join(models.CarrierRecord)
+            .where(models.CarrierRecord.dot_number == dot_number)
+            .order_by(models.RiskAssessment.assessment_date.desc())
+        )
+        return list(result.scalars())
+
+    async def create_risk_assessment(self, carrier_id: int, analysis_data: dict) -> models.RiskAssessment:
+        """
+        Create a new risk assessment record for a carrier
+        """
+        assessment = models.RiskAssessment(
+            carrier_id=carrier_id,
+            assessment_date=datetime.utcnow(),
+            risk_level=analysis_data.get('risk_level'),
+            risk_factors=analysis_data.get('risk_factors'),
+            warnings=analysis_data.get('warnings', []),
+            metrics_analysis=analysis_data.get('metrics_analysis', {})
+        )
+        self.db.add(assessment)
+        await self.db.commit()
+        await self.db.refresh(assessment)
+        return assessment
\ No newline at end of file
@@ -1,19 +1,171 @@
+import threading
+import time
+from typing import Any, Dict, Optional
+
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.ext.declarative import declarative_base
-import os
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 
-# Get system username
-username = os.getenv("USER", "spencerpro")
-DATABASE_URL = f"postgresql://{username}@localhost:5432/carrier_logic"
+from ..config import DatabaseSettings, get_db_settings
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# The one declarative base every model registers with
 Base = declarative_base()
 
+class _InstrumentedPoolMixin:
+    """
+    Counts checkouts and how long they wait for a free connection.
+
+    Counters live on the pool class, so they survive engine.dispose()
+    recreating the pool.
+    """
+    stats: Dict[str, float]
+
+    def _do_get(self):
+        exhausted = self.checkedin() == 0 and self.overflow() >= self._max_overflow
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self._record('timeouts', 1)
+            raise
+        finally:
+            if exhausted:
+                self._record('waits', 1)
+                self._record('wait_seconds', time.perf_counter() - started)
+        self._record('checkouts', 1)
+        return connection
+
+    @classmethod
+    def _record(cls, stat: str, value: float) -> None:
+        with cls._stats_lock:
+            cls.stats[stat] += value
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    stats = {'checkouts': 0, 'waits': 0, 'wait_seconds': 0.0, 'timeouts': 0}
+    _stats_lock = threading.Lock()
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    stats = {'checkouts': 0, 'waits': 0, 'wait_seconds': 0.0, 'timeouts': 0}
+    _stats_lock = threading.Lock()
+
+def _pool_options(config: DatabaseSettings) -> Dict[str, Any]:
+    return {
+        'pool_size': config.pool_size,
+        'max_overflow': config.max_overflow,
+        'pool_timeout': config.pool_timeout,
+        'pool_recycle': config.pool_recycle,
+        'pool_pre_ping': config.pool_pre_ping,
+        'echo': config.echo
+    }
+
+_lock = threading.Lock()
+_engine: Optional[Engine] = None
+_session_factory: Optional[sessionmaker] = None
+_async_engine: Optional[AsyncEngine] = None
+_async_session_factory: Optional[async_sessionmaker] = None
+
+def get_engine() -> Engine:
+    """The process-wide engine, created on first use"""
+    global _engine, _session_factory
+    if _engine is None:
+        with _lock:
+            if _engine is None:
+                db_settings = get_db_settings()
+                connect_args = {}
+                if db_settings.statement_timeout_ms:
+                    connect_args['options'] = f"-c statement_timeout={db_settings.statement_timeout_ms}"
+                _engine = create_engine(
+                    db_settings.sqlalchemy_url,
+                    poolclass=InstrumentedQueuePool,
+                    connect_args=connect_args,
+                    **_pool_options(db_settings)
+                )
+                _session_factory = sessionmaker(autocommit=False, autoflush=False, bind=_engine)
+    return _engine
+
+def get_async_engine() -> AsyncEngine:
+    """The process-wide asyncpg engine, created on first use"""
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        with _lock:
+            if _async_engine is None:
+                db_settings = get_db_settings()
+                connect_args = {}
+                if db_settings.statement_timeout_ms:
+                    connect_args['server_settings'] = {'statement_timeout': str(db_settings.statement_timeout_ms)}
+                _async_engine = create_async_engine(
+                    db_settings.async_sqlalchemy_url,
+                    poolclass=InstrumentedAsyncQueuePool,
+                    connect_args=connect_args,
+                    **_pool_options(db_settings)
+                )
+                _async_session_factory = async_sessionmaker(
+                    _async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+                )
+    return _async_engine
+
+async def dispose_async_engine() -> None:
+    """Close the async engine's pooled connections, if it was ever created (application shutdown)"""
+    global _async_engine, _async_session_factory
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+        _async_session_factory = None
+
+def dispose_engine(close: bool = True) -> None:
+    """
+    Drop the sync engine's pooled connections, if it was ever created.
+
+    Pass close=False in a freshly forked process so connections inherited
+    from the parent are abandoned rather than closed underneath it.
+    """
+    if _engine is not None:
+        _engine.dispose(close=close)
+
+def SessionLocal() -> Session:
+    """New Session bound to the shared engine"""
+    get_engine()
+    return _session_factory()
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def get_async_sessionmaker() -> async_sessionmaker:
+    get_async_engine()
+    return _async_session_factory
+
+async def get_async_db():
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+def _pool_status(pool, stats: Dict[str, float]) -> Dict[str, Any]:
+    return {
+        'size': pool.size(),
+        'checked_out': pool.checkedout(),
+        'checked_in': pool.checkedin(),
+        'overflow': max(pool.overflow(), 0),
+        'max_overflow': pool._max_overflow,
+        **stats
+    }
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Current occupancy and cumulative checkout counters of each engine's pool.
+
+    `waits` counts checkouts that found every connection, overflow
+    included, in use; `wait_seconds` is the total time they waited and
+    `timeouts` how many gave up after pool_timeout.
+    """
+    stats = {}
+    if _engine is not None:
+        stats['sync'] = _pool_status(_engine.pool, dict(InstrumentedQueuePool.stats))
+    if _async_engine is not None:
+        stats['async'] = _pool_status(_async_engine.sync_engine.pool, dict(InstrumentedAsyncQueuePool.stats))
+    return stats
\ No newline at end of file
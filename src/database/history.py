@@ -0,0 +1,134 @@
+"""
+Change-detecting carrier history.
+
+Each refresh hashes the carrier's normalized FMCSA fields and compares the
+hash with the carrier's latest CarrierHistory snapshot. Only when it
+differs is a snapshot written, and it holds just the fields that changed;
+a carrier's first snapshot holds every field. The state at any snapshot is
+the fold of the deltas up to it (see carrier_states).
+"""
+import hashlib
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+import orjson
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from ..models.carrier import CarrierHistory
+
+logger = logging.getLogger(__name__)
+
+def normalize_payload(carrier_info: dict) -> Dict[str, Any]:
+    """
+    FMCSA carrier fields flattened to dotted paths.
+
+    Link objects (keys starting with "_") and empty values are dropped and
+    strings are stripped, so responses that differ only in formatting
+    normalize the same.
+    """
+    normalized = {}
+
+    def flatten(value: Any, path: str) -> None:
+        if isinstance(value, dict):
+            for key, item in value.items():
+                if not str(key).startswith('_'):
+                    flatten(item, f"{path}.{key}" if path else str(key))
+            return
+        if isinstance(value, str):
+            value = value.strip()
+        if value is None or value == '':
+            return
+        normalized[path] = value
+
+    flatten(carrier_info, '')
+    return normalized
+
+def payload_hash(normalized: Dict[str, Any]) -> str:
+    return hashlib.sha256(orjson.dumps(normalized, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+def diff_fields(previous: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    """Fields of `current` that differ from `previous`; removed fields map to None"""
+    changes = {key: value for key, value in current.items() if previous.get(key) != value}
+    changes.update({key: None for key in previous.keys() - current.keys()})
+    return changes
+
+class CarrierHistoryWriter:
+    """Adds CarrierHistory snapshots to a session; the caller commits"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def latest_hashes(self, dot_numbers: Iterable[str]) -> Dict[str, str]:
+        """Payload hash of each carrier's newest snapshot, in one query"""
+        dot_numbers = list(dot_numbers)
+        if not dot_numbers:
+            return {}
+        latest = (
+            select(func.max(CarrierHistory.id))
+            .where(CarrierHistory.carrier_dot_number.in_(dot_numbers))
+            .group_by(CarrierHistory.carrier_dot_number)
+        )
+        rows = self.db.execute(
+            select(CarrierHistory.carrier_dot_number, CarrierHistory.payload_hash)
+            .where(CarrierHistory.id.in_(latest))
+        )
+        return dict(rows.all())
+
+    def carrier_states(self, dot_numbers: Iterable[str], until: Optional[datetime] = None) -> Dict[str, Dict[str, Any]]:
+        """Normalized fields of each carrier as of its newest snapshot (or `until`)"""
+        dot_numbers = list(dot_numbers)
+        if not dot_numbers:
+            return {}
+        query = (
+            select(CarrierHistory.carrier_dot_number, CarrierHistory.changes)
+            .where(CarrierHistory.carrier_dot_number.in_(dot_numbers))
+            .order_by(CarrierHistory.carrier_dot_number, CarrierHistory.id)
+        )
+        if until is not None:
+            query = query.where(CarrierHistory.record_date <= until)
+
+        states: Dict[str, Dict[str, Any]] = {}
+        for dot_number, changes in self.db.execute(query):
+            state = states.setdefault(dot_number, {})
+            for key, value in (changes or {}).items():
+                if value is None:
+                    state.pop(key, None)
+                else:
+                    state[key] = value
+        return states
+
+    def record(self, carriers: Dict[str, dict], record_date: Optional[datetime] = None) -> List[CarrierHistory]:
+        """
+        Add a snapshot for each carrier whose fields changed.
+
+        Args:
+            carriers: FMCSA carrier fields (the "carrier" object) by DOT number
+
+        Returns:
+            The snapshots added; unchanged carriers add none
+        """
+        normalized = {dot_number: normalize_payload(info) for dot_number, info in carriers.items()}
+        hashes = {dot_number: payload_hash(fields) for dot_number, fields in normalized.items()}
+        latest = self.latest_hashes(hashes)
+        changed = [dot_number for dot_number, digest in hashes.items() if latest.get(dot_number) != digest]
+        if not changed:
+            return []
+
+        # Deltas are taken against the history itself rather than
+        # carrier_records.raw_data, which other writers may have touched
+        previous = self.carrier_states([dot_number for dot_number in changed if dot_number in latest])
+        record_date = record_date or datetime.utcnow()
+        snapshots = [
+            CarrierHistory(
+                carrier_dot_number=dot_number,
+                record_date=record_date,
+                payload_hash=hashes[dot_number],
+                changes=diff_fields(previous.get(dot_number, {}), normalized[dot_number])
+            )
+            for dot_number in changed
+        ]
+        self.db.add_all(snapshots)
+        logger.debug(f"Carrier history: {len(snapshots)} of {len(carriers)} carriers changed")
+        return snapshots
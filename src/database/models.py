@@ -16,7 +16,7 @@ class CarrierRecord(Base):
     __tablename__ = "carrier_records"
 
     id = Column(Integer, primary_key=True, index=True)
-    dot_number = Column(String, index=True)
+    dot_number = Column(String, index=True, unique=True)
     legal_name = Column(String)
     dba_name = Column(String, nullable=True)
     
@@ -45,6 +45,9 @@ class CarrierRecord(Base):
                        default=lambda: datetime.now(timezone.utc),
                        onupdate=lambda: datetime.now(timezone.utc))
     raw_data = Column(JSON)  # Store complete FMCSA response
+    raw_data_fetched_at = Column(DateTime, nullable=True)  # When raw_data was fetched from FMCSA
+    census_loaded_at = Column(DateTime, nullable=True)  # Last bulk census load (census_ingest)
+    data_version = Column(Integer, default=0)  # Bumped when inspections/routes change
 
     # Relationships
     safety_metrics = relationship("SafetyMetrics", back_populates="carrier", uselist=False)
@@ -62,10 +65,12 @@ class CarrierRecord(Base):
         )
 
     def is_data_fresh(self) -> bool:
-        """Check if data is less than 24 hours old"""
-        if not self.updated_at:
+        """Check if the stored FMCSA response is less than 24 hours old"""
+        # Not updated_at: census loads and other writers touch the row
+        # without refetching raw_data
+        if not self.raw_data_fetched_at:
             return False
-        return datetime.utcnow() - self.updated_at < timedelta(hours=24)
+        return datetime.utcnow() - self.raw_data_fetched_at < timedelta(hours=24)
 
     def to_dict(self) -> dict:
         """Convert record to dictionary"""
@@ -147,7 +152,7 @@ class SafetyMetrics(Base):
     __tablename__ = "safety_metrics"
 
     id = Column(Integer, primary_key=True, index=True)
-    carrier_id = Column(Integer, ForeignKey("carrier_records.id"))
+    carrier_id = Column(Integer, ForeignKey("carrier_records.id"), unique=True)
     record_date = Column(DateTime, default=datetime.utcnow)
     
     # Crash Statistics
@@ -207,26 +212,6 @@ class RiskAssessment(Base):
     
     carrier = relationship("CarrierRecord", back_populates="risk_assessments")
 
-class InspectionLocation(Base):
-    __tablename__ = "inspection_locations"
-
-    id = Column(Integer, primary_key=True, index=True)
-    carrier_id = Column(Integer, ForeignKey("carrier_records.id"))
-    city = Column(String)
-    state = Column(String)
-    inspection_count = Column(Integer, default=0)
-    
-    # Relationship back to carrier
-    carrier = relationship("CarrierRecord", back_populates="inspection_locations")
-
-class CarrierRoute(Base):
-    __tablename__ = "carrier_routes"
-
-    id = Column(Integer, primary_key=True, index=True)
-    carrier_id = Column(Integer, ForeignKey("carrier_records.id"))
-    origin_state = Column(String)
-    destination_state = Column(String)
-    frequency = Column(Integer, default=0)
-    
-    # Relationship back to carrier
-    carrier = relationship("CarrierRecord", back_populates="routes")
\ No newline at end of file
+# Inspection points and detected routes live with the other geographic
+# models; re-exported here so both import paths map to one table each.
+from ..models.geographic import InspectionLocation, CarrierRoute  # noqa: E402
\ No newline at end of file
@@ -1,49 +1,82 @@
+from sqlalchemy import text
 from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.dialects.postgresql import insert
 from ..database.models import CarrierRecord
 from . import models
+from .history import CarrierHistoryWriter
 from datetime import datetime
-from typing import Optional, List
+import csv
+import io
+from itertools import islice
+from typing import Optional, List, Dict, Iterable, Iterator, Sequence, Tuple
+
+def _batched(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
 
 class CarrierRepository:
     def __init__(self, db: Session):
         self.db = db
 
-    def create_or_update_carrier(self, carrier_data: dict) -> models.CarrierRecord:
+    @staticmethod
+    def _extract_carrier_info(carrier_data: dict) -> dict:
         # Extract carrier info from nested structure
         if 'content' in carrier_data and 'carrier' in carrier_data['content']:
-            carrier_info = carrier_data['content']['carrier']
-        else:
-            carrier_info = carrier_data.get('carrier', {})
+            return carrier_data['content']['carrier']
+        return carrier_data.get('carrier', {})
 
-        carrier = self.get_carrier_by_dot(str(carrier_info['dotNumber']))
+    @staticmethod
+    def _carrier_values(carrier_info: dict, carrier_data: dict) -> dict:
+        """Map FMCSA carrier fields to CarrierRecord columns"""
+        return {
+            'dot_number': str(carrier_info['dotNumber']),
+            'legal_name': carrier_info.get('legalName', ''),
+            'dba_name': carrier_info.get('dbaName'),
+            'is_active': carrier_info.get('statusCode') == 'A',
+            'operating_status': carrier_info.get('statusCode'),
+            'allowed_to_operate': carrier_info.get('allowedToOperate') == 'Y',
+            'fleet_size': carrier_info.get('totalPowerUnits'),
+            'driver_count': carrier_info.get('totalDrivers'),
+            'safety_rating': carrier_info.get('safetyRating'),
+            'safety_rating_date': carrier_info.get('safetyRatingDate'),
+            'raw_data': carrier_data,  # Store complete response
+            'raw_data_fetched_at': datetime.utcnow()
+        }
+
+    @staticmethod
+    def _safety_metrics_values(carrier_id: int, metrics_data: dict) -> dict:
+        """Map FMCSA safety fields to SafetyMetrics columns"""
+        return {
+            'carrier_id': carrier_id,
+            'crash_total': metrics_data.get('crashTotal', 0),
+            'fatal_crashes': metrics_data.get('fatalCrash', 0),
+            'injury_crashes': metrics_data.get('injCrash', 0),
+            'tow_crashes': metrics_data.get('towawayCrash', 0),
+            'driver_oos_rate': float(metrics_data.get('driverOosRate', 0)),
+            'vehicle_oos_rate': float(metrics_data.get('vehicleOosRate', 0)),
+            'hazmat_oos_rate': float(metrics_data.get('hazmatOosRate', 0)),
+            'driver_inspections': metrics_data.get('driverInsp', 0),
+            'vehicle_inspections': metrics_data.get('vehicleInsp', 0),
+            'hazmat_inspections': metrics_data.get('hazmatInsp', 0),
+            'driver_oos_national_avg': float(metrics_data.get('driverOosRateNationalAverage', 0)),
+            'vehicle_oos_national_avg': float(metrics_data.get('vehicleOosRateNationalAverage', 0)),
+            'hazmat_oos_national_avg': float(metrics_data.get('hazmatOosRateNationalAverage', 0))
+        }
+
+    def create_or_update_carrier(self, carrier_data: dict) -> models.CarrierRecord:
+        carrier_info = self._extract_carrier_info(carrier_data)
+        values = self._carrier_values(carrier_info, carrier_data)
+        carrier = self.get_carrier_by_dot(values['dot_number'])
+        CarrierHistoryWriter(self.db).record({values['dot_number']: carrier_info})
         
         if not carrier:
-            carrier = models.CarrierRecord(
-                dot_number=str(carrier_info['dotNumber']),
-                legal_name=carrier_info.get('legalName', ''),
-                dba_name=carrier_info.get('dbaName'),
-                is_active=carrier_info.get('statusCode') == 'A',
-                operating_status=carrier_info.get('statusCode'),
-                allowed_to_operate=carrier_info.get('allowedToOperate') == 'Y',
-                fleet_size=carrier_info.get('totalPowerUnits'),
-                driver_count=carrier_info.get('totalDrivers'),
-                safety_rating=carrier_info.get('safetyRating'),
-                safety_rating_date=carrier_info.get('safetyRatingDate'),
-                raw_data=carrier_data  # Store complete response
-            )
+            carrier = models.CarrierRecord(**values)
             self.db.add(carrier)
         else:
             carrier.updated_at = datetime.utcnow()
-            carrier.legal_name = carrier_info.get('legalName', '')
-            carrier.dba_name = carrier_info.get('dbaName')
-            carrier.is_active = carrier_info.get('statusCode') == 'A'
-            carrier.operating_status = carrier_info.get('statusCode')
-            carrier.allowed_to_operate = carrier_info.get('allowedToOperate') == 'Y'
-            carrier.fleet_size = carrier_info.get('totalPowerUnits')
-            carrier.driver_count = carrier_info.get('totalDrivers')
-            carrier.safety_rating = carrier_info.get('safetyRating')
-            carrier.safety_rating_date = carrier_info.get('safetyRatingDate')
-            carrier.raw_data = carrier_data  # Update raw data
+            for key, value in values.items():
+                setattr(carrier, key, value)
         
         self.db.commit()
         self.db.refresh(carrier)
@@ -54,9 +87,21 @@ class CarrierRepository:
             models.CarrierRecord.dot_number == dot_number
         ).first()
 
+    def get_carriers_by_dots(self, dot_numbers: Iterable[str]) -> Dict[str, models.CarrierRecord]:
+        """Carriers for many DOT numbers in a single IN query, keyed by DOT number"""
+        dot_numbers = list(dot_numbers)
+        if not dot_numbers:
+            return {}
+        carriers = self.db.query(models.CarrierRecord).filter(
+            models.CarrierRecord.dot_number.in_(dot_numbers)
+        ).all()
+        return {carrier.dot_number: carrier for carrier in carriers}
+
     def update_carrier(self, carrier: models.CarrierRecord, carrier_data: dict) -> models.CarrierRecord:
+        CarrierHistoryWriter(self.db).record({carrier.dot_number: self._extract_carrier_info(carrier_data)})
         carrier.updated_at = datetime.utcnow()
         carrier.raw_data = carrier_data
+        carrier.raw_data_fetched_at = carrier.updated_at
         # Update other fields as needed
         self.db.commit()
         self.db.refresh(carrier)
@@ -68,22 +113,7 @@ class CarrierRepository:
         ).first()
 
         if not metrics:
-            metrics = models.SafetyMetrics(
-                carrier_id=carrier_id,
-                crash_total=metrics_data.get('crashTotal', 0),
-                fatal_crashes=metrics_data.get('fatalCrash', 0),
-                injury_crashes=metrics_data.get('injCrash', 0),
-                tow_crashes=metrics_data.get('towawayCrash', 0),
-                driver_oos_rate=float(metrics_data.get('driverOosRate', 0)),
-                vehicle_oos_rate=float(metrics_data.get('vehicleOosRate', 0)),
-                hazmat_oos_rate=float(metrics_data.get('hazmatOosRate', 0)),
-                driver_inspections=metrics_data.get('driverInsp', 0),
-                vehicle_inspections=metrics_data.get('vehicleInsp', 0),
-                hazmat_inspections=metrics_data.get('hazmatInsp', 0),
-                driver_oos_national_avg=float(metrics_data.get('driverOosRateNationalAverage', 0)),
-                vehicle_oos_national_avg=float(metrics_data.get('vehicleOosRateNationalAverage', 0)),
-                hazmat_oos_national_avg=float(metrics_data.get('hazmatOosRateNationalAverage', 0))
-            )
+            metrics = models.SafetyMetrics(**self._safety_metrics_values(carrier_id, metrics_data))
             self.db.add(metrics)
         else:
             # Update existing metrics
@@ -95,6 +125,187 @@ class CarrierRepository:
         self.db.refresh(metrics)
         return metrics
 
+    def bulk_upsert_carriers(self, carriers: Iterable[dict], batch_size: int = 1000) -> int:
+        """
+        Insert or update many FMCSA carrier payloads.
+
+        Each batch is written with one INSERT ... ON CONFLICT (dot_number)
+        statement and one commit, instead of a SELECT/commit/refresh per row.
+        History snapshots for the carriers that changed are committed with it.
+
+        Returns:
+            Number of carrier rows written
+        """
+        written = 0
+        history = CarrierHistoryWriter(self.db)
+        for batch in _batched(carriers, batch_size):
+            infos = [self._extract_carrier_info(data) for data in batch]
+            rows = [self._carrier_values(info, data) for info, data in zip(infos, batch)]
+            history.record({row['dot_number']: info for row, info in zip(rows, infos)})
+            written += len(self.upsert_carrier_rows(rows))
+        return written
+
+    def upsert_carrier_rows(self, rows: List[dict]) -> Dict[str, int]:
+        """
+        Upsert CarrierRecord column dicts in a single statement and commit.
+
+        Returns:
+            Mapping of dot_number to carrier id for the rows written
+        """
+        # ON CONFLICT cannot touch the same row twice in one statement
+        rows = list({row['dot_number']: row for row in rows}.values())
+        if not rows:
+            return {}
+
+        now = datetime.utcnow()
+        for row in rows:
+            row.setdefault('created_at', now)
+            row['updated_at'] = now
+
+        stmt = insert(models.CarrierRecord)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[models.CarrierRecord.dot_number],
+            set_={
+                key: stmt.excluded[key]
+                for key in rows[0]
+                if key not in ('dot_number', 'created_at')
+            }
+        ).returning(models.CarrierRecord.dot_number, models.CarrierRecord.id)
+
+        # executemany form: compiled once and sent as multi-row VALUES pages
+        ids = dict(self.db.execute(stmt, rows).all())
+        self.db.commit()
+        return ids
+
+    def bulk_upsert_safety_metrics(
+        self,
+        metrics: Iterable[Tuple[int, dict]],
+        batch_size: int = 1000
+    ) -> int:
+        """
+        Insert or update safety metrics for many carriers.
+
+        Args:
+            metrics: (carrier_id, FMCSA metrics dict) pairs
+            batch_size: Rows per INSERT ... ON CONFLICT (carrier_id) statement
+
+        Returns:
+            Number of safety metric rows written
+        """
+        written = 0
+        for batch in _batched(metrics, batch_size):
+            rows = [
+                self._safety_metrics_values(carrier_id, metrics_data)
+                for carrier_id, metrics_data in batch
+            ]
+            written += self.upsert_safety_metric_rows(rows)
+        return written
+
+    def upsert_safety_metric_rows(self, rows: List[dict]) -> int:
+        """Upsert SafetyMetrics column dicts in a single statement and commit"""
+        rows = list({row['carrier_id']: row for row in rows}.values())
+        if not rows:
+            return 0
+
+        now = datetime.utcnow()
+        for row in rows:
+            row['record_date'] = now
+
+        stmt = insert(models.SafetyMetrics)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[models.SafetyMetrics.carrier_id],
+            set_={
+                key: stmt.excluded[key]
+                for key in rows[0]
+                if key != 'carrier_id'
+            }
+        )
+
+        self.db.execute(stmt, rows)
+        self.db.commit()
+        return len(rows)
+
+    def copy_upsert_carrier_rows(self, rows: List[dict], columns: List[str], insert_only: Sequence[str] = ()) -> int:
+        """
+        Upsert CarrierRecord column dicts via COPY into a staging table.
+
+        Faster than upsert_carrier_rows for very large batches. Only
+        `columns` are written, so columns the rows don't carry (e.g.
+        raw_data) keep their stored values; `insert_only` columns are
+        written for new carriers but left alone on existing ones. The
+        caller commits.
+        """
+        if not rows:
+            return 0
+        self._copy_to_staging(
+            "carrier_records_stage",
+            f"SELECT {', '.join(columns)} FROM carrier_records",
+            columns,
+            rows
+        )
+        column_list = ', '.join(columns)
+        updates = ', '.join(
+            f"{column} = EXCLUDED.{column}"
+            for column in columns if column not in ('dot_number', 'created_at', *insert_only)
+        )
+        result = self.db.execute(text(f"""
+            INSERT INTO carrier_records ({column_list})
+            SELECT DISTINCT ON (dot_number) {column_list}
+            FROM carrier_records_stage
+            ORDER BY dot_number, _seq DESC
+            ON CONFLICT (dot_number) DO UPDATE SET {updates}
+        """))
+        return result.rowcount
+
+    def copy_upsert_safety_metric_rows(self, rows: List[dict], columns: List[str]) -> int:
+        """
+        Upsert SafetyMetrics column dicts keyed by 'dot_number' instead of
+        carrier_id, via COPY into a staging table. Carrier ids are resolved
+        in SQL, so the carriers must already be written. The caller commits.
+        """
+        if not rows:
+            return 0
+        self._copy_to_staging(
+            "safety_metrics_stage",
+            f"SELECT ''::varchar AS dot_number, {', '.join(columns)} FROM safety_metrics",
+            ['dot_number'] + columns,
+            rows
+        )
+        updates = ', '.join(f"{column} = EXCLUDED.{column}" for column in columns)
+        result = self.db.execute(text(f"""
+            INSERT INTO safety_metrics (carrier_id, {', '.join(columns)})
+            SELECT DISTINCT ON (c.id) c.id, {', '.join('s.' + column for column in columns)}
+            FROM safety_metrics_stage s
+            JOIN carrier_records c ON c.dot_number = s.dot_number
+            ORDER BY c.id, s._seq DESC
+            ON CONFLICT (carrier_id) DO UPDATE SET {updates}
+        """))
+        return result.rowcount
+
+    def _copy_to_staging(self, stage: str, definition: str, columns: List[str], rows: List[dict]) -> None:
+        """(Re)create a transaction-scoped temp table and COPY rows into it"""
+        connection = self.db.connection()
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {stage}")
+        connection.exec_driver_sql(
+            f"CREATE TEMP TABLE {stage} ON COMMIT DROP AS "
+            f"SELECT *, 0::bigint AS _seq FROM ({definition}) AS source WITH NO DATA"
+        )
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for seq, row in enumerate(rows):
+            writer.writerow([row.get(column) for column in columns] + [seq])
+        buffer.seek(0)
+
+        cursor = connection.connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {stage} ({', '.join(columns)}, _seq) FROM STDIN WITH (FORMAT csv)",
+                buffer
+            )
+        finally:
+            cursor.close()
+
     def get_carrier_history(self, dot_number: str) -> List[models.RiskAssessment]:
         """
         Get historical risk assessments for a carrier ordered by date
@@ -1,9 +1,18 @@
 from datetime import datetime, timedelta
-from typing import Dict, Any
+from typing import Dict, Any, Iterator, Optional, Sequence
 from sqlalchemy.orm import Session
 from .processing import RoutePatternDetector, FrequencyAnalyzer
-from ..database.models import CarrierRecord, InspectionLocation
-from ..utils import do_something
+from ..database.models import CarrierRecord
+from .services import inspection_map_query
+
+def _serializable_patterns(patterns):
+    """Route patterns with their shapely segments as GeoJSON geometries"""
+    from shapely.geometry import mapping
+
+    return [
+        dict(pattern, routes=[dict(route, geometry=mapping(route['geometry'])) for route in pattern['routes']])
+        for pattern in patterns
+    ]
 
 class CarrierGeographicAnalysis:
     def __init__(self, db: Session):
@@ -11,53 +20,52 @@ class CarrierGeographicAnalysis:
         self.pattern_detector = RoutePatternDetector()
         self.frequency_analyzer = FrequencyAnalyzer()
 
-    def _get_inspection_data(self, inspections):
+    def _get_inspection_data(self, carrier_id: int):
+        # Coordinates come from PostGIS; the Geography column itself loads
+        # as WKB, which has no x/y
+        rows = self.db.execute(
+            inspection_map_query(carrier_id).execution_options(yield_per=2000)
+        )
         return [
             {
-                'inspection_date': insp.inspection_date.strftime('%Y-%m-%d'),
-                'state': insp.state,
-                'city': insp.city,
-                'longitude': insp.location.x,
-                'latitude': insp.location.y,
-                'violation_count': insp.violation_count
+                'inspection_date': row.inspection_date.strftime('%Y-%m-%d'),
+                'state': row.state,
+                'city': row.city,
+                'longitude': float(row.longitude),
+                'latitude': float(row.latitude),
+                'violation_count': row.violation_count or 0
             }
-            for insp in inspections
+            for row in rows
+            if row.inspection_date is not None and row.longitude is not None
         ]
 
     def analyze_carrier(self, dot_number: str) -> Dict[str, Any]:
         """
-        carrier = self.db.query(
-            CarrierRecord.dot_number,
-            CarrierRecord.legal_name,
-            CarrierRecord.fleet_size,
-            CarrierRecord.id
-        ).filter(
-            CarrierRecord.dot_number == dot_number
-        ).first()
+        Route patterns and state-pair frequencies of a carrier's inspections.
+
+        Args:
             dot_number (str): The DOT number of the carrier.
 
         Returns:
-            Dict[str, Any]: A dictionary containing carrier information, geographic analysis, and the analysis date.
+            Dict[str, Any]: A dictionary containing carrier information, geographic analysis, and the analysis date,
+            or an 'error' when the carrier is unknown.
         """
         # Get carrier data
         carrier = self.db.query(CarrierRecord).filter(
             CarrierRecord.dot_number == dot_number
         ).first()
-        inspections = self.db.query(InspectionLocation).filter(
-            InspectionLocation.carrier_id == carrier.id
-        ).all()
-        
-        inspection_data = self._get_inspection_data(inspections)
+        if carrier is None:
+            return {'error': f"Carrier {dot_number} not found"}
+
+        inspection_data = self._get_inspection_data(carrier.id)
         try:
-            patterns = self.pattern_detector.detect_patterns(inspection_data)
+            patterns = _serializable_patterns(self.pattern_detector.detect_patterns(inspection_data))
         except Exception as e:
             patterns = {'error': str(e)}
+        try:
             frequency_analysis = self.frequency_analyzer.analyze_state_pairs(inspection_data)
         except Exception as e:
             frequency_analysis = {'error': str(e)}
-        
-        # Analyze frequencies
-        frequency_analysis = self.frequency_analyzer.analyze_state_pairs(inspection_data)
 
         return {
             'carrier_info': {
@@ -66,14 +74,38 @@ class CarrierGeographicAnalysis:
                 'fleet_size': carrier.fleet_size
             },
             'geographic_analysis': {
-                'inspection_count': len(inspections),
+                'inspection_count': len(inspection_data),
                 'unique_states': len(set(insp['state'] for insp in inspection_data)),
-            'analysis_date': datetime.utcnow().isoformat() + 'Z',
+                'patterns': patterns,
                 'frequency_analysis': frequency_analysis
             },
             'analysis_date': datetime.utcnow().isoformat()
         }
 
+def analyze_snapshot(
+    snapshot,
+    carrier_ids: Optional[Sequence[int]] = None,
+    filter=None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Route patterns and state-pair frequencies for every carrier in a
+    src.data.snapshots.Snapshot, without touching the database.
+
+    The matching inspections are loaded at once; bound a fleet-wide run
+    with `filter` (e.g. snapshot.field('year') >= 2023) or chunks of
+    carrier_ids.
+    """
+    pattern_detector = RoutePatternDetector()
+    frequency_analyzer = FrequencyAnalyzer()
+    for carrier_id, inspection_data in snapshot.inspections_by_carrier(carrier_ids, filter):
+        yield {
+            'carrier_id': carrier_id,
+            'inspection_count': len(inspection_data),
+            'unique_states': len(set(insp['state'] for insp in inspection_data)),
+            'patterns': pattern_detector.detect_patterns(inspection_data),
+            'frequency_analysis': frequency_analyzer.analyze_state_pairs(inspection_data)
+        }
+
 # Function definition
 def analyze_data():
     return {"result": "success"}
@@ -83,11 +115,6 @@ class DataAnalyzer:
     def __init__(self):
         self.data = []
 
-# Control structures
-condition = True  # Define the condition variable
-if condition:
-    do_something()
-
 # Dictionary literal
 data = {
     "key": "value",
@@ -0,0 +1,79 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from ..database.models import CarrierRecord
+
+class VersionedCache:
+    """
+    Thread-safe LRU keyed by (carrier_id, data_version, *extra).
+
+    Entries never need a TTL: once a carrier's data version moves on, its
+    old keys simply stop being requested and age out of the LRU.
+    invalidate() drops them eagerly in this process.
+    """
+
+    def __init__(self, maxsize: int = 1024, name: str = 'unnamed'):
+        self.maxsize = maxsize
+        self.name = name
+        self.stats = {'hits': 0, 'misses': 0}
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: tuple, compute: Callable[[], Any]) -> Any:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return self._entries[key]
+            self.stats['misses'] += 1
+
+        value = compute()
+        with self._lock:
+            self._entries[key] = value
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, carrier_id: Hashable) -> None:
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == carrier_id]:
+                del self._entries[key]
+
+# Caches keyed by carrier data version; register new ones here so
+# bump_data_version can clear them all
+_caches = []
+
+def register_cache(cache: VersionedCache) -> VersionedCache:
+    _caches.append(cache)
+    return cache
+
+def cache_stats() -> Dict[str, Dict[str, int]]:
+    """Hit and miss counts of every registered cache, by name"""
+    return {cache.name: dict(cache.stats) for cache in _caches}
+
+def get_data_version(db: Session, carrier_id: int) -> int:
+    """Current data version of a carrier (a primary-key lookup)"""
+    version = db.execute(
+        select(CarrierRecord.data_version).where(CarrierRecord.id == carrier_id)
+    ).scalar()
+    return version or 0
+
+def bump_data_version(db: Session, carrier_id: int) -> None:
+    """
+    Mark a carrier's inspection-derived data as changed.
+
+    The new version is written in the caller's transaction, so other
+    processes see it once that commits; local caches are cleared now.
+    """
+    db.execute(
+        update(CarrierRecord)
+        .where(CarrierRecord.id == carrier_id)
+        .values(data_version=func.coalesce(CarrierRecord.data_version, 0) + 1)
+        .execution_options(synchronize_session=False)
+    )
+    for cache in _caches:
+        cache.invalidate(carrier_id)
@@ -0,0 +1,140 @@
+"""
+Re-detect CarrierRoute rows for many carriers in parallel.
+
+    python -m src.geographic.detect_routes --workers 8 --since 2024-01-01
+
+Carriers are split into shards and handed to a process pool. Each worker
+opens its own database session, streams every carrier's inspection points
+with a server-side cursor and runs state-pair route detection. By default
+each carrier's routes and aggregates are rebuilt from scratch; with
+--incremental only inspections past the carrier's high-water mark are read.
+The default run is the full rebuild (there is no --full flag); it is also
+what gives routes built before simplified_geometry their zoom variants.
+
+    python -m src.geographic.detect_routes --rollups --workers 8
+
+rebuilds the monthly state and state-pair rollups instead, first deriving
+oos_violation_count from raw_data for inspections stored without one. Run
+it once after deploying the rollup tables; route stats, map-data stats and
+coverage read only from the rollups.
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from sqlalchemy import select
+
+from ..database.database import SessionLocal, dispose_engine
+from ..models.geographic import InspectionLocation
+from .cache import bump_data_version
+from .rollups import backfill_oos_counts, rebuild_rollups
+from .services import refresh_carrier_routes
+
+logger = logging.getLogger(__name__)
+
+def select_carrier_ids(since: Optional[datetime] = None) -> List[int]:
+    """Carriers with inspections, optionally only those inspected on/after `since`"""
+    query = select(InspectionLocation.carrier_id).distinct()
+    if since is not None:
+        query = query.where(InspectionLocation.inspection_date >= since)
+    db = SessionLocal()
+    try:
+        return sorted(db.execute(query).scalars())
+    finally:
+        db.close()
+
+def _init_worker() -> None:
+    # Connections inherited from the parent must not be shared across processes
+    dispose_engine(close=False)
+
+def detect_shard(carrier_ids: List[int], incremental: bool = False) -> Dict[str, int]:
+    """Detect and store routes for a shard of carriers; runs in a worker process"""
+    db = SessionLocal()
+    stats = {'carriers': 0, 'routes': 0}
+    try:
+        for carrier_id in carrier_ids:
+            routes = refresh_carrier_routes(db, carrier_id, full=not incremental)
+            stats['carriers'] += 1
+            stats['routes'] += len(routes)
+        return stats
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def rollup_shard(carrier_ids: List[int]) -> Dict[str, int]:
+    """Rebuild monthly rollups for a shard of carriers; runs in a worker process"""
+    db = SessionLocal()
+    stats = {'carriers': 0, 'oos_backfilled': 0}
+    try:
+        for carrier_id in carrier_ids:
+            stats['oos_backfilled'] += backfill_oos_counts(db, carrier_id)
+            rebuild_rollups(db, carrier_id)
+            # Cached coverage was computed from the old rollups
+            bump_data_version(db, carrier_id)
+            db.commit()
+            stats['carriers'] += 1
+        return stats
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def detect_routes(
+    workers: int = os.cpu_count() or 1,
+    since: Optional[datetime] = None,
+    shard_size: int = 200,
+    incremental: bool = False,
+    rollups: bool = False
+) -> Dict[str, Any]:
+    carrier_ids = select_carrier_ids(since)
+    shards = [carrier_ids[i:i + shard_size] for i in range(0, len(carrier_ids), shard_size)]
+    task = 'Rebuilding rollups' if rollups else 'Detecting routes'
+    logger.info(f"{task} for {len(carrier_ids)} carriers in {len(shards)} shards on {workers} workers")
+
+    totals = {'carriers': 0, 'failed_shards': 0}
+    started = time.monotonic()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = {
+            pool.submit(rollup_shard, shard) if rollups else pool.submit(detect_shard, shard, incremental): shard
+            for shard in shards
+        }
+        for future in as_completed(futures):
+            try:
+                stats = future.result()
+            except Exception as e:
+                shard = futures[future]
+                logger.error(f"Shard {shard[0]}..{shard[-1]} failed: {str(e)}")
+                totals['failed_shards'] += 1
+                continue
+            for key, value in stats.items():
+                totals[key] = totals.get(key, 0) + value
+            logger.info(f"{totals['carriers']}/{len(carrier_ids)} carriers done")
+
+    totals['elapsed_seconds'] = round(time.monotonic() - started, 1)
+    return totals
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="detect-routes", description="Re-detect carrier routes in parallel")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--since', type=datetime.fromisoformat,
+                        help="Only carriers with inspections on or after this date (YYYY-MM-DD)")
+    parser.add_argument('--shard-size', type=int, default=200, help="Carriers per worker task")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Only fold in inspections newer than each carrier's high-water mark")
+    parser.add_argument('--rollups', action='store_true',
+                        help="Rebuild the monthly rollups (and missing OOS counts) instead of routes")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    print(json.dumps(detect_routes(args.workers, args.since, args.shard_size, args.incremental, args.rollups)))
+
+if __name__ == "__main__":
+    main()
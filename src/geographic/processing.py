@@ -1,61 +1,236 @@
-from typing import List, Dict, Any, Tuple
+from typing import TYPE_CHECKING, List, Dict, Any, Tuple, Optional
 from datetime import datetime, timedelta
-from shapely.geometry import Point, LineString, MultiPoint
-from shapely.ops import nearest_points
-from sklearn.cluster import DBSCAN
 import numpy as np
 from collections import defaultdict
 
+from ..utils import metrics
+
+# sklearn, scipy and shapely are imported where they are used; together
+# they add most of a second to importing this module
+if TYPE_CHECKING:
+    from scipy.sparse import csr_matrix
+    from shapely.geometry import LineString
+
+EARTH_RADIUS_MILES = 3958.8
+
+def haversine_miles(lon1, lat1, lon2, lat2) -> np.ndarray:
+    """Great-circle distance in miles; accepts scalars or arrays in degrees"""
+    lon1, lat1, lon2, lat2 = map(np.radians, (lon1, lat1, lon2, lat2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2 +
+         np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
 class RoutePatternDetector:
-    def __init__(self, min_inspections: int = 3, time_window_days: int = 365):
+    def __init__(
+        self,
+        min_inspections: int = 3,
+        time_window_days: int = 365,
+        eps: float = 0.5,
+        min_samples: int = 2,
+        eps_miles: Optional[float] = None
+    ):
+        """
+        Args:
+            eps: DBSCAN radius in raw lon/lat degrees (legacy mode)
+            eps_miles: When set, cluster geodesically instead: points are
+                converted to radians and clustered with the haversine metric
+                over a BallTree, with this radius in miles. Segment lengths
+                are then great-circle distances as well.
+        """
         self.min_inspections = min_inspections
         self.time_window = timedelta(days=time_window_days)
+        self.eps = eps
+        self.min_samples = min_samples
+        self.eps_miles = eps_miles
+
+    @property
+    def geodesic(self) -> bool:
+        return self.eps_miles is not None
+
+    def _clustering_input(self, coords: np.ndarray) -> Tuple[np.ndarray, float, Dict[str, Any]]:
+        """Points, radius and estimator options for the configured metric"""
+        if self.geodesic:
+            # haversine expects (lat, lon) in radians; radius in radians too
+            return (
+                np.radians(coords[:, ::-1]),
+                self.eps_miles / EARTH_RADIUS_MILES,
+                {'metric': 'haversine', 'algorithm': 'ball_tree'}
+            )
+        return coords, self.eps, {}
         
     def detect_patterns(self, inspections: List[Dict]) -> List[Dict]:
         if len(inspections) < self.min_inspections:
             return []
 
-        # Sort inspections by date
-        sorted_inspections = sorted(
-            inspections,
-            key=lambda x: datetime.strptime(x['inspection_date'], '%Y-%m-%d')
-        )
+        # Sort inspections by date, parsing each date once
+        sorted_inspections, dates = self._sort_by_date(inspections)
+        window = np.timedelta64(self.time_window.days, 'D')
 
         # Group by time windows
         patterns = []
-        current_window = []
-        window_start = datetime.strptime(sorted_inspections[0]['inspection_date'], '%Y-%m-%d')
+        window_start = 0
+
+        for idx in range(1, len(dates) + 1):
+            if idx < len(dates) and dates[idx] - dates[window_start] <= window:
+                continue
+            if idx - window_start >= self.min_inspections:
+                pattern = self._analyze_window(
+                    sorted_inspections[window_start:idx], dates[window_start:idx]
+                )
+                if pattern:
+                    patterns.append(pattern)
+            window_start = idx
+
+        return patterns
+
+    def detect_patterns_sliding(
+        self,
+        inspections: List[Dict],
+        step_days: int = 30,
+        window_days: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        Detect patterns in overlapping windows that advance by `step_days`.
+
+        The eps-neighbour graph is built once for all inspections. As the
+        window slides, two pointers over the sorted dates add and remove
+        inspections and update each point's in-window neighbour count, so
+        no window re-runs a neighbour search. Clusters are the connected
+        components of the in-window core points, and they match DBSCAN on
+        the same window.
+
+        Args:
+            inspections: Inspection dicts as passed to detect_patterns
+            step_days: Days between consecutive window starts
+            window_days: Window length (default: the detector's time window)
+
+        Returns:
+            One pattern per window that yields routes, each with
+            'window_start'/'window_end' dates
+        """
+        if len(inspections) < self.min_inspections:
+            return []
+        if step_days <= 0:
+            raise ValueError("step_days must be positive")
+
+        sorted_inspections, dates = self._sort_by_date(inspections)
+        graph = self._neighbor_graph(self._coordinates(sorted_inspections))
+        window = np.timedelta64(window_days or self.time_window.days, 'D')
+        step = np.timedelta64(step_days, 'D')
+
+        # In-window neighbour count per point, itself included
+        degree = np.zeros(len(dates), dtype=np.int64)
+        lo = hi = 0
+        patterns = []
+        window_start = dates[0]
+
+        while window_start <= dates[-1]:
+            window_end = window_start + window
+            while hi < len(dates) and dates[hi] <= window_end:
+                degree[graph.indices[graph.indptr[hi]:graph.indptr[hi + 1]]] += 1
+                hi += 1
+            while lo < hi and dates[lo] < window_start:
+                degree[graph.indices[graph.indptr[lo]:graph.indptr[lo + 1]]] -= 1
+                lo += 1
 
-        for inspection in sorted_inspections:
-            insp_date = datetime.strptime(inspection['inspection_date'], '%Y-%m-%d')
-            if insp_date - window_start <= self.time_window:
-                current_window.append(inspection)
+            if hi - lo >= self.min_inspections:
+                labels = self._window_labels(graph, degree, lo, hi)
+                pattern = self._build_pattern(sorted_inspections[lo:hi], dates[lo:hi], labels)
+                if pattern:
+                    pattern['window_start'] = str(window_start)
+                    pattern['window_end'] = str(window_end)
+                    patterns.append(pattern)
+
+            if lo == hi and hi < len(dates):
+                # Skip straight past gaps with no inspections
+                steps = max((dates[hi] - window_end) // step, 1)
+                window_start += steps * step
             else:
-                if len(current_window) >= self.min_inspections:
-                    pattern = self._analyze_window(current_window)
-                    if pattern:
-                        patterns.append(pattern)
-                current_window = [inspection]
-                window_start = insp_date
-
-        # Process last window
-        if len(current_window) >= self.min_inspections:
-            pattern = self._analyze_window(current_window)
-            if pattern:
-                patterns.append(pattern)
+                window_start += step
 
         return patterns
 
-    def _analyze_window(self, inspections: List[Dict]) -> Dict:
+    @staticmethod
+    def _sort_by_date(inspections: List[Dict]) -> Tuple[List[Dict], np.ndarray]:
+        dates = np.array([insp['inspection_date'] for insp in inspections], dtype='datetime64[D]')
+        order = np.argsort(dates, kind='stable')
+        return [inspections[i] for i in order], dates[order]
+
+    @staticmethod
+    def _coordinates(inspections: List[Dict]) -> np.ndarray:
+        return np.array([(insp['longitude'], insp['latitude']) for insp in inspections], dtype=np.float64)
+
+    def _neighbor_graph(self, coords: np.ndarray) -> 'csr_matrix':
+        """Symmetric eps-neighbourhood graph (self loops included), as DBSCAN uses"""
+        from sklearn.neighbors import NearestNeighbors
+
+        points, radius, options = self._clustering_input(coords)
+        with metrics.timed('dbscan'):
+            neighbors = NearestNeighbors(radius=radius, **options).fit(points)
+            graph = neighbors.radius_neighbors_graph(points, mode='connectivity')
+        graph.setdiag(1)
+        return graph.tocsr()
+
+    def _window_labels(self, graph: 'csr_matrix', degree: np.ndarray, lo: int, hi: int) -> np.ndarray:
+        """
+        DBSCAN labels for points lo..hi-1 from the shared neighbour graph.
+
+        Clusters are numbered by their lowest-index core point and border
+        points join the lowest-numbered neighbouring cluster, which is the
+        order DBSCAN's expansion assigns them in.
+        """
+        from scipy.sparse import coo_matrix
+        from scipy.sparse.csgraph import connected_components
+
+        size = hi - lo
+        labels = np.full(size, -1, dtype=np.int64)
+        core = degree[lo:hi] >= self.min_samples
+        if not core.any():
+            return labels
+
+        sub = graph[lo:hi, lo:hi].tocoo()
+        core_edges = core[sub.row] & core[sub.col]
+        core_idx = np.flatnonzero(core)
+        position = np.full(size, -1, dtype=np.int64)
+        position[core_idx] = np.arange(len(core_idx))
+
+        core_graph = coo_matrix(
+            (np.ones(core_edges.sum()), (position[sub.row[core_edges]], position[sub.col[core_edges]])),
+            shape=(len(core_idx), len(core_idx))
+        )
+        _, components = connected_components(core_graph, directed=False)
+
+        # Renumber components in order of their first core point
+        _, first = np.unique(components, return_index=True)
+        rank = np.empty(len(first), dtype=np.int64)
+        rank[np.argsort(first)] = np.arange(len(first))
+        labels[core_idx] = rank[components]
+
+        border_edges = ~core[sub.row] & core[sub.col]
+        if border_edges.any():
+            border_labels = np.full(size, np.iinfo(np.int64).max, dtype=np.int64)
+            np.minimum.at(border_labels, sub.row[border_edges], labels[sub.col[border_edges]])
+            border = border_labels != np.iinfo(np.int64).max
+            labels[border] = border_labels[border]
+
+        return labels
+
+    def _analyze_window(self, inspections: List[Dict], dates: Optional[np.ndarray] = None) -> Dict:
+        from sklearn.cluster import DBSCAN
+
         # Extract coordinates
-        coords = [(insp['longitude'], insp['latitude']) for insp in inspections]
+        coords = self._coordinates(inspections)
+        points, radius, options = self._clustering_input(coords)
         
         # Perform clustering
-        clustering = DBSCAN(eps=0.5, min_samples=2).fit(coords)
-        
+        with metrics.timed('dbscan'):
+            clustering = DBSCAN(eps=radius, min_samples=self.min_samples, **options).fit(points)
+        return self._build_pattern(inspections, dates, clustering.labels_)
+
+    def _build_pattern(self, inspections: List[Dict], dates: Optional[np.ndarray], labels: np.ndarray) -> Dict:
         # Analyze clusters
         clusters = defaultdict(list)
-        for idx, label in enumerate(clustering.labels_):
+        for idx, label in enumerate(labels):
             if label >= 0:  # Ignore noise points (-1)
                 clusters[label].append(inspections[idx])
 
@@ -74,10 +249,12 @@ class RoutePatternDetector:
             'end_date': max(insp['inspection_date'] for insp in inspections),
             'inspection_count': len(inspections),
             'routes': routes,
-            'confidence_score': self._calculate_confidence(inspections, routes)
+            'confidence_score': self._calculate_confidence(inspections, routes, dates)
         }
 
     def _create_route_segment(self, inspections: List[Dict]) -> Dict:
+        from shapely.geometry import LineString
+
         points = [(insp['longitude'], insp['latitude']) for insp in inspections]
         line = LineString(points)
         
@@ -89,11 +266,21 @@ class RoutePatternDetector:
             'inspection_count': len(inspections)
         }
 
-    def _calculate_distance(self, line: LineString) -> float:
+    def _calculate_distance(self, line: 'LineString') -> float:
+        if self.geodesic:
+            coords = np.asarray(line.coords)
+            return float(haversine_miles(
+                coords[:-1, 0], coords[:-1, 1], coords[1:, 0], coords[1:, 1]
+            ).sum())
         # Approximate distance in miles
         return line.length * 69.172
 
-    def _calculate_confidence(self, inspections: List[Dict], routes: List[Dict]) -> float:
+    def _calculate_confidence(
+        self,
+        inspections: List[Dict],
+        routes: List[Dict],
+        dates: Optional[np.ndarray] = None
+    ) -> float:
         # Factors affecting confidence:
         # 1. Number of inspections
         # 2. Time span coverage
@@ -101,9 +288,9 @@ class RoutePatternDetector:
         
         insp_count_score = min(len(inspections) / 10, 1.0)
         
-        dates = [datetime.strptime(insp['inspection_date'], '%Y-%m-%d') 
-                for insp in inspections]
-        time_span = (max(dates) - min(dates)).days
+        if dates is None:
+            dates = np.array([insp['inspection_date'] for insp in inspections], dtype='datetime64[D]')
+        time_span = int((dates.max() - dates.min()).astype(np.int64))
         time_score = min(time_span / 180, 1.0)  # Scale based on 6 months
         
         route_score = min(len(routes) / 5, 1.0)
@@ -166,35 +353,4 @@ def create_coordinate_array(inspection_data):
         [inspection['longitude'], inspection['latitude']] 
         for inspection in inspection_data
     ])
-    return coordinates
-
-# Option 1: Define specific coordinates
-longitude1 = -122.6750  # Example: Portland, OR coordinates
-
-# Option 2: Get coordinates from data
-inspection_data = [
-    {'longitude': -122.6750, 'latitude': 45.5051},  # Example data
-    # Add more inspection data as needed
-]
-longitude1 = inspection_data[0]['longitude']
-latitude1 = inspection_data[0]['latitude']
-
-# Define longitude2 and latitude2 for the example
-longitude2 = -122.6765  # Example: another coordinate
-latitude2 = 45.5231     # Example: another coordinate
-
-# Sample coordinates
-coords = np.array([
-    [longitude1, latitude1],
-    [longitude2, latitude2],
-    # ... more coordinates
-])
-
-# Create DBSCAN clustering
-clustering = DBSCAN(
-    eps=0.5,        # Maximum distance between points in cluster
-    min_samples=2   # Minimum points to form cluster
-).fit(coords)
-
-# Get cluster labels
-labels = clustering.labels_
\ No newline at end of file
+    return coordinates
\ No newline at end of file
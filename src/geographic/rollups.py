@@ -0,0 +1,205 @@
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, Any, Iterable, List, Optional
+
+from sqlalchemy import delete, func, select, text, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from ..models.geographic import InspectionLocation, CarrierStateMonthly, CarrierStatePairMonthly
+
+def _month(value: datetime) -> date:
+    return date(value.year, value.month, 1)
+
+def count_oos_violations(inspection: Dict[str, Any]) -> int:
+    """Out-of-service violations of one FMCSA inspection record"""
+    if 'oosViolations' in inspection:
+        return int(inspection['oosViolations'] or 0)
+    return sum(
+        1 for violation in inspection.get('violations', [])
+        if isinstance(violation, dict) and violation.get('oos')
+    )
+
+def update_rollups(db: Session, carrier_id: int, locations: Iterable[InspectionLocation]) -> None:
+    """
+    Fold newly ingested inspections into the monthly rollups.
+
+    Transitions are chained from the carrier's latest stored inspection
+    through the new ones in date order. Inspections backfilled into the
+    middle of existing history split a transition that was already
+    counted; run rebuild_rollups for such carriers.
+    """
+    locations = sorted(locations, key=lambda loc: loc.inspection_date)
+    if not locations:
+        return
+
+    states = defaultdict(lambda: [0, 0, 0])
+    for location in locations:
+        totals = states[(location.state, _month(location.inspection_date))]
+        totals[0] += 1
+        totals[1] += location.violation_count or 0
+        totals[2] += location.oos_violation_count or 0
+
+    previous = db.execute(
+        select(
+            InspectionLocation.inspection_date,
+            InspectionLocation.state,
+            InspectionLocation.violation_count,
+            InspectionLocation.oos_violation_count
+        ).where(
+            InspectionLocation.carrier_id == carrier_id,
+            InspectionLocation.inspection_date <= locations[0].inspection_date
+        ).order_by(
+            InspectionLocation.inspection_date.desc(), InspectionLocation.id.desc()
+        ).limit(1)
+    ).first()
+
+    pairs = defaultdict(lambda: [0, 0, 0])
+    for current in locations:
+        if previous is not None:
+            totals = pairs[(f"{previous.state}-{current.state}", _month(previous.inspection_date))]
+            totals[0] += 1
+            totals[1] += (previous.violation_count or 0) + (current.violation_count or 0)
+            totals[2] += (previous.oos_violation_count or 0) + (current.oos_violation_count or 0)
+        previous = current
+
+    _increment(db, CarrierStateMonthly, 'state', 'inspection_count', carrier_id, states)
+    _increment(db, CarrierStatePairMonthly, 'state_pair', 'transition_count', carrier_id, pairs)
+
+def _increment(db: Session, model, key_column: str, count_column: str, carrier_id: int, totals: Dict) -> None:
+    if not totals:
+        return
+    rows = [
+        {
+            'carrier_id': carrier_id,
+            key_column: key,
+            'month': month,
+            count_column: count,
+            'violation_count': violations,
+            'oos_count': oos
+        }
+        for (key, month), (count, violations, oos) in totals.items()
+    ]
+    stmt = insert(model)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['carrier_id', key_column, 'month'],
+        set_={
+            column: getattr(model, column) + stmt.excluded[column]
+            for column in (count_column, 'violation_count', 'oos_count')
+        }
+    )
+    db.execute(stmt, rows)
+
+def backfill_oos_counts(db: Session, carrier_id: int) -> int:
+    """
+    Derive oos_violation_count from raw_data for inspections stored before
+    the column existed; the caller commits. Returns the rows updated.
+    """
+    rows = db.execute(
+        select(InspectionLocation.id, InspectionLocation.raw_data).where(
+            InspectionLocation.carrier_id == carrier_id,
+            InspectionLocation.oos_violation_count.is_(None)
+        )
+    ).all()
+    if not rows:
+        return 0
+    db.execute(
+        update(InspectionLocation),
+        [{'id': row.id, 'oos_violation_count': count_oos_violations(row.raw_data or {})} for row in rows]
+    )
+    return len(rows)
+
+def rebuild_rollups(db: Session, carrier_id: int) -> None:
+    """Recompute a carrier's rollups from inspection_locations; the caller commits"""
+    db.execute(delete(CarrierStateMonthly).where(CarrierStateMonthly.carrier_id == carrier_id))
+    db.execute(delete(CarrierStatePairMonthly).where(CarrierStatePairMonthly.carrier_id == carrier_id))
+    db.execute(text("""
+        INSERT INTO carrier_state_monthly
+            (carrier_id, state, month, inspection_count, violation_count, oos_count)
+        SELECT carrier_id, state, date_trunc('month', inspection_date)::date,
+               count(*), coalesce(sum(violation_count), 0), coalesce(sum(oos_violation_count), 0)
+        FROM inspection_locations
+        WHERE carrier_id = :carrier_id
+        GROUP BY carrier_id, state, date_trunc('month', inspection_date)
+    """), {'carrier_id': carrier_id})
+    db.execute(text("""
+        INSERT INTO carrier_state_pair_monthly
+            (carrier_id, state_pair, month, transition_count, violation_count, oos_count)
+        SELECT carrier_id, state || '-' || next_state, date_trunc('month', inspection_date)::date,
+               count(*),
+               sum(coalesce(violation_count, 0) + coalesce(next_violations, 0)),
+               sum(coalesce(oos_violation_count, 0) + coalesce(next_oos, 0))
+        FROM (
+            SELECT carrier_id, state, inspection_date, violation_count, oos_violation_count,
+                   lead(state) OVER w AS next_state,
+                   lead(violation_count) OVER w AS next_violations,
+                   lead(oos_violation_count) OVER w AS next_oos
+            FROM inspection_locations
+            WHERE carrier_id = :carrier_id
+            WINDOW w AS (ORDER BY inspection_date, id)
+        ) AS transitions
+        WHERE next_state IS NOT NULL
+        GROUP BY carrier_id, state || '-' || next_state, date_trunc('month', inspection_date)
+    """), {'carrier_id': carrier_id})
+
+def state_totals(db: Session, carrier_id: int, since: Optional[date] = None) -> Dict[str, Dict[str, int]]:
+    """Per-state inspection, violation and OOS totals from the monthly rollup"""
+    query = select(
+        CarrierStateMonthly.state,
+        func.sum(CarrierStateMonthly.inspection_count),
+        func.sum(CarrierStateMonthly.violation_count),
+        func.sum(CarrierStateMonthly.oos_count)
+    ).where(
+        CarrierStateMonthly.carrier_id == carrier_id
+    ).group_by(CarrierStateMonthly.state)
+    if since is not None:
+        query = query.where(CarrierStateMonthly.month >= _month(since))
+
+    return {
+        state: {
+            'inspection_count': int(inspections),
+            'violation_count': int(violations),
+            'oos_count': int(oos)
+        }
+        for state, inspections, violations, oos in db.execute(query)
+    }
+
+def state_pair_totals(db: Session, carrier_id: int, since: Optional[date] = None) -> Dict[str, Dict[str, Any]]:
+    """Per state-pair transition totals from the monthly rollup"""
+    query = select(
+        CarrierStatePairMonthly.state_pair,
+        func.sum(CarrierStatePairMonthly.transition_count),
+        func.sum(CarrierStatePairMonthly.violation_count),
+        func.sum(CarrierStatePairMonthly.oos_count),
+        func.min(CarrierStatePairMonthly.month),
+        func.max(CarrierStatePairMonthly.month)
+    ).where(
+        CarrierStatePairMonthly.carrier_id == carrier_id
+    ).group_by(CarrierStatePairMonthly.state_pair)
+    if since is not None:
+        query = query.where(CarrierStatePairMonthly.month >= _month(since))
+
+    return {
+        pair: {
+            'count': int(count),
+            'violations': int(violations),
+            'oos_count': int(oos),
+            'first_month': first.isoformat(),
+            'last_month': last.isoformat()
+        }
+        for pair, count, violations, oos, first, last in db.execute(query)
+    }
+
+def most_frequent_pairs(state_pairs: Dict[str, Dict[str, Any]], limit: int = 5) -> List[Dict[str, Any]]:
+    """Top state pairs, shaped like FrequencyAnalyzer._get_most_frequent"""
+    ranked = sorted(state_pairs.items(), key=lambda item: item[1]['count'], reverse=True)
+    return [
+        {
+            'states': pair,
+            'frequency': totals['count'],
+            'violations': totals['violations'],
+            'first_month': totals['first_month'],
+            'last_month': totals['last_month']
+        }
+        for pair, totals in ranked[:limit]
+    ]
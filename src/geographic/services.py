@@ -1,20 +1,28 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+from collections import namedtuple
 from datetime import datetime
-from geoalchemy2.shape import from_shape
-from shapely.geometry import Point, LineString
+from geoalchemy2 import Geometry
+from sqlalchemy import case, cast, delete, func, select, tuple_
 from sqlalchemy.orm import Session
-from functools import lru_cache
 from ..database.models import CarrierRecord
-from ..models.geographic import InspectionLocation, CarrierRoute
+from ..models.geographic import InspectionLocation, CarrierRoute, StatePairAggregate, CarrierRouteState
+from .rollups import count_oos_violations, update_rollups, state_totals
+from .cache import VersionedCache, register_cache, get_data_version, bump_data_version
+from .visualization import FULL_PRECISION, GeoVisualizer, route_level, route_variants, simplify_lines
 import logging
+import orjson
 
 class LocationProcessor:
     def __init__(self, db: Session):
         self.db = db
 
     def process_inspection_data(self, carrier_data: Dict[str, Any]) -> List[InspectionLocation]:
-        # Creates InspectionLocation objects from FMCSA inspection data
+        # Creates InspectionLocation objects from FMCSA inspection data and
+        # adds them to the session along with their rollups; the caller commits
         # Uses PostGIS to store geographic points
+        from geoalchemy2.shape import from_shape
+        from shapely.geometry import Point
+
         carrier = carrier_data['carrier']
         dot_number = str(carrier['dotNumber'])
         
@@ -42,6 +50,7 @@ class LocationProcessor:
                     city=inspection['city'],
                     level=inspection.get('level'),
                     violation_count=len(inspection.get('violations', [])),
+                    oos_violation_count=count_oos_violations(inspection),
                     raw_data=inspection,
                     # Create PostGIS point from lat/long
                     location=from_shape(Point(
@@ -50,91 +59,387 @@ class LocationProcessor:
                     ), srid=4326)
                 )
                 locations.append(location)
+
+        if locations:
+            # Added after update_rollups: an autoflush before its query for
+            # the latest stored inspection would chain the new rows to
+            # themselves. Locations, rollups and version commit together.
+            update_rollups(self.db, carrier_record.id, locations)
+            self.db.add_all(locations)
+            bump_data_version(self.db, carrier_record.id)
                 
         return locations
 
     def detect_routes(self, carrier_id: int) -> List[CarrierRoute]:
         # Analyzes inspection locations to detect common routes
         # Creates CarrierRoute objects for frequently traveled paths
-        # Get all inspection locations for carrier
-        locations = self.db.query(InspectionLocation).filter(
-            InspectionLocation.carrier_id == carrier_id
-        ).order_by(InspectionLocation.inspection_date).all()
-        
-        if len(locations) < 2:
-            return []
+        # Stream inspection points for carrier in date order
+        rows = self.db.execute(
+            inspection_points_query(carrier_id).execution_options(yield_per=5000)
+        )
+        state_pairs = accumulate_state_pairs(rows)
+        return build_routes(carrier_id, state_pairs)
 
-        routes = []
-        # Group points by state pairs
-        state_pairs = {}
-        
-        for i in range(len(locations)-1):
-            state_a = locations[i].state
-            state_b = locations[i+1].state
-            
-            if state_a != state_b:
-                key = f"{state_a}-{state_b}"
-                if key not in state_pairs:
-                    state_pairs[key] = {
-                        'points': [],
-                        'count': 0,
-                        'first_seen': locations[i].inspection_date,
-                        'last_seen': locations[i+1].inspection_date
-                    }
-                
-                state_pairs[key]['points'].extend([
-                    locations[i].location,
-                    locations[i+1].location
-                ])
-                state_pairs[key]['count'] += 1
-
-        # Create routes from frequent state pairs
-        for key, data in state_pairs.items():
-            if data['count'] >= 3:  # Minimum frequency threshold
-                confidence = min(data['count'] / 10, 1.0)  # Scale confidence 0-1
-                
-                route = CarrierRoute(
-                    carrier_id=carrier_id,
-                    route_geometry=LineString(data['points']),
-                    confidence_score=confidence,
-                    first_seen=data['first_seen'],
-                    last_seen=data['last_seen'],
-                    inspection_count=data['count']
-                )
-                routes.append(route)
+    def refresh_routes(self, carrier_id: int, full: bool = False) -> List[CarrierRoute]:
+        # Incremental counterpart of detect_routes that persists its results
+        return refresh_carrier_routes(self.db, carrier_id, full)
+
+MIN_ROUTE_FREQUENCY = 3
+MAX_ROUTE_POINTS = 200
+METERS_PER_MILE = 1609.344
+
+InspectionPoint = namedtuple('InspectionPoint', 'inspection_date state longitude latitude')
+
+def inspection_points_query(
+    carrier_id: int,
+    since: Optional[datetime] = None,
+    after: Optional[Tuple[datetime, int]] = None
+):
+    """
+    Date-ordered (id, inspection_date, state, longitude, latitude) rows for a carrier.
+
+    `after` is an (inspection_date, id) high-water mark; only rows past it
+    in that ordering are returned.
+    """
+    point = cast(InspectionLocation.location, Geometry(srid=4326))
+    query = select(
+        InspectionLocation.id,
+        InspectionLocation.inspection_date,
+        InspectionLocation.state,
+        func.ST_X(point).label('longitude'),
+        func.ST_Y(point).label('latitude')
+    ).where(
+        InspectionLocation.carrier_id == carrier_id
+    ).order_by(InspectionLocation.inspection_date, InspectionLocation.id)
+    if since is not None:
+        query = query.where(InspectionLocation.inspection_date >= since)
+    if after is not None:
+        query = query.where(
+            tuple_(InspectionLocation.inspection_date, InspectionLocation.id) > tuple_(*after)
+        )
+    return query
+
+def inspection_map_query(carrier_id: int, after: Optional[int] = None, limit: Optional[int] = None):
+    """
+    Id-ordered inspection rows for map rendering.
+
+    `after` is the last inspection id of the previous page, so pages are
+    cheap keyset scans however deep the caller goes.
+    """
+    point = cast(InspectionLocation.location, Geometry(srid=4326))
+    query = select(
+        InspectionLocation.id,
+        func.ST_X(point).label('longitude'),
+        func.ST_Y(point).label('latitude'),
+        InspectionLocation.inspection_date,
+        InspectionLocation.state,
+        InspectionLocation.city,
+        InspectionLocation.violation_count
+    ).where(
+        InspectionLocation.carrier_id == carrier_id
+    ).order_by(InspectionLocation.id)
+    if after is not None:
+        query = query.where(InspectionLocation.id > after)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+def route_map_query(carrier_id: int, level: Optional[int] = None):
+    """
+    Carrier routes with their geometry as GeoJSON text, or as the
+    precomputed coordinates for a ROUTE_ZOOM_LEVELS `level`. Routes
+    without precomputed variants fall back to the full geometry; they get
+    variants on the next default (non --incremental) detect_routes run.
+    """
+    if level is None:
+        geometry = [func.ST_AsGeoJSON(CarrierRoute.route_geometry, FULL_PRECISION).label('geojson')]
+    else:
+        coordinates = CarrierRoute.simplified_geometry[str(level)]
+        geometry = [
+            coordinates.label('coordinates'),
+            case(
+                (coordinates.is_(None), func.ST_AsGeoJSON(CarrierRoute.route_geometry, FULL_PRECISION))
+            ).label('geojson')
+        ]
+    return select(
+        CarrierRoute.id,
+        *geometry,
+        CarrierRoute.confidence_score,
+        CarrierRoute.inspection_count,
+        CarrierRoute.first_seen,
+        CarrierRoute.last_seen
+    ).where(
+        CarrierRoute.carrier_id == carrier_id
+    ).order_by(CarrierRoute.id)
+
+def route_features(
+    db: Session,
+    carrier_id: int,
+    data_version: int,
+    zoom: Optional[float] = None,
+    tolerance: Optional[float] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Route Features for a map view.
+
+    `zoom` serves the precomputed variant for that zoom; an explicit
+    `tolerance` (degrees) simplifies the full geometries on the fly, cached
+    per carrier data version.
+    """
+    if tolerance is None:
+        level = route_level(zoom) if zoom is not None else None
+        rows = db.execute(route_map_query(carrier_id, level).execution_options(yield_per=500))
+        for row in rows:
+            yield GeoVisualizer.route_feature(row._mapping)
+        return
+
+    def simplify() -> List[Dict[str, Any]]:
+        routes = [dict(row._mapping) for row in db.execute(route_map_query(carrier_id))]
+        lines = [orjson.loads(route.pop('geojson'))['coordinates'] for route in routes]
+        for route, coordinates in zip(routes, simplify_lines(lines, tolerance)):
+            route['coordinates'] = coordinates
+        return [GeoVisualizer.route_feature(route) for route in routes]
+
+    yield from _simplified_route_cache.get_or_compute((carrier_id, data_version, tolerance), simplify)
+
+class StatePairAccumulator:
+    """
+    Groups consecutive inspections that cross a state line by state pair.
+
+    Locations are fed in date order and only need inspection_date, state,
+    longitude and latitude attributes. Each pair keeps a transition count,
+    first/last seen dates and a point sample of at most `max_points`:
+    once full, every other sampled transition is dropped and the sampling
+    stride doubles, so the sample stays spread over the whole history.
+    """
+
+    def __init__(
+        self,
+        state_pairs: Optional[Dict[str, Dict[str, Any]]] = None,
+        previous: Optional[Any] = None,
+        max_points: int = MAX_ROUTE_POINTS
+    ):
+        self.state_pairs = state_pairs if state_pairs is not None else {}
+        self.previous = previous
+        self.max_points = max_points
+        self.touched = set()
+
+    def add(self, current: Any) -> None:
+        previous = self.previous
+        self.previous = current
+        if previous is None or previous.state == current.state:
+            return
 
-        return routes
+        key = f"{previous.state}-{current.state}"
+        if key not in self.state_pairs:
+            self.state_pairs[key] = {
+                'points': [],
+                'count': 0,
+                'stride': 1,
+                'first_seen': previous.inspection_date,
+                'last_seen': current.inspection_date
+            }
+
+        pair = self.state_pairs[key]
+        if pair['count'] % pair['stride'] == 0:
+            pair['points'].extend([
+                (previous.longitude, previous.latitude),
+                (current.longitude, current.latitude)
+            ])
+            if len(pair['points']) > self.max_points:
+                pair['points'] = [
+                    point for i in range(0, len(pair['points']), 4)
+                    for point in pair['points'][i:i + 2]
+                ]
+                pair['stride'] *= 2
+        pair['count'] += 1
+        pair['last_seen'] = current.inspection_date
+        self.touched.add(key)
+
+    def consume(self, locations: Iterable[Any]) -> Optional[Any]:
+        """Add every location; returns the last one seen, if any"""
+        last = None
+        for last in locations:
+            self.add(last)
+        return last
+
+def accumulate_state_pairs(locations: Iterable[Any]) -> Dict[str, Dict[str, Any]]:
+    """Group consecutive inspections that cross a state line by state pair"""
+    accumulator = StatePairAccumulator()
+    accumulator.consume(locations)
+    return accumulator.state_pairs
+
+def _apply_route(route: CarrierRoute, pair: Dict[str, Any], variants: Dict[str, Any]) -> CarrierRoute:
+    from geoalchemy2.shape import from_shape
+    from shapely.geometry import LineString
+
+    route.route_geometry = from_shape(LineString(pair['points']), srid=4326)
+    route.simplified_geometry = variants
+    route.confidence_score = min(pair['count'] / 10, 1.0)  # Scale confidence 0-1
+    route.first_seen = pair['first_seen']
+    route.last_seen = pair['last_seen']
+    route.inspection_count = pair['count']
+    return route
+
+def build_routes(
+    carrier_id: int,
+    state_pairs: Dict[str, Dict[str, Any]],
+    min_count: int = MIN_ROUTE_FREQUENCY
+) -> List[CarrierRoute]:
+    """Create CarrierRoute objects from frequent state pairs"""
+    pairs = [
+        data for data in state_pairs.values()
+        if data['count'] >= min_count  # Minimum frequency threshold
+    ]
+    return [
+        _apply_route(CarrierRoute(carrier_id=carrier_id), data, variants)
+        for data, variants in zip(pairs, route_variants([data['points'] for data in pairs]))
+    ]
+
+def refresh_carrier_routes(db: Session, carrier_id: int, full: bool = False) -> List[CarrierRoute]:
+    """
+    Fold inspections newer than the carrier's high-water mark into its
+    persisted state-pair aggregates and update the routes that changed.
+
+    Inspections are processed in (inspection_date, id) order, so rows
+    backfilled with dates before the mark are only picked up by a full
+    rebuild (`full=True`), which drops the aggregates, routes and mark first.
+
+    Returns:
+        CarrierRoute rows created or updated by this refresh
+    """
+    if full:
+        db.execute(delete(StatePairAggregate).where(StatePairAggregate.carrier_id == carrier_id))
+        db.execute(delete(CarrierRoute).where(CarrierRoute.carrier_id == carrier_id))
+        db.execute(delete(CarrierRouteState).where(CarrierRouteState.carrier_id == carrier_id))
+        state = None
+    else:
+        state = db.get(CarrierRouteState, carrier_id)
+
+    previous = None
+    mark = None
+    if state is None:
+        state = CarrierRouteState(carrier_id=carrier_id)
+        db.add(state)
+    elif state.last_inspection_id is not None:
+        mark = (state.last_inspection_date, state.last_inspection_id)
+        previous = InspectionPoint(
+            state.last_inspection_date, state.last_state,
+            state.last_longitude, state.last_latitude
+        )
+
+    aggregates = {
+        aggregate.state_pair: aggregate
+        for aggregate in db.query(StatePairAggregate).filter(
+            StatePairAggregate.carrier_id == carrier_id
+        )
+    }
+    accumulator = StatePairAccumulator(
+        {
+            key: {
+                'points': [tuple(point) for point in aggregate.sample_points or []],
+                'count': aggregate.transition_count,
+                'stride': aggregate.sample_stride,
+                'first_seen': aggregate.first_seen,
+                'last_seen': aggregate.last_seen
+            }
+            for key, aggregate in aggregates.items()
+        },
+        previous=previous
+    )
+
+    rows = db.execute(
+        inspection_points_query(carrier_id, after=mark).execution_options(yield_per=5000)
+    )
+    last = accumulator.consume(rows)
+    if last is None:
+        if full:
+            # The carrier's routes were deleted; cached coverage, tiles and
+            # simplified routes must not keep serving them
+            bump_data_version(db, carrier_id)
+        db.commit()
+        return []
+
+    routed = []
+    for key in accumulator.touched:
+        pair = accumulator.state_pairs[key]
+        aggregate = aggregates.get(key)
+        if aggregate is None:
+            aggregate = StatePairAggregate(carrier_id=carrier_id, state_pair=key)
+            db.add(aggregate)
+        aggregate.transition_count = pair['count']
+        aggregate.first_seen = pair['first_seen']
+        aggregate.last_seen = pair['last_seen']
+        aggregate.sample_points = [list(point) for point in pair['points']]
+        aggregate.sample_stride = pair['stride']
+
+        if pair['count'] >= MIN_ROUTE_FREQUENCY:
+            routed.append((aggregate, pair))
+
+    # Simplified variants are computed for all changed routes in one pass
+    changed = []
+    for (aggregate, pair), variants in zip(routed, route_variants([pair['points'] for _, pair in routed])):
+        aggregate.route = _apply_route(
+            aggregate.route or CarrierRoute(carrier_id=carrier_id), pair, variants
+        )
+        changed.append(aggregate.route)
+
+    state.last_inspection_id = last.id
+    state.last_inspection_date = last.inspection_date
+    state.last_state = last.state
+    state.last_longitude = last.longitude
+    state.last_latitude = last.latitude
+
+    # A full rebuild deleted every route, including any not recreated
+    if changed or full:
+        bump_data_version(db, carrier_id)
+    db.commit()
+    return changed
 
 class RouteAnalyzer:
     def __init__(self, db: Session):
         self.db = db
 
-    @lru_cache(maxsize=128)
     def get_carrier_coverage(self, carrier_id: int) -> Dict[str, Any]:
         # Returns statistics about carrier's geographic presence
         # Includes route count, locations, state coverage
-        routes = self.db.query(CarrierRoute).filter(
-            CarrierRoute.carrier_id == carrier_id
-        ).all()
-        
-        locations = self.db.query(InspectionLocation).filter(
-            InspectionLocation.carrier_id == carrier_id
-        ).all()
-
-        states = {}
-        for location in locations:
-            if location.state not in states:
-                states[location.state] = {
-                    'inspection_count': 0,
-                    'violation_count': 0
-                }
-            states[location.state]['inspection_count'] += 1
-            states[location.state]['violation_count'] += location.violation_count
+        version = get_data_version(self.db, carrier_id)
+        return _coverage_cache.get_or_compute(
+            (carrier_id, version),
+            lambda: self._compute_coverage(carrier_id)
+        )
+
+    def _compute_coverage(self, carrier_id: int) -> Dict[str, Any]:
+        route_count, confidence_avg = self.db.execute(
+            select(
+                func.count(CarrierRoute.id),
+                func.avg(CarrierRoute.confidence_score)
+            ).where(CarrierRoute.carrier_id == carrier_id)
+        ).one()
+
+        states = state_totals(self.db, carrier_id)
 
         return {
-            'route_count': len(routes),
-            'location_count': len(locations),
+            'route_count': route_count,
+            'location_count': sum(s['inspection_count'] for s in states.values()),
             'state_coverage': len(states),
             'state_details': states,
-            'confidence_avg': sum(r.confidence_score for r in routes) / len(routes) if routes else 0
-        }
\ No newline at end of file
+            'confidence_avg': float(confidence_avg) if route_count else 0
+        }
+
+    def get_route_summaries(self, carrier_id: int) -> List[Dict[str, Any]]:
+        # Persisted routes with their geodesic length computed by PostGIS
+        rows = self.db.execute(
+            select(
+                CarrierRoute.id,
+                CarrierRoute.confidence_score.label('confidence'),
+                CarrierRoute.inspection_count,
+                CarrierRoute.first_seen,
+                CarrierRoute.last_seen,
+                (func.ST_Length(CarrierRoute.route_geometry) / METERS_PER_MILE).label('distance_miles')
+            ).where(CarrierRoute.carrier_id == carrier_id)
+        )
+        return [dict(row._mapping) for row in rows]
+
+_coverage_cache = register_cache(VersionedCache(maxsize=1024, name='coverage'))
+_simplified_route_cache = register_cache(VersionedCache(maxsize=256, name='simplified_routes'))
@@ -0,0 +1,167 @@
+"""
+Slippy-map tiles over a carrier's inspection points.
+
+Points are indexed as a linear quadtree: each point gets the Morton code
+(quadkey) of the INDEX_ZOOM tile containing it and the index is sorted by
+that key. Every tile at every coarser zoom is then one contiguous slice of
+the sorted keys, found with two binary searches, and its sub-tiles are
+runs within that slice, which is what low-zoom clustering aggregates over.
+"""
+import math
+from typing import Dict, Any, Tuple
+
+import numpy as np
+import orjson
+from sqlalchemy import cast, func, select
+from sqlalchemy.orm import Session
+from geoalchemy2 import Geometry
+
+from ..models.geographic import InspectionLocation
+from .cache import VersionedCache, register_cache
+
+INDEX_ZOOM = 22
+# Below POINT_ZOOM, or when a tile holds more than MAX_TILE_POINTS points,
+# a tile is returned as clusters on a 2**CLUSTER_DEPTH square grid
+POINT_ZOOM = 10
+MAX_TILE_POINTS = 2000
+CLUSTER_DEPTH = 6
+MAX_LATITUDE = 85.0511287798
+
+def _spread_bits(values: np.ndarray) -> np.ndarray:
+    """Interleave zeros between the low 32 bits of each value"""
+    v = values.astype(np.uint64)
+    for shift, mask in (
+        (16, 0x0000FFFF0000FFFF),
+        (8, 0x00FF00FF00FF00FF),
+        (4, 0x0F0F0F0F0F0F0F0F),
+        (2, 0x3333333333333333),
+        (1, 0x5555555555555555),
+    ):
+        v = (v | (v << np.uint64(shift))) & np.uint64(mask)
+    return v
+
+def tile_key(z: int, x: int, y: int) -> int:
+    """Quadkey of a tile as an integer (two bits per zoom level, y bit high)"""
+    key = 0
+    for level in range(z - 1, -1, -1):
+        key = (key << 2) | (((y >> level) & 1) << 1) | ((x >> level) & 1)
+    return key
+
+def point_keys(longitudes: np.ndarray, latitudes: np.ndarray, zoom: int = INDEX_ZOOM) -> np.ndarray:
+    """Quadkeys of the zoom-level tiles containing each point (Web Mercator)"""
+    n = 2 ** zoom
+    lat = np.radians(np.clip(latitudes, -MAX_LATITUDE, MAX_LATITUDE))
+    x = (np.asarray(longitudes) + 180.0) / 360.0 * n
+    y = (1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / math.pi) / 2.0 * n
+    x = np.clip(np.floor(x), 0, n - 1)
+    y = np.clip(np.floor(y), 0, n - 1)
+    return (_spread_bits(y) << np.uint64(1)) | _spread_bits(x)
+
+class TileIndex:
+    """Inspection points of one carrier sorted by INDEX_ZOOM quadkey"""
+
+    def __init__(self, ids: np.ndarray, longitudes: np.ndarray, latitudes: np.ndarray, violations: np.ndarray):
+        keys = point_keys(longitudes, latitudes)
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.ids = np.asarray(ids)[order]
+        self.longitudes = np.asarray(longitudes, dtype=float)[order]
+        self.latitudes = np.asarray(latitudes, dtype=float)[order]
+        self.violations = np.asarray(violations)[order]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _range(self, z: int, x: int, y: int) -> Tuple[int, int]:
+        shift = 2 * (INDEX_ZOOM - z)
+        key = tile_key(z, x, y)
+        start = np.searchsorted(self.keys, np.uint64(key << shift), side='left')
+        end = np.searchsorted(self.keys, np.uint64((key + 1) << shift), side='left')
+        return int(start), int(end)
+
+    def tile(self, z: int, x: int, y: int) -> Dict[str, Any]:
+        """GeoJSON FeatureCollection of the tile's points or clusters"""
+        start, end = self._range(z, x, y)
+        clustered = z < POINT_ZOOM or end - start > MAX_TILE_POINTS
+        features = self._clusters(z, start, end) if clustered else self._points(start, end)
+        return {
+            'type': 'FeatureCollection',
+            'tile': [z, x, y],
+            'clustered': clustered,
+            'point_count': end - start,
+            'features': features
+        }
+
+    def _points(self, start: int, end: int) -> list:
+        return [
+            {
+                'type': 'Feature',
+                'geometry': {'type': 'Point', 'coordinates': [lon, lat]},
+                'properties': {'id': inspection_id, 'violations': violations}
+            }
+            for inspection_id, lon, lat, violations in zip(
+                self.ids[start:end].tolist(),
+                self.longitudes[start:end].tolist(),
+                self.latitudes[start:end].tolist(),
+                self.violations[start:end].tolist()
+            )
+        ]
+
+    def _clusters(self, z: int, start: int, end: int) -> list:
+        if start == end:
+            return []
+        depth = min(CLUSTER_DEPTH, INDEX_ZOOM - z)
+        cells = self.keys[start:end] >> np.uint64(2 * (INDEX_ZOOM - z - depth))
+        # Keys are sorted, so each grid cell is a run of equal values
+        starts = np.flatnonzero(np.concatenate(([True], cells[1:] != cells[:-1])))
+        counts = np.diff(np.append(starts, len(cells)))
+        longitudes = np.add.reduceat(self.longitudes[start:end], starts) / counts
+        latitudes = np.add.reduceat(self.latitudes[start:end], starts) / counts
+        violations = np.add.reduceat(self.violations[start:end], starts)
+        return [
+            {
+                'type': 'Feature',
+                'geometry': {'type': 'Point', 'coordinates': [lon, lat]},
+                'properties': {'cluster': True, 'point_count': count, 'violations': total}
+            }
+            for lon, lat, count, total in zip(
+                longitudes.tolist(), latitudes.tolist(), counts.tolist(), violations.tolist()
+            )
+        ]
+
+def load_tile_index(db: Session, carrier_id: int) -> TileIndex:
+    """Build a carrier's TileIndex from inspection_locations"""
+    point = cast(InspectionLocation.location, Geometry(srid=4326))
+    rows = db.execute(
+        select(
+            InspectionLocation.id,
+            func.ST_X(point),
+            func.ST_Y(point),
+            func.coalesce(InspectionLocation.violation_count, 0)
+        ).where(
+            InspectionLocation.carrier_id == carrier_id,
+            InspectionLocation.location.isnot(None)
+        ).execution_options(yield_per=10000)
+    ).all()
+    columns = list(zip(*rows)) or [(), (), (), ()]
+    return TileIndex(
+        np.array(columns[0], dtype=np.int64),
+        np.array(columns[1], dtype=float),
+        np.array(columns[2], dtype=float),
+        np.array(columns[3], dtype=np.int64)
+    )
+
+# Indexes are large and few carriers are panned at once; encoded tiles are small
+_index_cache = register_cache(VersionedCache(maxsize=16, name='tile_index'))
+_tile_cache = register_cache(VersionedCache(maxsize=4096, name='tiles'))
+
+def get_tile(db: Session, carrier_id: int, data_version: int, z: int, x: int, y: int) -> bytes:
+    """JSON-encoded tile, cached per carrier data version"""
+    def render() -> bytes:
+        index = _index_cache.get_or_compute(
+            (carrier_id, data_version),
+            lambda: load_tile_index(db, carrier_id)
+        )
+        return orjson.dumps(index.tile(z, x, y))
+
+    return _tile_cache.get_or_compute((carrier_id, data_version, z, x, y), render)
@@ -1,6 +1,75 @@
-from typing import Dict, List, TypedDict
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, TypedDict
 from geojson import Feature, FeatureCollection, LineString, Point
 from datetime import datetime
+import math
+import numpy as np
+import orjson
+
+# Zooms whose simplified route geometry is precomputed (CarrierRoute.simplified_geometry);
+# above the last one the full geometry is served
+ROUTE_ZOOM_LEVELS = (3, 6, 9, 12, 15)
+FULL_PRECISION = 6
+
+def zoom_tolerance(zoom: float) -> float:
+    """Width of one 256px-tile pixel in degrees of longitude at `zoom`"""
+    return 360.0 / (256 * 2 ** zoom)
+
+def tolerance_precision(tolerance: float) -> int:
+    """Decimal places needed to keep quantization error below `tolerance`"""
+    return min(FULL_PRECISION, max(0, math.ceil(-math.log10(tolerance))))
+
+def route_level(zoom: float) -> Optional[int]:
+    """Coarsest precomputed level at least as detailed as `zoom`, None for full detail"""
+    for level in ROUTE_ZOOM_LEVELS:
+        if zoom <= level:
+            return level
+    return None
+
+def simplify_lines(
+    lines: Sequence[Sequence[Sequence[float]]],
+    tolerance: float,
+    precision: Optional[int] = None
+) -> List[List[List[float]]]:
+    """
+    Douglas-Peucker simplify and quantize many lines in one vectorized pass.
+
+    Vertices are rounded to `precision` decimals (by default derived from
+    the tolerance) and repeats produced by rounding are dropped; a line
+    always keeps its two endpoints.
+    """
+    import shapely
+
+    if not lines:
+        return []
+    if precision is None:
+        precision = tolerance_precision(tolerance)
+
+    lengths = [len(line) for line in lines]
+    geometries = shapely.linestrings(
+        np.concatenate([np.asarray(line, dtype=float).reshape(-1, 2) for line in lines]),
+        indices=np.repeat(np.arange(len(lines)), lengths)
+    )
+    simplified = shapely.simplify(geometries, tolerance, preserve_topology=False)
+    coords, index = shapely.get_coordinates(simplified, return_index=True)
+    coords = np.round(coords, precision)
+
+    keep = np.ones(len(coords), dtype=bool)
+    line_start = np.concatenate(([True], index[1:] != index[:-1]))
+    line_end = np.concatenate((index[:-1] != index[1:], [True]))
+    keep[1:] = np.any(coords[1:] != coords[:-1], axis=1)
+    keep |= line_start | line_end
+    coords, index = coords[keep], index[keep]
+
+    splits = np.cumsum(np.bincount(index, minlength=len(lines)))[:-1]
+    return [part.tolist() for part in np.split(coords, splits)]
+
+def route_variants(lines: Sequence[Sequence[Sequence[float]]]) -> List[Dict[str, List[List[float]]]]:
+    """Simplified geometry of each line at every ROUTE_ZOOM_LEVELS zoom, keyed by zoom"""
+    variants = [{} for _ in lines]
+    for level in ROUTE_ZOOM_LEVELS:
+        for variant, coords in zip(variants, simplify_lines(lines, zoom_tolerance(level))):
+            variant[str(level)] = coords
+    return variants
 
 class RouteDict(TypedDict):
     geometry: List[List[float]]
@@ -12,12 +81,22 @@ class RouteDict(TypedDict):
 class GeoVisualizer:
     # Static methods for GeoJSON conversion
     @staticmethod
-    def create_route_geojson(routes: List[RouteDict]) -> Dict:
+    def create_route_geojson(
+        routes: List[RouteDict],
+        zoom: Optional[float] = None,
+        tolerance: Optional[float] = None
+    ) -> Dict:
         try:
+            geometries = [route['geometry'] for route in routes]
+            if tolerance is None and zoom is not None and route_level(zoom) is not None:
+                tolerance = zoom_tolerance(route_level(zoom))
+            if tolerance is not None:
+                geometries = simplify_lines(geometries, tolerance)
+
             features = []
-            for route in routes:
+            for route, geometry in zip(routes, geometries):
                 route_feature = Feature(
-                    geometry=LineString(route['geometry']),
+                    geometry=LineString(geometry),
                     properties={
                         'confidence': route['confidence_score'],
                         'inspection_count': route['inspection_count'],
@@ -44,4 +123,62 @@ class GeoVisualizer:
                 }
             )
             features.append(point_feature)
-        return FeatureCollection(features)
\ No newline at end of file
+        return FeatureCollection(features)
+
+    @staticmethod
+    def route_feature(route: Mapping) -> Dict:
+        """Plain-dict route Feature from a route_map_query row"""
+        if route.get('coordinates') is not None:
+            geometry = {'type': 'LineString', 'coordinates': route['coordinates']}
+        else:
+            geometry = orjson.loads(route['geojson'])
+        return {
+            'type': 'Feature',
+            'geometry': geometry,
+            'properties': {
+                'confidence': route['confidence_score'],
+                'inspection_count': route['inspection_count'],
+                'first_seen': route['first_seen'].isoformat() if route['first_seen'] else None,
+                'last_seen': route['last_seen'].isoformat() if route['last_seen'] else None
+            }
+        }
+
+    @staticmethod
+    def inspection_feature(inspection: Mapping) -> Dict:
+        """Plain-dict point Feature from an inspection_map_query row"""
+        return {
+            'type': 'Feature',
+            'geometry': {
+                'type': 'Point',
+                'coordinates': [inspection['longitude'], inspection['latitude']]
+            },
+            'properties': {
+                'id': inspection['id'],
+                'date': inspection['inspection_date'].isoformat() if inspection['inspection_date'] else None,
+                'state': inspection['state'],
+                'city': inspection['city'],
+                'violations': inspection['violation_count']
+            }
+        }
+
+    @staticmethod
+    def stream_feature_collection(features: Iterable[Dict], batch_size: int = 500) -> Iterator[bytes]:
+        """
+        Encode a FeatureCollection incrementally.
+
+        Features are serialized one at a time and written out in batches of
+        `batch_size`, so memory is bounded by the batch rather than the
+        collection.
+        """
+        yield b'{"type":"FeatureCollection","features":['
+        batch = []
+        separator = b''
+        for feature in features:
+            batch.append(orjson.dumps(feature))
+            if len(batch) >= batch_size:
+                yield separator + b','.join(batch)
+                separator = b','
+                batch = []
+        if batch:
+            yield separator + b','.join(batch)
+        yield b']}'
\ No newline at end of file
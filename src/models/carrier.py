@@ -1,8 +1,6 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, JSON
 from datetime import datetime
-
-Base = declarative_base()
+from ..database.database import Base
 
 class Carrier(Base):
     __tablename__ = "carriers"
@@ -48,7 +46,14 @@ class CarrierHistory(Base):
     id = Column(Integer, primary_key=True, index=True)
     carrier_dot_number = Column(String, index=True)
     record_date = Column(DateTime, default=datetime.utcnow)
-    
+
+    # Written only when the carrier's normalized FMCSA fields change (see
+    # database.history): the hash of those fields, and the fields that
+    # changed since the previous snapshot (None where removed). A carrier's
+    # first snapshot holds every field.
+    payload_hash = Column(String(64))
+    changes = Column(JSON)
+
     # Snapshot Metrics
     safety_rating = Column(String)
     driver_oos_rate = Column(Float)
@@ -1,5 +1,5 @@
 from geoalchemy2 import Geography
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, JSON, UniqueConstraint
 from sqlalchemy.orm import relationship
 from ..database.database import Base
 from datetime import datetime, timezone
@@ -17,6 +17,7 @@ class InspectionLocation(Base):
     # Inspection details
     level = Column(Integer)
     violation_count = Column(Integer)
+    oos_violation_count = Column(Integer, default=0)
     raw_data = Column(JSON)
     
     # Relationships
@@ -32,6 +33,68 @@ class CarrierRoute(Base):
     first_seen = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     last_seen = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     inspection_count = Column(Integer, default=0)
+    # Douglas-Peucker simplified coordinates keyed by zoom level (see ROUTE_ZOOM_LEVELS)
+    simplified_geometry = Column(JSON)
     
     # Relationships
-    carrier = relationship("CarrierRecord", back_populates="routes")
\ No newline at end of file
+    carrier = relationship("CarrierRecord", back_populates="routes")
+
+class StatePairAggregate(Base):
+    """Running totals for one carrier's state-to-state transitions"""
+    __tablename__ = "state_pair_aggregates"
+    __table_args__ = (UniqueConstraint('carrier_id', 'state_pair'),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    carrier_id = Column(Integer, ForeignKey("carrier_records.id"), index=True)
+    state_pair = Column(String)  # "<from>-<to>"
+    transition_count = Column(Integer, default=0)
+    first_seen = Column(DateTime)
+    last_seen = Column(DateTime)
+
+    # Evenly thinned [lon, lat] sample: one transition in every
+    # `sample_stride` contributes its two endpoints
+    sample_points = Column(JSON, default=list)
+    sample_stride = Column(Integer, default=1)
+
+    route_id = Column(Integer, ForeignKey("carrier_routes.id", ondelete="SET NULL"), nullable=True)
+    route = relationship("CarrierRoute")
+
+class CarrierRouteState(Base):
+    """High-water mark of the inspections already folded into a carrier's aggregates"""
+    __tablename__ = "carrier_route_states"
+
+    carrier_id = Column(Integer, ForeignKey("carrier_records.id"), primary_key=True)
+    last_inspection_id = Column(Integer)
+    last_inspection_date = Column(DateTime)
+    last_state = Column(String)
+    last_longitude = Column(Float)
+    last_latitude = Column(Float)
+    updated_at = Column(DateTime,
+                        default=lambda: datetime.now(timezone.utc),
+                        onupdate=lambda: datetime.now(timezone.utc))
+
+class CarrierStateMonthly(Base):
+    """Inspection totals per carrier, state and calendar month"""
+    __tablename__ = "carrier_state_monthly"
+
+    carrier_id = Column(Integer, ForeignKey("carrier_records.id"), primary_key=True)
+    state = Column(String, primary_key=True)
+    month = Column(Date, primary_key=True)  # First day of the month
+    inspection_count = Column(Integer, default=0)
+    violation_count = Column(Integer, default=0)
+    oos_count = Column(Integer, default=0)
+
+class CarrierStatePairMonthly(Base):
+    """
+    Consecutive-inspection transitions per carrier, "<from>-<to>" state pair
+    and month of the earlier inspection; violations cover both ends, as in
+    FrequencyAnalyzer.analyze_state_pairs
+    """
+    __tablename__ = "carrier_state_pair_monthly"
+
+    carrier_id = Column(Integer, ForeignKey("carrier_records.id"), primary_key=True)
+    state_pair = Column(String, primary_key=True)
+    month = Column(Date, primary_key=True)
+    transition_count = Column(Integer, default=0)
+    violation_count = Column(Integer, default=0)
+    oos_count = Column(Integer, default=0)
\ No newline at end of file
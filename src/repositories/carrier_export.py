@@ -0,0 +1,192 @@
+"""
+Stream the carrier table to CSV or Parquet.
+
+    python -m src.repositories.carrier_export --format parquet --output carriers.parquet
+    python -m src.repositories.carrier_export --columns dot_number,legal_name,fleet_size > carriers.csv
+
+Rows are read from a server-side cursor in batches of `batch_size`, and
+each batch is encoded and handed on before the next one is fetched, so
+memory stays flat however many carriers there are. Parquet output gets
+one row group per batch.
+"""
+import argparse
+import csv
+import io
+import logging
+import sys
+import time
+from datetime import date, datetime
+from typing import Any, Iterable, Iterator, List, Optional, Sequence
+
+import orjson
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, select
+from sqlalchemy.orm import Session
+
+from ..database.models import CarrierRecord
+from .carrier_repository import CARRIER_LIST_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'parquet': 'application/vnd.apache.parquet'
+}
+DEFAULT_BATCH_SIZE = 10_000
+
+def export_columns(columns: Optional[Sequence[str]] = None) -> List[str]:
+    """Validated carrier_records columns to export (default: the list-view columns)"""
+    table = CarrierRecord.__table__
+    columns = list(dict.fromkeys(columns or CARRIER_LIST_COLUMNS))
+    unknown = [name for name in columns if name not in table.c]
+    if unknown:
+        raise ValueError(f"Unknown carrier columns: {', '.join(unknown)}")
+    return columns
+
+def iter_batches(db: Session, statement, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[list]:
+    """Rows of `statement` read through a server-side cursor, batch_size at a time"""
+    result = db.execute(statement.execution_options(stream_results=True, yield_per=batch_size))
+    for partition in result.partitions():
+        yield partition
+
+def iter_carrier_batches(db: Session, columns: Sequence[str], batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[list]:
+    """Row tuples of the given columns in id order, batch_size at a time"""
+    table = CarrierRecord.__table__
+    statement = select(*(table.c[name] for name in columns)).order_by(table.c.id)
+    return iter_batches(db, statement, batch_size)
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ''
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return orjson.dumps(value).decode()
+    return value
+
+def encode_csv(batches: Iterable[list], columns: Sequence[str]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for batch in batches:
+        writer.writerows([_csv_value(value) for value in row] for row in batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+def arrow_schema(columns: Sequence):
+    """Arrow schema for SQLAlchemy columns; JSON and other types become strings"""
+    import pyarrow as pa
+
+    def arrow_type(column):
+        if isinstance(column.type, Boolean):
+            return pa.bool_()
+        if isinstance(column.type, Integer):
+            return pa.int64()
+        if isinstance(column.type, Float):
+            return pa.float64()
+        if isinstance(column.type, DateTime):
+            return pa.timestamp('us')
+        if isinstance(column.type, Date):
+            return pa.date32()
+        return pa.string()
+
+    return pa.schema([pa.field(column.name, arrow_type(column)) for column in columns])
+
+def arrow_batch(rows: list, schema):
+    """RecordBatch from row tuples ordered like `schema`"""
+    import pyarrow as pa
+
+    arrays = []
+    for index, field in enumerate(schema):
+        values = [row[index] for row in rows]
+        if pa.types.is_string(field.type):
+            values = [
+                orjson.dumps(value).decode() if isinstance(value, (dict, list)) else value
+                for value in values
+            ]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that keeps what was written until drained"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def encode_parquet(batches: Iterable[list], columns: Sequence[str]) -> Iterator[bytes]:
+    import pyarrow.parquet as pq
+
+    table = CarrierRecord.__table__
+    schema = arrow_schema([table.c[name] for name in columns])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression='zstd')
+    try:
+        for batch in batches:
+            writer.write_batch(arrow_batch(batch, schema), row_group_size=len(batch))
+            yield sink.drain()
+    finally:
+        # Writes the footer; without it the file is unreadable
+        writer.close()
+    yield sink.drain()
+
+def export_carriers(
+    db: Session,
+    columns: Optional[Sequence[str]] = None,
+    format: str = 'csv',
+    batch_size: int = DEFAULT_BATCH_SIZE
+) -> Iterator[bytes]:
+    """Carrier table encoded as `format`, as a stream of byte chunks"""
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {format}")
+    columns = export_columns(columns)
+    batches = iter_carrier_batches(db, columns, batch_size)
+    encode = encode_parquet if format == 'parquet' else encode_csv
+    return encode(batches, columns)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--format', choices=list(EXPORT_FORMATS), default='csv')
+    parser.add_argument('--columns', help=f"comma-separated columns (default: {','.join(CARRIER_LIST_COLUMNS)})")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--output', help='file to write (default: stdout)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    from ..database.database import SessionLocal
+
+    columns = args.columns.split(',') if args.columns else None
+    started = time.monotonic()
+    written = 0
+    db = SessionLocal()
+    output = open(args.output, 'wb') if args.output else sys.stdout.buffer
+    try:
+        for chunk in export_carriers(db, columns, args.format, args.batch_size):
+            output.write(chunk)
+            written += len(chunk)
+    finally:
+        db.close()
+        if args.output:
+            output.close()
+    logger.info(f"Exported {written / 1e6:.1f} MB in {time.monotonic() - started:.1f}s")
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,27 @@
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload
 from ..database.models import CarrierRecord, SafetyMetrics, RiskAssessment
-from typing import Optional, List
+from typing import Any, Dict, Iterable, Optional, List, Sequence
 from datetime import datetime
 
+# Relationships get_all_carriers can eager-load on request
+CARRIER_RELATIONS = {
+    'inspections': CarrierRecord.inspections,
+    'safety_metrics': CarrierRecord.safety_metrics,
+    'inspection_locations': CarrierRecord.inspection_locations,
+    'routes': CarrierRecord.routes
+}
+
+# Columns of a list view; raw_data holds the full FMCSA response and is
+# only read when asked for by name
+CARRIER_LIST_COLUMNS = (
+    'id', 'dot_number', 'legal_name', 'dba_name', 'operating_status', 'is_active',
+    'allowed_to_operate', 'fleet_size', 'driver_count', 'safety_rating', 'state', 'updated_at'
+)
+SAFETY_METRICS_LIST_COLUMNS = (
+    'crash_total', 'fatal_crashes', 'driver_oos_rate', 'vehicle_oos_rate', 'hazmat_oos_rate', 'record_date'
+)
+
 class CarrierRepository:
     def __init__(self, db: Session):
         self.db = db
@@ -27,16 +46,67 @@ class CarrierRepository:
         self.db.refresh(carrier)
         return carrier
 
-    def get_all_carriers(self, skip: int = 0, limit: int = 100) -> List[CarrierRecord]:
-        return (
-            self.db.query(CarrierRecord)
-            .options(
-                joinedload(CarrierRecord.inspections),
-                joinedload(CarrierRecord.safety_metrics),
-                joinedload(CarrierRecord.inspection_locations),
-                joinedload(CarrierRecord.routes)
-            )
-            .offset(skip)
-            .limit(limit)
-            .all()
-        )
\ No newline at end of file
+    def get_all_carriers(
+        self,
+        after_id: Optional[int] = None,
+        limit: int = 100,
+        include: Iterable[str] = ()
+    ) -> List[CarrierRecord]:
+        """
+        One page of carriers in id order.
+
+        Pages are keyset-paginated: pass the last id of the previous page
+        as `after_id`, which the primary key index seeks to directly, so
+        deep pages cost the same as the first. Each relationship named in
+        `include` (see CARRIER_RELATIONS) is loaded with one extra
+        SELECT ... WHERE carrier_id IN (...) for the whole page.
+        """
+        query = select(CarrierRecord).order_by(CarrierRecord.id).limit(limit)
+        if after_id is not None:
+            query = query.where(CarrierRecord.id > after_id)
+        for name in include:
+            if name not in CARRIER_RELATIONS:
+                raise ValueError(f"Unknown carrier relationship: {name}")
+            query = query.options(selectinload(CARRIER_RELATIONS[name]))
+        return list(self.db.execute(query).scalars())
+
+    def list_carriers(
+        self,
+        after_id: Optional[int] = None,
+        limit: int = 100,
+        columns: Sequence[str] = CARRIER_LIST_COLUMNS,
+        include_safety_metrics: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        One keyset page of carriers as plain dicts of the chosen columns.
+
+        Only the projected columns are read; no ORM objects are built. The
+        id is always included since it is the cursor for the next page.
+        With include_safety_metrics each row gets a 'safety_metrics' dict
+        (or None), fetched for the whole page with a single IN query.
+        """
+        table = CarrierRecord.__table__
+        unknown = [name for name in columns if name not in table.c]
+        if unknown:
+            raise ValueError(f"Unknown carrier columns: {', '.join(unknown)}")
+        names = ['id'] + [name for name in dict.fromkeys(columns) if name != 'id']
+
+        query = select(*(table.c[name] for name in names)).order_by(table.c.id).limit(limit)
+        if after_id is not None:
+            query = query.where(table.c.id > after_id)
+        rows = [dict(row._mapping) for row in self.db.execute(query)]
+
+        if include_safety_metrics and rows:
+            metrics_table = SafetyMetrics.__table__
+            metrics = {
+                row.carrier_id: {name: getattr(row, name) for name in SAFETY_METRICS_LIST_COLUMNS}
+                for row in self.db.execute(
+                    select(
+                        metrics_table.c.carrier_id,
+                        *(metrics_table.c[name] for name in SAFETY_METRICS_LIST_COLUMNS)
+                    ).where(metrics_table.c.carrier_id.in_([row['id'] for row in rows]))
+                )
+            }
+            for row in rows:
+                row['safety_metrics'] = metrics.get(row['id'])
+        return rows
\ No newline at end of file
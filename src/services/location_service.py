@@ -1,30 +1,47 @@
 from typing import List, Dict, Any
-from ..database.models import CarrierRecord, InspectionLocation, CarrierRoute
+from sqlalchemy import func, select
+from sqlalchemy.orm import object_session
+from ..database.models import CarrierRecord, InspectionLocation
+from ..geographic.rollups import state_pair_totals
 
 class LocationProcessor:
     def __init__(self):
         self.locations = []
 
     def process_locations(self, carrier: CarrierRecord) -> List[Dict[str, Any]]:
+        # Inspection counts per city, counted in SQL on the carrier's session
+        rows = object_session(carrier).execute(
+            select(
+                InspectionLocation.city,
+                InspectionLocation.state,
+                func.count(InspectionLocation.id)
+            ).where(
+                InspectionLocation.carrier_id == carrier.id
+            ).group_by(
+                InspectionLocation.state, InspectionLocation.city
+            ).order_by(InspectionLocation.state, InspectionLocation.city)
+        )
         return [
             {
-                "city": location.city,
-                "state": location.state,
-                "count": location.inspection_count
+                "city": city,
+                "state": state,
+                "count": count
             }
-            for location in carrier.inspection_locations
+            for city, state, count in rows
         ]
 
 class RouteAnalyzer:
     def analyze_routes(self, carrier: CarrierRecord) -> Dict[str, Any]:
+        # Detected routes carry no states; state-pair frequencies come from the rollup
+        state_pairs = state_pair_totals(object_session(carrier), carrier.id)
         return {
             "routes": [
                 {
-                    "origin": route.origin_state,
-                    "destination": route.destination_state,
-                    "frequency": route.frequency
+                    "origin": pair.split('-', 1)[0],
+                    "destination": pair.split('-', 1)[1],
+                    "frequency": totals['count']
                 }
-                for route in carrier.routes
+                for pair, totals in sorted(state_pairs.items(), key=lambda item: item[1]['count'], reverse=True)
             ]
         }
 
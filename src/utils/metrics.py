@@ -0,0 +1,235 @@
+"""
+In-process request metrics, rendered in the Prometheus text format.
+
+Series live in one registry per process; with several uvicorn workers
+each worker keeps its own. Per-request figures (DB queries, FMCSA calls,
+timed sections) accumulate on the RequestMetrics bound to the current
+context and are folded into per-route histograms when the request ends,
+so a slow endpoint can be split into SQL, upstream and compute time.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250, 500, 1000)
+
+# A collector returns (name, type, help, [(labels, value), ...]) families,
+# read at scrape time from state that is kept elsewhere (cache stats, pools)
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+Collector = Callable[[], Iterable[Family]]
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_format_labels(dict(zip(self.labelnames, key)))} {_format_value(value)}"
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count in each bucket (non-cumulative), +Inf count, sum]
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            series = [(key, list(counts), total) for key, (counts, total) in self._series.items()]
+        for key, counts, total in series:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                bucket_labels = _format_labels({**labels, 'le': _format_value(bound)})
+                yield f"{self.name}_bucket{bucket_labels} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(labels)} {cumulative}"
+
+class Registry:
+    def __init__(self):
+        self._metrics: List = []
+        self._collectors: List[Collector] = []
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, help, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets=LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, help, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Collector) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for name, kind, help, samples in collector():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.extend(
+                    f"{name}{_format_labels(labels)} {_format_value(value)}"
+                    for labels, value in samples
+                )
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    'http_request_duration_seconds', 'Request latency, until the last body byte is sent',
+    ('method', 'route', 'status')
+)
+REQUEST_DB_QUERIES = REGISTRY.histogram(
+    'http_request_db_queries', 'SQL statements executed per request', ('route',), COUNT_BUCKETS
+)
+REQUEST_DB_SECONDS = REGISTRY.histogram(
+    'http_request_db_seconds', 'Time per request spent executing SQL', ('route',)
+)
+REQUEST_FMCSA_CALLS = REGISTRY.histogram(
+    'http_request_fmcsa_calls', 'FMCSA HTTP calls per request, retries included', ('route',), COUNT_BUCKETS
+)
+REQUEST_FMCSA_SECONDS = REGISTRY.histogram(
+    'http_request_fmcsa_seconds', 'Time per request spent in FMCSA HTTP calls', ('route',)
+)
+REQUEST_SECTION_SECONDS = REGISTRY.histogram(
+    'http_request_section_seconds', 'Time per request spent in named compute sections', ('route', 'section')
+)
+DB_QUERY_SECONDS = REGISTRY.histogram('db_query_duration_seconds', 'SQL statement latency')
+FMCSA_CALL_SECONDS = REGISTRY.histogram(
+    'fmcsa_request_duration_seconds', 'FMCSA HTTP call latency by status code', ('outcome',)
+)
+
+class RequestMetrics:
+    """What one request spent its time on"""
+    __slots__ = ('db_queries', 'db_seconds', 'fmcsa_calls', 'fmcsa_seconds', 'sections')
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.fmcsa_calls = 0
+        self.fmcsa_seconds = 0.0
+        self.sections: Dict[str, float] = {}
+
+_current: ContextVar[Optional[RequestMetrics]] = ContextVar('request_metrics', default=None)
+
+def start_request() -> RequestMetrics:
+    """Bind a fresh RequestMetrics to the current context"""
+    request = RequestMetrics()
+    _current.set(request)
+    return request
+
+def finish_request(request: RequestMetrics, method: str, route: str, status: int, seconds: float) -> None:
+    HTTP_REQUEST_SECONDS.observe(seconds, method=method, route=route, status=status)
+    REQUEST_DB_QUERIES.observe(request.db_queries, route=route)
+    REQUEST_DB_SECONDS.observe(request.db_seconds, route=route)
+    REQUEST_FMCSA_CALLS.observe(request.fmcsa_calls, route=route)
+    REQUEST_FMCSA_SECONDS.observe(request.fmcsa_seconds, route=route)
+    for section, section_seconds in request.sections.items():
+        REQUEST_SECTION_SECONDS.observe(section_seconds, route=route, section=section)
+
+def record_query(seconds: float) -> None:
+    DB_QUERY_SECONDS.observe(seconds)
+    request = _current.get()
+    if request is not None:
+        request.db_queries += 1
+        request.db_seconds += seconds
+
+def record_fmcsa_call(seconds: float, outcome: str) -> None:
+    FMCSA_CALL_SECONDS.observe(seconds, outcome=outcome)
+    request = _current.get()
+    if request is not None:
+        request.fmcsa_calls += 1
+        request.fmcsa_seconds += seconds
+
+@contextmanager
+def timed(section: str) -> Iterator[None]:
+    """Charge the block's wall time to `section` of the current request"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        request = _current.get()
+        if request is not None:
+            request.sections[section] = request.sections.get(section, 0.0) + time.perf_counter() - started
+
+_sqlalchemy_instrumented = False
+
+def instrument_sqlalchemy() -> None:
+    """Time every statement on every Engine, sync or async, in this process"""
+    global _sqlalchemy_instrumented
+    if _sqlalchemy_instrumented:
+        return
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        record_query(time.perf_counter() - conn.info['query_started'].pop())
+
+    @event.listens_for(Engine, 'handle_error')
+    def _error(context):
+        started = context.connection.info.get('query_started') if context.connection else None
+        if started:
+            record_query(time.perf_counter() - started.pop())
+
+    _sqlalchemy_instrumented = True